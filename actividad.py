@@ -0,0 +1,78 @@
+"""
+Línea de tiempo de la actividad del Data Lake.
+
+La actividad se resume una sola vez por versión del inventario en conteos
+diarios (archivos y bytes por día, tipo de evento, categoría y dimensión).
+Cambiar la granularidad a semanas o meses solo reagrupa esa tabla, que tiene
+a lo más una fila por día y combinación, sin volver a recorrer los archivos.
+"""
+import numpy as np
+import pandas as pd
+
+# Evento de la línea de tiempo -> columna de fecha del inventario
+EVENTOS = {
+    'Creación': 'fecha_creacion',
+    'Modificación': 'fecha_modificacion',
+}
+
+# Granularidades disponibles -> frecuencia de período de pandas
+GRANULARIDADES = {
+    'Día': 'D',
+    'Semana': 'W',
+    'Mes': 'M',
+}
+
+
+def resumir_actividad(df):
+    """
+    Conteos diarios de archivos y bytes por evento, categoría y dimensión.
+
+    Se agrupa por el número de día (entero) y los códigos de las categóricas,
+    de modo que el costo es una sola pasada por columna aunque el inventario
+    tenga millones de filas.
+    """
+    tamanos = df['bytes'].fillna(0).to_numpy(dtype=np.int64)
+    partes = []
+    for evento, columna in EVENTOS.items():
+        if columna not in df.columns:
+            continue
+        fechas = df[columna]
+        validas = fechas.notna().to_numpy()
+        resumen = (
+            pd.DataFrame({
+                'dia': fechas.to_numpy()[validas].astype('datetime64[D]'),
+                'categoria': df['categoria'].to_numpy()[validas],
+                'dimensiones': df['dimensiones'].to_numpy()[validas],
+                'bytes': tamanos[validas]
+            })
+            .groupby(['dia', 'categoria', 'dimensiones'], observed=True, sort=True)
+            .agg(archivos=('bytes', 'size'), bytes=('bytes', 'sum'))
+            .reset_index()
+        )
+        resumen.insert(1, 'evento', evento)
+        partes.append(resumen)
+
+    if not partes:
+        return pd.DataFrame(columns=['dia', 'evento', 'categoria', 'dimensiones', 'archivos', 'bytes'])
+    actividad = pd.concat(partes, ignore_index=True)
+    actividad['evento'] = pd.Categorical(actividad['evento'], categories=list(EVENTOS))
+    return actividad
+
+
+def remuestrear_actividad(actividad, granularidad='Mes', por='categoria', eventos=None):
+    """
+    Archivos y bytes por período a partir de los conteos diarios.
+
+    por indica la columna con que se separan las series ('categoria',
+    'dimensiones' o None) y eventos restringe los tipos de evento.
+    Devuelve una fila por período y serie, con el inicio del período en 'periodo'.
+    """
+    if eventos is not None:
+        actividad = actividad[actividad['evento'].isin(eventos)]
+    periodos = actividad['dia'].dt.to_period(GRANULARIDADES[granularidad]).dt.start_time
+    claves = [periodos.rename('periodo')] + ([actividad[por]] if por else [])
+    return (
+        actividad.groupby(claves, observed=True)[['archivos', 'bytes']]
+        .sum()
+        .reset_index()
+    )
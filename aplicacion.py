@@ -0,0 +1,33 @@
+"""
+Aplicación ASGI del dashboard: Streamlit más la ruta de descarga de exportaciones.
+
+La carpeta estática de Streamlit (app/static/) responde 404 a los archivos de
+más de 200 MB, así que las exportaciones se entregan desde /exportes/<archivo>,
+que lee el archivo del disco por bloques y acepta descargas por rangos.
+
+Uso:
+    streamlit run aplicacion.py
+"""
+import os
+
+import streamlit as st
+from starlette.responses import FileResponse, PlainTextResponse
+from starlette.routing import Route
+
+import exportaciones
+
+
+async def descargar_exportacion(request):
+    """Entrega una exportación generada por exportaciones.py (solo archivos de esa carpeta)"""
+    ruta = exportaciones.ruta_exportacion(request.path_params['archivo'])
+    if ruta is None or not os.path.isfile(ruta):
+        return PlainTextResponse("Exportación no encontrada", status_code=404)
+    return FileResponse(ruta, filename=os.path.basename(ruta))
+
+
+app = st.App('streamlit_dashboard.py', routes=[
+    Route(f"/{exportaciones.URL_EXPORTES}/{{archivo}}", descargar_exportacion, methods=['GET', 'HEAD']),
+])
+
+if __name__ == '__main__':
+    app.run()
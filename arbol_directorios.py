@@ -0,0 +1,171 @@
+"""
+Árbol de directorios del Data Lake (trie de rutas).
+
+Cada directorio se guarda una sola vez como un nodo con su nombre y el id de
+su padre, y cada fila del inventario solo referencia el id del nodo de su
+directorio. Las rutas se reconstruyen bajo demanda, al mostrarlas, y los
+totales por subárbol se acumulan en una pasada de las hojas a la raíz.
+"""
+import numpy as np
+import pandas as pd
+
+# El levantamiento del Data Lake se genera en Windows
+SEPARADOR = '\\'
+
+# Id del nodo raíz (la carpeta donde se hizo el levantamiento)
+RAIZ = 0
+
+
+class ArbolDirectorios:
+    """Trie inmutable de directorios; se comparte entre sesiones y nunca se modifica"""
+
+    def __init__(self, padres, nombres, profundidades):
+        self.padres = np.asarray(padres, dtype=np.int32)
+        # Los nombres de carpeta se repiten mucho (años, meses, "data lake", ...)
+        self.nombres = pd.Categorical(nombres)
+        self.profundidades = np.asarray(profundidades, dtype=np.int16)
+
+        # Hijos de cada nodo en formato CSR: hijos[inicio[n]:inicio[n + 1]]
+        orden = np.argsort(self.padres, kind='stable')
+        orden = orden[self.padres[orden] >= 0]
+        self._hijos = orden.astype(np.int32)
+        conteo = np.bincount(self.padres[self._hijos], minlength=len(self.padres))
+        self._inicio_hijos = np.concatenate([[0], np.cumsum(conteo)]).astype(np.int64)
+
+    def __len__(self):
+        return len(self.padres)
+
+    def __deepcopy__(self, memo):
+        # pandas copia df.attrs en cada operación; el árbol es inmutable y se comparte
+        return self
+
+    def memoria(self):
+        """Bytes ocupados por el árbol"""
+        nombres = self.nombres.codes.nbytes + int(self.nombres.categories.memory_usage(deep=True))
+        return (self.padres.nbytes + self.profundidades.nbytes + nombres
+                + self._hijos.nbytes + self._inicio_hijos.nbytes)
+
+    def nombre(self, nodo):
+        """Nombre de la carpeta del nodo ('' para la raíz)"""
+        return self.nombres[nodo]
+
+    def hijos(self, nodo):
+        """Ids de los subdirectorios directos de un nodo"""
+        return self._hijos[self._inicio_hijos[nodo]:self._inicio_hijos[nodo + 1]]
+
+    def ruta(self, nodo):
+        """Ruta relativa del directorio de un nodo, reconstruida subiendo hasta la raíz"""
+        partes = []
+        while nodo != RAIZ:
+            partes.append(self.nombres[nodo])
+            nodo = self.padres[nodo]
+        return SEPARADOR.join(reversed(partes))
+
+    def rutas(self, nodos):
+        """
+        Rutas de varios nodos (por ejemplo, la página visible de una tabla).
+
+        Cada directorio se reconstruye una sola vez aunque se repita, y los
+        ancestros comunes se reutilizan.
+        """
+        memo = {RAIZ: ''}
+
+        def resolver(nodo):
+            pendientes = []
+            while nodo not in memo:
+                pendientes.append(nodo)
+                nodo = int(self.padres[nodo])
+            for pendiente in reversed(pendientes):
+                padre = memo[int(self.padres[pendiente])]
+                nombre = self.nombres[pendiente]
+                memo[pendiente] = f"{padre}{SEPARADOR}{nombre}" if padre else nombre
+            return memo[pendientes[0]] if pendientes else memo[nodo]
+
+        nodos = np.asarray(nodos)
+        unicos, inverso = np.unique(nodos, return_inverse=True)
+        resueltas = np.array([resolver(int(n)) for n in unicos], dtype=object)
+        return resueltas[inverso.reshape(-1)] if len(nodos) else resueltas
+
+    def acumular(self, valores):
+        """
+        Totales por subárbol: cada nodo suma sus propios valores y los de todos sus descendientes.
+
+        valores tiene una fila por nodo (y opcionalmente varias columnas); se
+        recorre el árbol por niveles, del más profundo a la raíz.
+        """
+        totales = np.array(valores, dtype=np.float64 if np.asarray(valores).dtype.kind == 'f' else np.int64)
+        for profundidad in range(int(self.profundidades.max(initial=0)), 0, -1):
+            nivel = np.flatnonzero(self.profundidades == profundidad)
+            np.add.at(totales, self.padres[nivel], totales[nivel])
+        return totales
+
+
+def construir_arbol(directorios, profundidades):
+    """
+    Construye el árbol a partir de rutas de directorio (directorio_padre) y su profundidad.
+
+    Devuelve el árbol y, para cada ruta de entrada, el id de su nodo (las
+    rutas vacías o nulas corresponden a la raíz). Solo se recorre en Python
+    cada directorio distinto una vez; los ancestros que no aparecen en la
+    entrada se crean al vuelo.
+    """
+    codigos, unicos = pd.factorize(pd.Series(directorios, dtype=object))
+    profundidades = np.asarray(profundidades)
+
+    # Ordenar por profundidad para crear los padres antes que los hijos
+    profundidad_unico = np.zeros(len(unicos), dtype=np.int64)
+    validos = codigos >= 0
+    profundidad_unico[codigos[validos]] = profundidades[validos]
+    orden = np.argsort(profundidad_unico, kind='stable')
+
+    padres, nombres, niveles = [-1], [''], [0]
+    ids = {'': RAIZ}
+
+    def nodo(ruta):
+        pendientes = []
+        while ruta not in ids:
+            pendientes.append(ruta)
+            ruta = ruta.rpartition(SEPARADOR)[0]
+        padre = ids[ruta]
+        for pendiente in reversed(pendientes):
+            ids[pendiente] = len(padres)
+            padres.append(padre)
+            nombres.append(pendiente.rpartition(SEPARADOR)[2])
+            niveles.append(niveles[padre] + 1)
+            padre = ids[pendiente]
+        return padre
+
+    nodo_de_unico = np.empty(len(unicos), dtype=np.int32)
+    for i in orden:
+        nodo_de_unico[i] = nodo(str(unicos[i]))
+
+    nodos = np.full(len(codigos), RAIZ, dtype=np.int32)
+    nodos[validos] = nodo_de_unico[codigos[validos]]
+    return ArbolDirectorios(padres, nombres, niveles), nodos
+
+
+def resumir_subarboles(arbol, nodos, tamanos, extensiones, top_extensiones=10):
+    """
+    Totales por subárbol: archivos, bytes y mezcla de extensiones de cada directorio y sus descendientes.
+
+    Se acumula todo en una sola pasada de las hojas a la raíz. Las extensiones
+    fuera de las top_extensiones más frecuentes se agrupan en 'Otras'.
+    Devuelve un DataFrame indexado por id de nodo.
+    """
+    n = len(arbol)
+    nodos = np.asarray(nodos, dtype=np.int64)
+    extensiones = pd.Series(extensiones).astype(object)
+    top = extensiones.value_counts().head(top_extensiones).index.tolist()
+    columnas_ext = top + ['Otras']
+    codigos_ext = pd.Categorical(extensiones.where(extensiones.isin(top), 'Otras'), categories=columnas_ext).codes
+
+    valores = np.zeros((n, 2 + len(columnas_ext)), dtype=np.int64)
+    np.add.at(valores[:, 0], nodos, 1)
+    np.add.at(valores[:, 1], nodos, pd.Series(tamanos).fillna(0).to_numpy(dtype=np.int64))
+    np.add.at(valores, (nodos, 2 + codigos_ext.astype(np.int64)), 1)
+
+    totales = arbol.acumular(valores)
+    resumen = pd.DataFrame(totales, columns=['archivos', 'bytes'] + columnas_ext)
+    resumen.insert(0, 'archivos_directos', valores[:, 0])
+    resumen.insert(0, 'subdirectorios', np.diff(arbol._inicio_hijos))
+    return resumen
@@ -0,0 +1,356 @@
+"""
+Índice de búsqueda por trigramas sobre las rutas del inventario.
+
+Cada ruta (que incluye el nombre del archivo) se descompone en trigramas de
+bytes UTF-8 en minúsculas, y el índice guarda, para cada trigrama, la lista
+ordenada de documentos que lo contienen. Una búsqueda por subcadena intersecta
+las listas de los trigramas de la consulta y solo verifica esos candidatos; la
+búsqueda aproximada ordena por proporción de trigramas compartidos.
+
+El índice se guarda en disco junto a la versión del inventario. Cuando el
+inventario cambia, las rutas nuevas se indexan en un segmento adicional y las
+eliminadas solo se marcan; cuando los cambios acumulados pesan demasiado, los
+segmentos se compactan en uno solo. Si no hay índice en la caché de ejecución
+se parte del generado al construir la imagen de Docker (RUTA_PRECALCULADO).
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from arbol_directorios import SEPARADOR
+from datos import escritura_atomica
+
+RUTA_INDICE = os.environ.get('RUTA_INDICE_BUSQUEDA', 'cache/indice_busqueda.npz')
+RUTA_INDICE_PRECALCULADO = os.path.join(os.environ.get('RUTA_PRECALCULADO', 'precalculado'), 'indice_busqueda.npz')
+
+# Rutas tokenizadas por bloque al construir un segmento (acota la memoria temporal)
+TAMANO_BLOQUE = 100_000
+
+# Fracción de documentos eliminados o en segmentos nuevos a partir de la cual se compacta
+FRACCION_COMPACTAR = 0.2
+
+
+def _texto_arrow(textos):
+    """Textos como arreglo Arrow de offsets int64, sin nulos"""
+    return pc.fill_null(pa.array(textos, type=pa.large_string()), '')
+
+
+def _rutas_distintas(rutas):
+    """Rutas distintas (en orden de aparición) como arreglo Arrow"""
+    return _texto_arrow(pd.unique(pd.Series(rutas, dtype=object).fillna('')))
+
+
+def _buffers(arreglo):
+    """Offsets y bytes UTF-8 de un arreglo Arrow de texto"""
+    offsets = np.frombuffer(arreglo.buffers()[1], dtype=np.int64)[arreglo.offset:arreglo.offset + len(arreglo) + 1]
+    datos = arreglo.buffers()[2]
+    datos = np.frombuffer(datos, dtype=np.uint8) if datos is not None else np.empty(0, dtype=np.uint8)
+    return offsets, datos
+
+
+def _trigramas_consulta(consulta, por_palabras=False):
+    """
+    Códigos de los trigramas distintos de una consulta (ya en minúsculas).
+
+    Con por_palabras se toman solo los trigramas dentro de cada palabra, de
+    modo que los espacios de la consulta calcen con cualquier separador de la ruta.
+    """
+    partes = consulta.split() if por_palabras else [consulta]
+    codigos = []
+    for parte in partes:
+        datos = np.frombuffer(parte.encode('utf-8'), dtype=np.uint8).astype(np.int64)
+        if len(datos) >= 3:
+            codigos.append((datos[:-2] << 16) | (datos[1:-1] << 8) | datos[2:])
+    if not codigos:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.concatenate(codigos))
+
+
+def _ordenar_sin_repetidos(claves):
+    """Ordena y elimina repetidos (más rápido que np.unique para arreglos int64 grandes)"""
+    claves = np.sort(claves, kind='stable')
+    if len(claves):
+        claves = claves[np.concatenate(([True], claves[1:] != claves[:-1]))]
+    return claves
+
+
+def _pares_trigrama_documento(textos):
+    """
+    Pares (trigrama, documento) distintos, codificados como trigrama << 32 | documento y ordenados.
+
+    Los trigramas se calculan sobre el buffer completo de cada bloque y se
+    descartan los que cruzan el límite entre dos rutas.
+    """
+    bloques = []
+    for inicio in range(0, len(textos), TAMANO_BLOQUE):
+        arreglo = pc.utf8_lower(textos[inicio:inicio + TAMANO_BLOQUE])
+        offsets, datos = _buffers(arreglo)
+        datos = datos[offsets[0]:offsets[-1]].astype(np.int64)
+        if len(datos) < 3:
+            continue
+
+        documento = np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+        codigos = (datos[:-2] << 16) | (datos[1:-1] << 8) | datos[2:]
+        dentro = documento[:-2] == documento[2:]
+        claves = (codigos[dentro] << 32) | (documento[:-2][dentro] + inicio)
+        bloques.append(_ordenar_sin_repetidos(claves))
+
+    if not bloques:
+        return np.empty(0, dtype=np.int64)
+    # Los bloques ya vienen ordenados: el ordenamiento estable los mezcla en tiempo lineal
+    return np.sort(np.concatenate(bloques), kind='stable')
+
+
+class SegmentoTrigramas:
+    """Índice invertido inmutable de trigramas sobre un conjunto de rutas"""
+
+    def __init__(self, rutas, trigramas, inicios, documentos):
+        # rutas: arreglo Arrow con el texto original de cada documento
+        self.rutas = rutas
+        # Lista de documentos del trigrama i: documentos[inicios[i]:inicios[i + 1]]
+        self.trigramas = trigramas
+        self.inicios = inicios
+        self.documentos = documentos
+
+    def __len__(self):
+        return len(self.rutas)
+
+    @classmethod
+    def construir(cls, rutas):
+        """Segmento para un arreglo Arrow de rutas"""
+        claves = _pares_trigrama_documento(rutas)
+        trigramas, inicios = np.unique((claves >> 32).astype(np.int32), return_index=True)
+        return cls(
+            rutas,
+            trigramas,
+            np.append(inicios, len(claves)).astype(np.int64),
+            (claves & 0xFFFFFFFF).astype(np.int32)
+        )
+
+    def lista(self, trigrama):
+        """Documentos que contienen un trigrama (lista ordenada)"""
+        i = np.searchsorted(self.trigramas, trigrama)
+        if i == len(self.trigramas) or self.trigramas[i] != trigrama:
+            return self.documentos[:0]
+        return self.documentos[self.inicios[i]:self.inicios[i + 1]]
+
+    def coincidencias(self, consulta):
+        """Documentos cuya ruta contiene la consulta (ya en minúsculas)"""
+        trigramas = _trigramas_consulta(consulta)
+        if len(trigramas):
+            listas = sorted((self.lista(t) for t in trigramas), key=len)
+            candidatos = listas[0].astype(np.int64)
+            for lista in listas[1:]:
+                if not len(candidatos):
+                    break
+                candidatos = np.intersect1d(candidatos, lista, assume_unique=True)
+            # Una consulta de exactamente un trigrama no necesita verificación
+            if len(consulta.encode('utf-8')) == 3:
+                return candidatos
+        else:
+            # Consultas de menos de tres bytes: se revisan todas las rutas
+            candidatos = np.arange(len(self.rutas), dtype=np.int64)
+
+        if not len(candidatos):
+            return candidatos
+        textos = pc.utf8_lower(self.rutas.take(pa.array(candidatos)))
+        return candidatos[pc.match_substring(textos, consulta).to_numpy(zero_copy_only=False)]
+
+    def trigramas_compartidos(self, trigramas):
+        """Documentos que comparten algún trigrama con la consulta y cuántos comparten"""
+        listas = [self.lista(t) for t in trigramas]
+        return np.unique(np.concatenate(listas).astype(np.int64), return_counts=True)
+
+
+class IndiceBusqueda:
+    """
+    Índice de búsqueda de una versión del inventario.
+
+    Se compone de uno o más segmentos inmutables y, por segmento, una máscara
+    de los documentos que siguen vigentes. Los ids de documento son globales:
+    los de cada segmento van a continuación de los del anterior.
+    """
+
+    def __init__(self, segmentos, vigentes, version):
+        self.segmentos = segmentos
+        self.vigentes = vigentes
+        self.version = version
+        self._bases = np.concatenate([[0], np.cumsum([len(s) for s in segmentos])]).astype(np.int64)
+        # Fila del inventario de cada documento (ver asociar_filas)
+        self.filas = None
+
+    def __len__(self):
+        return int(self._bases[-1])
+
+    @classmethod
+    def construir(cls, rutas, version):
+        """Índice de un solo segmento para una lista de rutas"""
+        rutas = _rutas_distintas(rutas)
+        return cls([SegmentoTrigramas.construir(rutas)], [np.ones(len(rutas), dtype=bool)], version)
+
+    def actualizar(self, rutas, version):
+        """
+        Índice para una nueva versión del inventario, reutilizando lo ya indexado.
+
+        Solo se tokenizan las rutas nuevas (en un segmento adicional); las que
+        desaparecieron se marcan como no vigentes. Si los cambios acumulados
+        superan FRACCION_COMPACTAR del índice, se reconstruye en un solo segmento.
+        """
+        if version == self.version:
+            return self
+        rutas = _rutas_distintas(rutas)
+
+        vigentes = [
+            anteriores & pc.is_in(segmento.rutas, value_set=rutas).to_numpy(zero_copy_only=False)
+            for segmento, anteriores in zip(self.segmentos, self.vigentes)
+        ]
+        indexadas = pa.concat_arrays([
+            segmento.rutas.filter(pa.array(mascara))
+            for segmento, mascara in zip(self.segmentos, vigentes)
+        ])
+        agregadas = rutas.filter(pc.invert(pc.is_in(rutas, value_set=indexadas)))
+
+        eliminadas = sum(int((~mascara).sum()) for mascara in vigentes)
+        en_segmentos_extra = sum(len(s) for s in self.segmentos[1:]) + len(agregadas)
+        if eliminadas + en_segmentos_extra > FRACCION_COMPACTAR * max(len(rutas), 1):
+            return IndiceBusqueda.construir(rutas, version)
+
+        segmentos = list(self.segmentos)
+        if len(agregadas):
+            segmentos.append(SegmentoTrigramas.construir(agregadas))
+            vigentes.append(np.ones(len(agregadas), dtype=bool))
+        return IndiceBusqueda(segmentos, vigentes, version)
+
+    def asociar_filas(self, rutas_inventario):
+        """Calcula la fila del inventario de cada documento (-1 si no está vigente; la primera si la ruta se repite)"""
+        rutas_inventario = pd.Index(pd.Series(rutas_inventario, dtype=object).fillna(''))
+        primeras = ~rutas_inventario.duplicated()
+        rutas_indice = pa.concat_arrays([s.rutas for s in self.segmentos]).to_numpy(zero_copy_only=False)
+        posiciones = rutas_inventario[primeras].get_indexer(rutas_indice)
+        filas = np.flatnonzero(primeras)[np.maximum(posiciones, 0)] if len(posiciones) else posiciones
+        self.filas = np.where((posiciones >= 0) & np.concatenate(self.vigentes), filas, -1)
+        return self
+
+    def _textos(self, por_segmento):
+        """Rutas de los documentos indicados (ids locales por segmento), en el mismo orden"""
+        return pa.concat_arrays([
+            segmento.rutas.take(pa.array(documentos, type=pa.int64()))
+            for segmento, documentos in zip(self.segmentos, por_segmento)
+        ])
+
+    def buscar(self, consulta, limite=100):
+        """
+        Documentos cuya ruta contiene la consulta (sin distinguir mayúsculas).
+
+        Devuelve los ids de documento, priorizando las coincidencias en el
+        nombre del archivo y luego las rutas más cortas, y la cantidad total de
+        coincidencias.
+        """
+        consulta = consulta.lower()
+        if not consulta:
+            return np.empty(0, dtype=np.int64), 0
+
+        por_segmento = []
+        for segmento, vigentes in zip(self.segmentos, self.vigentes):
+            documentos = segmento.coincidencias(consulta)
+            por_segmento.append(documentos[vigentes[documentos]])
+        documentos = np.concatenate([d + base for d, base in zip(por_segmento, self._bases)])
+        if not len(documentos):
+            return documentos, 0
+
+        textos = pc.utf8_lower(self._textos(por_segmento))
+        nombres = pc.list_element(pc.split_pattern(pc.utf8_reverse(textos), SEPARADOR, max_splits=1), 0)
+        en_nombre = pc.match_substring(nombres, consulta[::-1]).to_numpy(zero_copy_only=False)
+        largos = pc.utf8_length(textos).to_numpy(zero_copy_only=False)
+        orden = np.lexsort((largos, ~en_nombre))
+        return documentos[orden[:limite]], len(documentos)
+
+    def buscar_aproximado(self, consulta, limite=100, umbral=0.3):
+        """
+        Documentos que comparten al menos una fracción `umbral` de los trigramas de la consulta.
+
+        Tolera errores de tipeo y palabras en otro orden. Devuelve los ids de
+        documento y su puntaje (fracción de trigramas compartidos), de mayor a menor.
+        """
+        consulta = consulta.lower()
+        trigramas = _trigramas_consulta(consulta, por_palabras=True)
+        if not len(trigramas):
+            documentos, _ = self.buscar(consulta, limite)
+            return documentos, np.ones(len(documentos))
+
+        todos, puntajes = [], []
+        for segmento, vigentes, base in zip(self.segmentos, self.vigentes, self._bases):
+            documentos, compartidos = segmento.trigramas_compartidos(trigramas)
+            aceptados = vigentes[documentos] & (compartidos >= umbral * len(trigramas))
+            todos.append(documentos[aceptados] + base)
+            puntajes.append(compartidos[aceptados] / len(trigramas))
+        documentos, puntajes = np.concatenate(todos), np.concatenate(puntajes)
+
+        if len(documentos) > limite:
+            mejores = np.argpartition(-puntajes, limite - 1)[:limite]
+            documentos, puntajes = documentos[mejores], puntajes[mejores]
+        orden = np.lexsort((documentos, -puntajes))
+        return documentos[orden], puntajes[orden]
+
+    def guardar(self, ruta=RUTA_INDICE):
+        """Guarda el índice en disco con escritura atómica"""
+        arreglos = {'version': np.array(self.version), 'segmentos': np.array(len(self.segmentos))}
+        for i, (segmento, vigentes) in enumerate(zip(self.segmentos, self.vigentes)):
+            offsets, datos = _buffers(segmento.rutas)
+            arreglos.update({
+                f's{i}_trigramas': segmento.trigramas,
+                f's{i}_inicios': segmento.inicios,
+                f's{i}_documentos': segmento.documentos,
+                f's{i}_vigentes': vigentes,
+                f's{i}_offsets': offsets - offsets[0],
+                f's{i}_rutas': datos[offsets[0]:offsets[-1]]
+            })
+
+        with escritura_atomica(ruta) as temporal, open(temporal, 'wb') as f:
+            np.savez(f, **arreglos)
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_INDICE):
+        """Lee un índice guardado con guardar()"""
+        segmentos, vigentes = [], []
+        with np.load(ruta) as archivo:
+            for i in range(int(archivo['segmentos'])):
+                offsets = archivo[f's{i}_offsets']
+                rutas = pa.LargeStringArray.from_buffers(
+                    len(offsets) - 1, pa.py_buffer(offsets), pa.py_buffer(archivo[f's{i}_rutas'])
+                )
+                segmentos.append(SegmentoTrigramas(
+                    rutas, archivo[f's{i}_trigramas'], archivo[f's{i}_inicios'], archivo[f's{i}_documentos']
+                ))
+                vigentes.append(archivo[f's{i}_vigentes'])
+            version = str(archivo['version'])
+        return cls(segmentos, vigentes, version)
+
+
+def indice_para_inventario(rutas, version, ruta=RUTA_INDICE):
+    """
+    Índice de búsqueda para una versión del inventario.
+
+    Si hay un índice guardado se reutiliza (actualizándolo si el inventario
+    cambió); si no, se construye desde cero. El resultado se guarda para los
+    próximos arranques y queda asociado a las filas del inventario.
+    """
+    rutas = pd.Series(rutas, dtype=object)
+    indice = None
+    for origen in (ruta, RUTA_INDICE_PRECALCULADO):
+        try:
+            indice = IndiceBusqueda.cargar(origen)
+            break
+        except (OSError, ValueError, KeyError):
+            continue
+
+    if indice is None:
+        indice = IndiceBusqueda.construir(rutas, version)
+        indice.guardar(ruta)
+    elif indice.version != version:
+        indice = indice.actualizar(rutas, version)
+        indice.guardar(ruta)
+    return indice.asociar_filas(rutas)
@@ -0,0 +1,188 @@
+"""
+Caché en disco compartida por todos los procesos del dashboard.
+
+Con varios workers de Streamlit cada proceso tiene su propio st.cache_resource;
+esta caché (SQLite en modo WAL) es el segundo nivel común: el primer worker
+que carga un dataset, calcula una consulta o arma un gráfico lo guarda aquí y
+los demás lo leen en vez de repetir el trabajo. Un bloqueo por clave evita que
+varios workers calculen lo mismo a la vez. Las claves incluyen la versión de
+los archivos de origen, así que un dato nuevo nunca se confunde con uno viejo.
+
+Si existe una caché precalculada al construir la imagen (carpeta
+RUTA_PRECALCULADO), se consulta en modo de solo lectura cuando una clave no
+está en la caché de ejecución.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import plotly.io as pio
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+RUTA_CACHE_COMPARTIDA = os.environ.get('RUTA_CACHE_COMPARTIDA', 'cache/compartida.sqlite')
+
+# Resultados calculados al construir la imagen de Docker (solo lectura en ejecución)
+RUTA_PRECALCULADO = os.environ.get('RUTA_PRECALCULADO', 'precalculado')
+RUTA_CACHE_PRECALCULADA = os.path.join(RUTA_PRECALCULADO, 'compartida.sqlite')
+
+# Al superar este tamaño se eliminan las entradas usadas hace más tiempo
+TAMANO_MAXIMO = int(os.environ.get('TAMANO_CACHE_COMPARTIDA', 4 * 1024 ** 3))
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    clave TEXT PRIMARY KEY,
+    valor BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    expira REAL,
+    usado REAL NOT NULL
+)
+"""
+
+
+class CacheCompartida:
+    """Valores serializados con pickle en SQLite, indexados por una clave de texto"""
+
+    def __init__(self, ruta=RUTA_CACHE_COMPARTIDA, tamano_maximo=TAMANO_MAXIMO, ruta_precalculada=RUTA_CACHE_PRECALCULADA):
+        self.ruta = ruta
+        self.tamano_maximo = tamano_maximo
+        self.ruta_precalculada = None
+        if os.path.exists(ruta_precalculada) and os.path.abspath(ruta_precalculada) != os.path.abspath(ruta):
+            self.ruta_precalculada = ruta_precalculada
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        self._bloqueos = f"{ruta}.bloqueos"
+        os.makedirs(self._bloqueos, exist_ok=True)
+        with self._conexion() as con:
+            con.execute(_ESQUEMA)
+
+    def _conexion(self):
+        # Una conexión por hilo: las sesiones de Streamlit corren en hilos distintos
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=60)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def _conexion_precalculada(self):
+        con = getattr(self._local, 'precalculada', None)
+        if con is None:
+            # immutable: el archivo no cambia mientras el contenedor corre, no hace falta bloquearlo
+            con = sqlite3.connect(f"file:{os.path.abspath(self.ruta_precalculada)}?mode=ro&immutable=1", uri=True)
+            self._local.precalculada = con
+        return con
+
+    def obtener(self, clave, defecto=None):
+        """Valor guardado para la clave (defecto si no existe o expiró)"""
+        con = self._conexion()
+        fila = con.execute("SELECT valor, expira FROM entradas WHERE clave = ?", (clave,)).fetchone()
+        ahora = time.time()
+        if fila is None and self.ruta_precalculada:
+            fila = self._conexion_precalculada().execute(
+                "SELECT valor, expira FROM entradas WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is not None and (fila[1] is None or fila[1] >= ahora):
+                return pickle.loads(fila[0])
+        if fila is None or (fila[1] is not None and fila[1] < ahora):
+            return defecto
+        with con:
+            con.execute("UPDATE entradas SET usado = ? WHERE clave = ?", (ahora, clave))
+        return pickle.loads(fila[0])
+
+    def guardar(self, clave, valor, ttl=None):
+        """Guarda un valor; con ttl (segundos) expira pasado ese tiempo"""
+        datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        ahora = time.time()
+        con = self._conexion()
+        with con:
+            con.execute(
+                "INSERT OR REPLACE INTO entradas VALUES (?, ?, ?, ?, ?)",
+                (clave, sqlite3.Binary(datos), len(datos), ahora + ttl if ttl else None, ahora)
+            )
+            self._recortar(con, ahora)
+
+    def _recortar(self, con, ahora):
+        con.execute("DELETE FROM entradas WHERE expira IS NOT NULL AND expira < ?", (ahora,))
+        total = con.execute("SELECT coalesce(sum(bytes), 0) FROM entradas").fetchone()[0]
+        if total <= self.tamano_maximo:
+            return
+        for clave, tamano in con.execute("SELECT clave, bytes FROM entradas ORDER BY usado").fetchall():
+            if total <= self.tamano_maximo:
+                break
+            con.execute("DELETE FROM entradas WHERE clave = ?", (clave,))
+            total -= tamano
+
+    def obtener_o_calcular(self, clave, calcular, ttl=None):
+        """
+        Valor de la clave, calculándolo y guardándolo si no está.
+
+        Mientras un proceso calcula una clave, los demás que la piden esperan
+        y luego leen el resultado en vez de calcularlo otra vez.
+        """
+        faltante = object()
+        valor = self.obtener(clave, faltante)
+        if valor is not faltante:
+            return valor
+        with self._bloqueo(clave):
+            valor = self.obtener(clave, faltante)
+            if valor is faltante:
+                valor = calcular()
+                self.guardar(clave, valor, ttl)
+        return valor
+
+    def _bloqueo(self, clave):
+        return BloqueoArchivo(os.path.join(
+            self._bloqueos, hashlib.blake2b(clave.encode('utf-8'), digest_size=8).hexdigest() + '.lock'
+        ))
+
+    def figura(self, clave, crear, ttl=None):
+        """
+        Gráfico Plotly guardado como JSON.
+
+        crear() arma la figura (o devuelve None); los demás procesos solo la
+        deserializan, sin repetir las agregaciones.
+        """
+        def crear_json():
+            fig = crear()
+            return fig.to_json() if fig is not None else None
+
+        json_figura = self.obtener_o_calcular(clave, crear_json, ttl)
+        return pio.from_json(json_figura, skip_invalid=True) if json_figura is not None else None
+
+
+class BloqueoArchivo:
+    """Bloqueo exclusivo entre procesos sobre un archivo (y entre hilos del mismo proceso)"""
+
+    _hilos = {}
+    _candado = threading.Lock()
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with self._candado:
+            self._hilo = self._hilos.setdefault(ruta, threading.Lock())
+
+    def __enter__(self):
+        self._hilo.acquire()
+        self._archivo = open(self.ruta, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._archivo, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *excepcion):
+        if fcntl is not None:
+            fcntl.flock(self._archivo, fcntl.LOCK_UN)
+        self._archivo.close()
+        self._hilo.release()
+
+
+def armar_clave(*partes):
+    """Clave de texto a partir de valores simples (nombre, ruta, versión, parámetros, ...)"""
+    return '|'.join(map(str, partes))
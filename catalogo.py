@@ -0,0 +1,217 @@
+"""
+Catálogo de esquemas de los archivos tabulares del Data Lake.
+
+Cada archivo .csv/.xlsx del inventario se abre en un pool de procesos para
+registrar sus hojas, cantidad de filas y columnas, y el tipo inferido y la
+proporción de nulos de cada columna. Las planillas se leen en modo de solo
+lectura (fila a fila, sin cargar el libro completo en memoria) y los CSV por
+bloques. Los perfiles se guardan en una caché persistente indexada por
+(ruta, fecha de modificación, tamaño), así que solo se vuelven a abrir los
+archivos que cambiaron.
+"""
+import csv
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+import datos
+
+RUTA_CACHE_PERFILES = 'cache/perfiles_archivos.parquet'
+
+EXTENSIONES_TABULARES = ['.csv', '.xlsx', '.xlsm']
+
+# Filas por bloque al leer un CSV
+TAMANO_BLOQUE_CSV = 50_000
+
+# Filas usadas para inferir el tipo de cada columna (los nulos se cuentan en todas)
+FILAS_INFERENCIA = 10_000
+
+COLUMNAS_CATALOGO = ['ruta', 'mtime_ns', 'tamano', 'hoja', 'filas', 'columnas',
+                     'columna', 'posicion', 'tipo', 'nulos', 'error']
+
+# Caché de perfiles: filas del catálogo con la (ruta, mtime_ns, tamano) del archivo perfilado
+TIPOS_CACHE_PERFILES = {**dict.fromkeys(COLUMNAS_CATALOGO, object), 'mtime_ns': 'int64', 'tamano': 'int64'}
+
+
+class _PerfilColumnas:
+    """Acumula, fila a fila o por bloques, los tipos observados y los nulos de cada columna"""
+
+    def __init__(self, nombres):
+        self.nombres = nombres
+        self.filas = 0
+        self.nulos = np.zeros(len(nombres), dtype=np.int64)
+        self.tipos = [set() for _ in nombres]
+
+    def agregar_fila(self, valores):
+        self.filas += 1
+        inferir = self.filas <= FILAS_INFERENCIA
+        for i in range(len(self.nombres)):
+            valor = valores[i] if i < len(valores) else None
+            if valor is None or valor == '':
+                self.nulos[i] += 1
+            elif inferir:
+                self.tipos[i].add(_tipo_valor(valor))
+
+    def agregar_bloque(self, bloque):
+        inferir = max(0, FILAS_INFERENCIA - self.filas)
+        self.filas += len(bloque)
+        self.nulos += bloque.isna().sum().to_numpy()
+        if inferir:
+            muestra = bloque.head(inferir)
+            for i, col in enumerate(muestra.columns):
+                valores = muestra[col].dropna()
+                if len(valores):
+                    self.tipos[i].add(_tipo_serie(valores))
+
+    def filas_catalogo(self, hoja):
+        tipos = [_tipo_comun(t) for t in self.tipos]
+        return [
+            {'hoja': hoja, 'filas': self.filas, 'columnas': len(self.nombres), 'columna': str(nombre),
+             'posicion': i, 'tipo': tipos[i], 'nulos': float(self.nulos[i] / self.filas) if self.filas else 1.0}
+            for i, nombre in enumerate(self.nombres)
+        ] or [{'hoja': hoja, 'filas': self.filas, 'columnas': 0}]
+
+
+def _tipo_valor(valor):
+    """Tipo lógico de un valor leído de una planilla"""
+    if isinstance(valor, bool):
+        return 'booleano'
+    if isinstance(valor, int):
+        return 'entero'
+    if isinstance(valor, float):
+        return 'entero' if valor.is_integer() else 'decimal'
+    if isinstance(valor, (datetime.datetime, datetime.date, datetime.time)):
+        return 'fecha'
+    return 'texto'
+
+
+def _tipo_serie(valores):
+    """Tipo lógico de una columna de texto leída de un CSV"""
+    numeros = pd.to_numeric(valores, errors='coerce')
+    if numeros.notna().all():
+        return 'entero' if (numeros % 1 == 0).all() else 'decimal'
+    if valores.str.lower().isin(['true', 'false', 'verdadero', 'falso']).all():
+        return 'booleano'
+    if pd.to_datetime(valores, errors='coerce', format='mixed').notna().all():
+        return 'fecha'
+    return 'texto'
+
+
+def _tipo_comun(tipos):
+    """Tipo de una columna a partir de los tipos observados en sus valores"""
+    if not tipos:
+        return 'vacía'
+    if tipos == {'entero', 'decimal'}:
+        return 'decimal'
+    return tipos.pop() if len(tipos) == 1 else 'mixto'
+
+
+def _perfilar_xlsx(ruta):
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        perfil = []
+        for hoja in libro.worksheets:
+            filas = hoja.iter_rows(values_only=True)
+            # La primera fila con algún valor se toma como encabezado
+            encabezado = next((f for f in filas if any(v is not None for v in f)), ())
+            while encabezado and encabezado[-1] is None:
+                encabezado = encabezado[:-1]
+            columnas = _PerfilColumnas([v if v is not None else f"Columna {i + 1}" for i, v in enumerate(encabezado)])
+            for fila in filas:
+                if any(v is not None for v in fila):
+                    columnas.agregar_fila(fila)
+            perfil.extend(columnas.filas_catalogo(hoja.title))
+        return perfil
+    finally:
+        libro.close()
+
+
+def _perfilar_csv(ruta):
+    with open(ruta, 'rb') as f:
+        inicio = f.read(64 * 1024)
+    try:
+        codificacion = 'utf-8'
+        texto = inicio.decode(codificacion)
+    except UnicodeDecodeError:
+        codificacion = 'latin-1'
+        texto = inicio.decode(codificacion)
+    try:
+        separador = csv.Sniffer().sniff(texto, delimiters=',;\t|^').delimiter
+    except csv.Error:
+        separador = ','
+
+    bloques = pd.read_csv(
+        ruta, sep=separador, encoding=codificacion, dtype=str, keep_default_na=True,
+        chunksize=TAMANO_BLOQUE_CSV, on_bad_lines='skip'
+    )
+    columnas = None
+    for bloque in bloques:
+        if columnas is None:
+            columnas = _PerfilColumnas(list(bloque.columns))
+        columnas.agregar_bloque(bloque)
+    return columnas.filas_catalogo(None) if columnas is not None else [{'hoja': None, 'filas': 0, 'columnas': 0}]
+
+
+def perfilar_archivo(ruta):
+    """
+    Perfil de un archivo tabular: una fila por (hoja, columna) con su tipo y proporción de nulos.
+
+    Si el archivo no se puede leer, devuelve una sola fila con el error.
+    """
+    try:
+        if os.path.splitext(ruta)[1].lower() == '.csv':
+            return _perfilar_csv(ruta)
+        return _perfilar_xlsx(ruta)
+    except Exception as error:
+        # Archivos corruptos, protegidos o con formato inesperado no deben detener el catálogo
+        return [{'error': f"{type(error).__name__}: {error}"[:300]}]
+
+
+def perfilar_archivos(rutas, procesos=None):
+    """Perfiles de varios archivos, en paralelo cuando son suficientes para justificarlo"""
+    return datos.mapear_en_procesos(perfilar_archivo, rutas, procesos)
+
+
+def catalogo_esquemas(df, raiz=datos.RUTA_DATA_LAKE, ruta_cache=RUTA_CACHE_PERFILES, procesos=None):
+    """
+    Catálogo de esquemas de los archivos tabulares del inventario.
+
+    Devuelve un DataFrame con una fila por (archivo, hoja, columna) y la
+    fila del inventario de cada archivo en 'fila', y la cantidad de archivos
+    tabulares que no se encontraron en disco.
+    """
+    filas = np.flatnonzero(df['extension'].astype(object).str.lower().isin(EXTENSIONES_TABULARES).to_numpy())
+    relativas = datos.ruta_relativa(df.iloc[filas]).astype(object).to_numpy()
+    locales = np.array([datos.ruta_local(r, raiz) for r in relativas], dtype=object)
+    mtimes, tamanos = datos.estado_archivos(locales)
+    encontrados = tamanos >= 0
+    archivos = pd.DataFrame({
+        'fila': filas[encontrados], 'ruta': locales[encontrados],
+        'mtime_ns': mtimes[encontrados], 'tamano': tamanos[encontrados]
+    })
+
+    # Perfiles ya conocidos para archivos que no cambiaron; el resto se abre
+    cache = datos.leer_cache_parquet(ruta_cache, TIPOS_CACHE_PERFILES)
+    claves = ['ruta', 'mtime_ns', 'tamano']
+    vigentes = cache.merge(archivos[claves].drop_duplicates(), on=claves)
+    pendientes = archivos[~archivos.set_index(claves).index.isin(vigentes.set_index(claves).index)]
+    pendientes = pendientes.drop_duplicates('ruta')
+    if len(pendientes):
+        perfiles = perfilar_archivos(pendientes['ruta'], procesos)
+        nuevos = pd.DataFrame([
+            {'ruta': ruta, 'mtime_ns': mtime, 'tamano': tamano, **fila}
+            for ruta, mtime, tamano, perfil in zip(pendientes['ruta'], pendientes['mtime_ns'], pendientes['tamano'], perfiles)
+            for fila in perfil
+        ], columns=COLUMNAS_CATALOGO)
+        vigentes = pd.concat([vigentes, nuevos], ignore_index=True)
+        # Se descartan los perfiles de versiones anteriores de los archivos reabiertos
+        cache = pd.concat([cache[~cache['ruta'].isin(nuevos['ruta'])], nuevos], ignore_index=True)
+        datos.guardar_cache_parquet(cache.astype({'mtime_ns': 'int64', 'tamano': 'int64'}), ruta_cache)
+
+    catalogo = archivos[['fila', 'ruta', 'mtime_ns', 'tamano']].merge(vigentes, on=claves)
+    catalogo = catalogo.drop(columns=['mtime_ns', 'tamano']).sort_values(['fila', 'hoja', 'posicion'], na_position='first')
+    return catalogo.reset_index(drop=True), int((~encontrados).sum())
@@ -0,0 +1,172 @@
+"""
+Clasificación de las rutas del inventario según taxonomías configurables.
+
+Las taxonomías (dimensión, ámbito, indicador, método, facultad, ...) se
+definen en data/taxonomias.json. La unión de todas las reglas de todas las
+taxonomías se compila en un autómata RE2 (vía Arrow) que descarta en una
+pasada los textos donde no calza ninguna regla; solo los restantes se
+recorren con la expresión de Python de cada taxonomía, que identifica qué
+regla calza. Cada taxonomía tiene su propia expresión, así que las reglas de
+una nunca ocultan a las de otra. Además se clasifica cada directorio y cada
+nombre de archivo distinto una sola vez, no cada fila.
+
+Las reglas pueden traer ejemplos: al cargar las taxonomías se comprueba que
+cada regla calce con todos sus ejemplos, tanto en Python como en RE2, para
+que una regla que nunca calza (p. ej. por un límite de palabra mal puesto)
+se detecte al cargarla y no como una columna vacía en el dashboard.
+"""
+import json
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from arbol_directorios import SEPARADOR
+
+RUTA_TAXONOMIAS = 'data/taxonomias.json'
+
+
+def _verificar_ejemplos(columna, patron, ejemplos):
+    """Lanza ValueError si la regla no calza con alguno de sus ejemplos (en Python o en RE2)"""
+    if not ejemplos:
+        return
+    fallan = [e for e in ejemplos if not re.search(patron, e)]
+    try:
+        calza_re2 = pc.match_substring_regex(pa.array(ejemplos), patron).to_pylist()
+        fallan += [e for e, calza in zip(ejemplos, calza_re2) if not calza and e not in fallan]
+    except pa.ArrowInvalid:
+        # Patrón sin equivalente en RE2: esa regla queda fuera del prefiltro, no es un error
+        pass
+    if fallan:
+        raise ValueError(f"La regla '{patron}' de la taxonomía '{columna}' no calza con sus ejemplos: {fallan}")
+
+
+class ClasificadorRutas:
+    """Reglas compiladas: una expresión por taxonomía y la unión de todas como prefiltro RE2"""
+
+    def __init__(self, taxonomias):
+        self.taxonomias = taxonomias
+        # Por regla (en orden de prioridad): índice de su taxonomía y valor asignado
+        self._taxonomia_regla = []
+        self._valor_regla = []
+        # Expresión que extrae el valor del texto encontrado (reglas con valor null)
+        self._extraer_regla = []
+        patrones = []
+        # Por taxonomía: expresión con sus reglas sin grupos, nombre de grupo -> regla, y reglas sueltas
+        self._expresiones = []
+        for t, taxonomia in enumerate(taxonomias):
+            alternativas, grupos, sueltas = [], {}, []
+            for regla in taxonomia['reglas']:
+                patron = regla['patron'] if 'patron' in regla else re.escape(regla['texto'])
+                try:
+                    compilado = re.compile(patron)
+                    extraer = re.compile(regla['extraer']) if 'extraer' in regla else None
+                except re.error as error:
+                    raise ValueError(f"Patrón inválido en la taxonomía '{taxonomia['columna']}': {patron} ({error})")
+                _verificar_ejemplos(taxonomia['columna'], patron, regla.get('ejemplos', []))
+                i = len(patrones)
+                if compilado.groups:
+                    # Con grupos propios (p. ej. referencias \1), envolverla en otro grupo cambiaría su numeración
+                    sueltas.append((i, compilado))
+                else:
+                    alternativas.append(f"(?P<r{i}>{patron})")
+                    grupos[f"r{i}"] = i
+                patrones.append(patron)
+                self._taxonomia_regla.append(t)
+                self._valor_regla.append(regla.get('valor'))
+                self._extraer_regla.append(extraer)
+
+            # La búsqueda anticipada deja la coincidencia en largo cero: se prueban
+            # todas las posiciones. En cada una gana la primera alternativa que
+            # calce, que es la regla de mayor prioridad de la taxonomía ahí
+            expresion = re.compile(f"(?=(?:{'|'.join(alternativas)}))") if alternativas else None
+            self._expresiones.append((expresion, grupos, sueltas))
+
+        # Unión de todas las reglas para el prefiltro RE2 (se omite si algún patrón no es compatible)
+        self._union = '|'.join(f"(?:{patron})" for patron in patrones) or None
+        if self._union:
+            try:
+                pc.match_substring_regex(pa.array(['']), self._union)
+            except pa.ArrowInvalid:
+                self._union = None
+
+    def _clasificar_textos(self, textos):
+        """
+        Mejor regla de cada taxonomía para cada texto.
+
+        Devuelve dos matrices (texto x taxonomía): el índice de la regla
+        ganadora (len(reglas) si ninguna calza) y el valor asignado.
+        """
+        sin_regla = len(self._valor_regla)
+        reglas = np.full((len(textos), len(self.taxonomias)), sin_regla, dtype=np.int32)
+        valores = np.full((len(textos), len(self.taxonomias)), None, dtype=object)
+        if not self._valor_regla:
+            return reglas, valores
+
+        candidatos = range(len(textos))
+        if self._union and len(textos):
+            calza = pc.match_substring_regex(pa.array(textos, type=pa.large_string()), self._union)
+            candidatos = np.flatnonzero(calza.to_numpy(zero_copy_only=False))
+
+        for i in candidatos:
+            texto = textos[i]
+            for t, (expresion, grupos, sueltas) in enumerate(self._expresiones):
+                coincidencias = []
+                if expresion is not None:
+                    coincidencias.extend(
+                        (grupos[c.lastgroup], c.group(c.lastgroup)) for c in expresion.finditer(texto)
+                    )
+                for regla, compilado in sueltas:
+                    coincidencia = compilado.search(texto)
+                    if coincidencia:
+                        coincidencias.append((regla, coincidencia.group(0)))
+                if not coincidencias:
+                    continue
+                regla, encontrado = min(coincidencias, key=lambda c: c[0])
+                reglas[i, t] = regla
+                valores[i, t] = self._valor(regla, encontrado)
+        return reglas, valores
+
+    def _valor(self, regla, encontrado):
+        """Valor que asigna una regla: el fijo o, si es null, el texto encontrado (o la parte indicada en 'extraer')"""
+        valor = self._valor_regla[regla]
+        if valor is not None:
+            return valor
+        extraer = self._extraer_regla[regla]
+        extraido = extraer.search(encontrado) if extraer is not None else None
+        return extraido.group(0) if extraido else encontrado
+
+    def clasificar(self, rutas):
+        """
+        Etiquetas de cada taxonomía para una serie de rutas relativas (directorio + nombre).
+
+        Devuelve un DataFrame con una columna categórica por taxonomía, con el
+        mismo índice que rutas. Cuando calzan reglas tanto en el directorio
+        como en el nombre del archivo, gana la de mayor prioridad.
+        """
+        rutas = pd.Series(rutas, dtype=object).fillna('')
+        partes = rutas.str.rpartition(SEPARADOR)
+        codigos_dir, directorios = pd.factorize(partes[0])
+        codigos_nom, nombres = pd.factorize(partes[2])
+
+        # El separador final permite anclar reglas a componentes completos del directorio
+        reglas_dir, valores_dir = self._clasificar_textos([f"{d}{SEPARADOR}" if d else '' for d in directorios])
+        reglas_nom, valores_nom = self._clasificar_textos(list(nombres))
+        reglas_dir, valores_dir = reglas_dir[codigos_dir], valores_dir[codigos_dir]
+        reglas_nom, valores_nom = reglas_nom[codigos_nom], valores_nom[codigos_nom]
+
+        etiquetas = {}
+        for t, taxonomia in enumerate(self.taxonomias):
+            valores = np.where(reglas_nom[:, t] < reglas_dir[:, t], valores_nom[:, t], valores_dir[:, t])
+            etiquetas[taxonomia['columna']] = pd.Categorical(
+                pd.Series(valores, dtype=object).fillna(taxonomia['defecto'])
+            )
+        return pd.DataFrame(etiquetas, index=rutas.index)
+
+
+def cargar_clasificador(ruta=RUTA_TAXONOMIAS):
+    """Clasificador compilado a partir del archivo de taxonomías"""
+    with open(ruta, encoding='utf-8') as f:
+        return ClasificadorRutas(json.load(f)['taxonomias'])
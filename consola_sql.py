@@ -0,0 +1,264 @@
+"""
+Consola SQL de solo lectura sobre los archivos del Data Lake.
+
+Cada consulta corre en una conexión DuckDB propia y restringida: solo se
+permite una sentencia SELECT, solo se pueden leer archivos dentro de la
+carpeta del Data Lake, la memoria y los hilos están acotados, la
+configuración queda bloqueada y la consulta se interrumpe al superar el
+tiempo máximo. El resultado se entrega por lotes Arrow y se limita a una
+cantidad máxima de filas. Los resultados recientes se guardan en una caché
+indexada por el SQL normalizado; lo que se ejecuta es siempre el texto original.
+
+La consola solo se habilita si RUTA_DATA_LAKE se definió explícitamente y
+apunta a una carpeta fuera de la aplicación: con la carpeta de trabajo como
+raíz se podrían leer las credenciales o las cachés del servidor.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import duckdb
+import pyarrow as pa
+
+import datos
+
+LIMITE_FILAS = 10_000
+TIEMPO_MAXIMO = 30  # segundos
+MEMORIA_MAXIMA = '1GB'
+HILOS = 2
+FILAS_POR_LOTE = 2_000
+
+# Lector de DuckDB según la extensión del archivo
+LECTORES = {
+    '.csv': 'read_csv_auto',
+    '.txt': 'read_csv_auto',
+    '.parquet': 'read_parquet',
+    '.xlsx': 'read_xlsx',
+}
+
+PATRON_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+# Apertura de una cadena $$...$$ o $etiqueta$...$etiqueta$
+PATRON_DOLAR = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)?\$")
+
+# Carpeta de la aplicación (código, credenciales y cachés): la consola nunca puede leer en ella
+DIRECTORIO_APP = os.path.dirname(os.path.abspath(__file__))
+
+
+def raiz_consola(raiz=None):
+    """
+    Carpeta que la consola puede leer, o None si la consola debe quedar deshabilitada.
+
+    Sin argumento se usa la variable de entorno RUTA_DATA_LAKE (no su valor
+    por defecto). La carpeta debe existir y no puede estar dentro de la
+    aplicación ni contenerla.
+    """
+    if raiz is None:
+        raiz = os.environ.get('RUTA_DATA_LAKE')
+    if not raiz:
+        return None
+    raiz = os.path.realpath(raiz)
+    app = os.path.realpath(DIRECTORIO_APP)
+    if not os.path.isdir(raiz) or os.path.commonpath([raiz, app]) in (raiz, app):
+        return None
+    return raiz
+
+
+def _largo_citado(texto):
+    """Largo de la cadena o identificador entre comillas con que empieza texto (0 si no empieza con uno)"""
+    dolar = PATRON_DOLAR.match(texto)
+    if dolar:
+        fin = texto.find(dolar.group(0), dolar.end())
+        return len(texto) if fin < 0 else fin + len(dolar.group(0))
+    # Prefijos como E'...', X'...' o B'...'
+    prefijo = 0
+    while prefijo < len(texto) and texto[prefijo].isalpha():
+        prefijo += 1
+    if prefijo == len(texto) or texto[prefijo] not in "'\"":
+        return 0
+    comilla = texto[prefijo]
+    escapes = texto[:prefijo].lower() == 'e'
+    i = prefijo + 1
+    while i < len(texto):
+        if escapes and texto[i] == '\\':
+            i += 2
+        elif texto[i] == comilla:
+            # Comilla doble dentro de la cadena: ''
+            if texto[i + 1:i + 2] != comilla:
+                return i + 1
+            i += 2
+        else:
+            i += 1
+    return len(texto)
+
+
+def normalizar_sql(sql):
+    """
+    SQL sin comentarios, con los espacios colapsados, palabras clave en minúsculas y sin ';' final.
+
+    Dos consultas que solo difieren en formato entre tokens tienen la misma
+    forma normalizada; las cadenas, las cadenas $$...$$ y los identificadores
+    entre comillas se conservan tal cual, así que consultas distintas nunca
+    comparten la forma. Solo sirve como clave de la caché: nunca se ejecuta.
+    """
+    # Las posiciones de los tokens son en bytes UTF-8
+    codificado = sql.encode('utf-8')
+    tokens = duckdb.tokenize(sql)
+    partes = []
+    for i, (inicio, tipo) in enumerate(tokens):
+        fin = tokens[i + 1][0] if i + 1 < len(tokens) else len(codificado)
+        texto = codificado[inicio:fin].decode('utf-8')
+        # El texto llega hasta el próximo token: incluye los espacios y comentarios que lo siguen
+        largo = _largo_citado(texto) if tipo in (duckdb.token_type.string_const, duckdb.token_type.identifier) else 0
+        citado, texto = texto[:largo], texto[largo:]
+        texto = ' '.join(PATRON_COMENTARIOS.sub(' ', texto).split())
+        if tipo == duckdb.token_type.keyword:
+            texto = texto.lower()
+        partes.append(citado + texto)
+    partes = [p for p in partes if p]
+    if partes and partes[-1] == ';':
+        partes.pop()
+    return ' '.join(partes)
+
+
+def quitar_punto_y_coma(sql):
+    """Texto original de la consulta sin el ';' final (ni lo que lo sigue, que solo pueden ser comentarios)"""
+    codificado = sql.encode('utf-8')
+    tokens = duckdb.tokenize(sql)
+    if tokens and tokens[-1][1] == duckdb.token_type.operator and codificado[tokens[-1][0]:].startswith(b';'):
+        codificado = codificado[:tokens[-1][0]]
+    return codificado.decode('utf-8')
+
+
+def validar_consulta(sql):
+    """Acepta solo una sentencia SELECT (sin escritura, ATTACH, COPY, SET, ...)"""
+    try:
+        sentencias = duckdb.extract_statements(sql)
+    except duckdb.Error as error:
+        raise ValueError(f"SQL inválido: {error}")
+    if len(sentencias) != 1:
+        raise ValueError("Se permite una sola consulta por ejecución.")
+    if sentencias[0].type != duckdb.StatementType.SELECT:
+        raise ValueError("Solo se permiten consultas SELECT.")
+
+
+def consulta_para_archivo(ruta_local, limite=100):
+    """Consulta de ejemplo para leer un archivo del Data Lake (None si su formato no es legible)"""
+    lector = LECTORES.get(os.path.splitext(ruta_local)[1].lower())
+    if lector is None:
+        return None
+    ruta = ruta_local.replace("'", "''")
+    return f"SELECT *\nFROM {lector}('{ruta}')\nLIMIT {limite}"
+
+
+def conectar(archivos=None, raiz=None):
+    """
+    Conexión restringida para una consulta.
+
+    archivos (tabla Arrow o DataFrame) queda disponible como la tabla 'archivos'.
+    Lanza PermissionError si la raíz no cumple las condiciones de raiz_consola.
+    """
+    raiz = raiz_consola(raiz)
+    if raiz is None:
+        raise PermissionError(
+            "La consola SQL está deshabilitada: RUTA_DATA_LAKE debe apuntar a una carpeta fuera de la aplicación."
+        )
+    con = duckdb.connect(config={'memory_limit': MEMORIA_MAXIMA, 'threads': HILOS})
+    try:
+        # Lectura de planillas; si la extensión no está instalada, read_xlsx no existirá
+        con.execute("LOAD excel")
+    except duckdb.Error:
+        pass
+    if archivos is not None:
+        con.register('archivos', archivos)
+    con.execute("SET file_search_path = ?", [raiz])
+    con.execute("SET allowed_directories = ?", [[raiz + os.sep]])
+    con.execute("SET enable_external_access = false")
+    con.execute("SET lock_configuration = true")
+    return con
+
+
+def ejecutar_consulta(sql, archivos=None, al_recibir_lote=None, limite=LIMITE_FILAS,
+                      tiempo_maximo=TIEMPO_MAXIMO, raiz=None):
+    """
+    Ejecuta una consulta leyendo el resultado por lotes Arrow a medida que DuckDB los produce.
+
+    al_recibir_lote(lote, filas_acumuladas) se llama con cada lote, para ir
+    mostrando el resultado sin esperar a que termine. Devuelve la tabla Arrow
+    (a lo más `limite` filas) y si el resultado se truncó. Lanza ValueError si
+    la consulta no está permitida y TimeoutError si supera tiempo_maximo segundos.
+    """
+    validar_consulta(sql)
+    # Se ejecuta el texto del usuario; solo se quita el ';' final para poder anidarlo
+    sql = quitar_punto_y_coma(sql)
+    con = conectar(archivos, raiz)
+    temporizador = threading.Timer(tiempo_maximo, con.interrupt)
+    temporizador.start()
+    try:
+        # Se pide una fila de más para saber si el resultado se truncó
+        lector = con.execute(
+            # Saltos de línea: un comentario '--' al final de la consulta no anula el cierre
+            f"SELECT * FROM (\n{sql}\n) AS consulta LIMIT {int(limite) + 1}"
+        ).fetch_record_batch(FILAS_POR_LOTE)
+        lotes, filas, truncado = [], 0, False
+        for lote in lector:
+            if filas + lote.num_rows > limite:
+                lote, truncado = lote.slice(0, limite - filas), True
+            lotes.append(lote)
+            filas += lote.num_rows
+            if al_recibir_lote is not None and lote.num_rows:
+                al_recibir_lote(lote, filas)
+            if truncado:
+                break
+        return pa.Table.from_batches(lotes, schema=lector.schema), truncado
+    except duckdb.InterruptException:
+        raise TimeoutError(f"La consulta superó el tiempo máximo de {tiempo_maximo} segundos.")
+    finally:
+        temporizador.cancel()
+        con.close()
+
+
+class CacheResultados:
+    """Resultados recientes (tablas Arrow) indexados por SQL normalizado, acotados en cantidad y bytes"""
+
+    def __init__(self, max_entradas=32, max_bytes=256 * 1024 ** 2):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._resultados = OrderedDict()
+        self._bytes = 0
+        self._candado = threading.Lock()
+
+    def obtener(self, clave):
+        with self._candado:
+            if clave not in self._resultados:
+                return None
+            self._resultados.move_to_end(clave)
+            return self._resultados[clave]
+
+    def guardar(self, clave, tabla, truncado):
+        if tabla.nbytes > self.max_bytes:
+            return
+        with self._candado:
+            if clave in self._resultados:
+                self._bytes -= self._resultados.pop(clave)[0].nbytes
+            self._resultados[clave] = (tabla, truncado)
+            self._bytes += tabla.nbytes
+            while len(self._resultados) > self.max_entradas or self._bytes > self.max_bytes:
+                antigua, _ = self._resultados.popitem(last=False)
+                self._bytes -= antigua.nbytes
+
+
+def tabla_archivos(df, raiz=None):
+    """Tabla 'archivos' de la consola: el inventario con la ruta local de cada archivo"""
+    relativas = datos.ruta_relativa(df).astype(str)
+    raiz = raiz_consola(raiz) or os.path.abspath(datos.RUTA_DATA_LAKE)
+    return pa.table({
+        'id': pa.array(range(len(df)), type=pa.int64()),
+        'nombre': pa.array(df['nombre'].astype(str)),
+        'extension': pa.array(df['extension'].astype(str)),
+        'dimension': pa.array(df['dimensiones'].astype(str)),
+        'categoria': pa.array(df['categoria'].astype(str)),
+        'bytes': pa.array(df['bytes'], type=pa.int64(), from_pandas=True),
+        'fecha_modificacion': pa.array(df['fecha_modificacion']),
+        'ruta': pa.array([datos.ruta_local(r, raiz) for r in relativas])
+    })
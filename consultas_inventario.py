@@ -0,0 +1,160 @@
+"""
+Consultas SQL (DuckDB) sobre el inventario del Data Lake.
+
+El inventario compacto se carga una vez en una tabla DuckDB (almacenamiento
+columnar comprimido) compartida por todas las sesiones. Filtros, orden y
+paginación se ejecutan en DuckDB, de modo que al dashboard solo llegan las
+filas de la página visible.
+"""
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+TABLA_INVENTARIO = 'inventario'
+TABLA_DIRECTORIOS = 'directorios'
+
+# Expresiones de orden; se evitan los NULL para que la paginación por clave sea estable
+ORDENES = {
+    'Nombre': "coalesce(nombre, '')",
+    'Tamaño': "coalesce(bytes, -1)",
+    'Fecha de modificación': "coalesce(fecha_modificacion, TIMESTAMP '1900-01-01')",
+    'Extensión': "coalesce(extension::VARCHAR, '')",
+    'Dimensión': "coalesce(dimensiones::VARCHAR, '')",
+}
+
+COLUMNAS_PAGINA = ['id', 'nombre', 'extension', 'bytes', 'fecha_modificacion', 'categoria', 'dimensiones', 'nodo']
+
+# Columnas de una exportación del inventario filtrado
+COLUMNAS_EXPORTACION = [
+    'nombre', 'directorio', 'extension::VARCHAR AS extension', 'bytes', 'fecha_creacion',
+    'fecha_modificacion', 'categoria::VARCHAR AS categoria', 'dimensiones::VARCHAR AS dimensiones'
+]
+
+
+def crear_conexion(df):
+    """
+    Conexión DuckDB en memoria con el inventario cargado en la tabla 'inventario'.
+
+    Se agrega la columna 'id' (posición de la fila) como desempate del orden,
+    y la tabla 'directorios' con la ruta de cada nodo del árbol (para exportar).
+    La conexión es compartida: cada consulta debe usar su propio cursor().
+    """
+    sin_attrs = df.copy(deep=False)
+    sin_attrs.attrs = {}
+    tabla = pa.Table.from_pandas(sin_attrs, preserve_index=False)
+    tabla = tabla.append_column('id', pa.array(range(len(df)), type=pa.int64()))
+
+    con = duckdb.connect()
+    # Los objetos registrados solo son visibles en esta conexión, no en sus cursores
+    con.register('inventario_arrow', tabla)
+    con.execute(f"CREATE TABLE {TABLA_INVENTARIO} AS SELECT * FROM inventario_arrow")
+    con.unregister('inventario_arrow')
+
+    arbol = df.attrs.get('arbol')
+    nodos = np.arange(len(arbol) if arbol is not None else 0)
+    directorios = pa.table({
+        'nodo': pa.array(nodos, type=pa.int32()),
+        'directorio': pa.array(arbol.rutas(nodos) if len(nodos) else [], type=pa.string())
+    })
+    con.register('directorios_arrow', directorios)
+    con.execute(f"CREATE TABLE {TABLA_DIRECTORIOS} AS SELECT * FROM directorios_arrow")
+    con.unregister('directorios_arrow')
+    return con
+
+
+def construir_filtros(filtros):
+    """
+    Traduce los filtros del explorador a una cláusula WHERE parametrizada.
+
+    filtros admite: 'extensiones', 'dimensiones', 'categorias' (listas),
+    'desde', 'hasta' (fechas de modificación) y 'nombre' (subcadena, sin
+    distinguir mayúsculas).
+    """
+    condiciones, parametros = [], []
+    if filtros.get('extensiones'):
+        condiciones.append("list_contains(?, extension::VARCHAR)")
+        parametros.append(list(filtros['extensiones']))
+    if filtros.get('dimensiones'):
+        condiciones.append("list_contains(?, dimensiones::VARCHAR)")
+        parametros.append(list(filtros['dimensiones']))
+    if filtros.get('categorias'):
+        condiciones.append("list_contains(?, categoria::VARCHAR)")
+        parametros.append(list(filtros['categorias']))
+    if filtros.get('desde'):
+        condiciones.append("fecha_modificacion >= CAST(? AS TIMESTAMP)")
+        parametros.append(str(filtros['desde']))
+    if filtros.get('hasta'):
+        # Incluye todo el día indicado
+        condiciones.append("fecha_modificacion < CAST(? AS TIMESTAMP) + INTERVAL 1 DAY")
+        parametros.append(str(filtros['hasta']))
+    if filtros.get('nombre'):
+        condiciones.append("contains(lower(nombre), lower(?))")
+        parametros.append(filtros['nombre'])
+
+    where = ' AND '.join(condiciones) if condiciones else 'TRUE'
+    return where, parametros
+
+
+def contar_archivos(con, filtros):
+    """Cantidad de archivos y bytes totales que cumplen los filtros"""
+    where, parametros = construir_filtros(filtros)
+    return con.cursor().execute(
+        f"SELECT count(*), coalesce(sum(bytes), 0) FROM {TABLA_INVENTARIO} WHERE {where}",
+        parametros
+    ).fetchone()
+
+
+def pagina_archivos(con, filtros, orden='Nombre', descendente=False, despues_de=None, tamano_pagina=50):
+    """
+    Una página del inventario filtrado y ordenado, usando paginación por clave.
+
+    despues_de es la clave (valor de orden, id) de la última fila de la página
+    anterior; así cada página cuesta lo mismo sin importar cuán lejos se
+    navegue. Devuelve la página y la clave de su última fila (None si no hay más).
+    """
+    where, parametros = construir_filtros(filtros)
+    clave = ORDENES[orden]
+    direccion = 'DESC' if descendente else 'ASC'
+
+    if despues_de is not None:
+        comparador = '<' if descendente else '>'
+        where = f"({where}) AND ({clave}, id) {comparador} (?, ?)"
+        parametros = parametros + list(despues_de)
+
+    pagina = con.cursor().execute(
+        f"""
+        SELECT {', '.join(COLUMNAS_PAGINA)}, {clave} AS clave_orden
+        FROM {TABLA_INVENTARIO}
+        WHERE {where}
+        ORDER BY clave_orden {direccion}, id {direccion}
+        LIMIT {int(tamano_pagina) + 1}
+        """,
+        parametros
+    ).df()
+
+    # Se pide una fila extra solo para saber si hay una página siguiente
+    hay_mas = len(pagina) > tamano_pagina
+    pagina = pagina.head(tamano_pagina)
+    siguiente = None
+    if hay_mas:
+        # tolist() entrega valores Python, que DuckDB acepta como parámetros
+        siguiente = (pagina['clave_orden'].tolist()[-1], pagina['id'].tolist()[-1])
+    return pagina.drop(columns='clave_orden'), siguiente
+
+
+def consulta_exportacion(filtros, orden='Nombre', descendente=False):
+    """
+    Consulta (SQL y parámetros) con todas las filas del inventario filtrado, en el orden del explorador.
+
+    Incluye el directorio de cada archivo; está pensada para COPY, que la
+    escribe a disco por bloques sin traerla completa a Python.
+    """
+    where, parametros = construir_filtros(filtros)
+    direccion = 'DESC' if descendente else 'ASC'
+    consulta = f"""
+        SELECT {', '.join(COLUMNAS_EXPORTACION)}
+        FROM {TABLA_INVENTARIO} LEFT JOIN {TABLA_DIRECTORIOS} USING (nodo)
+        WHERE {where}
+        ORDER BY {ORDENES[orden]} {direccion}, id {direccion}
+    """
+    return consulta, parametros
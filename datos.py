@@ -0,0 +1,428 @@
+"""
+Carga y preparación de los datasets del dashboard FIUT.
+
+Estas funciones no dependen de Streamlit: el dashboard las envuelve con
+st.cache_resource para mantener una sola copia por proceso, compartida por
+todas las sesiones. Por eso todas las columnas derivadas se calculan aquí, al
+cargar, y los DataFrames devueltos deben tratarse como de solo lectura.
+"""
+import contextlib
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from arbol_directorios import SEPARADOR, construir_arbol
+from clasificador import cargar_clasificador
+
+# Copy-on-Write: filtrar un DataFrame compartido no lo copia y modificar el
+# resultado nunca altera el original (comportamiento por defecto desde pandas 3)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+RUTA_INVENTARIO = 'data/estructura_archivos.csv'
+RUTA_INDICADORES = 'data/indicadores_actualizado_20250528.csv'
+RUTA_REGISTRO = 'data/DataLake_registro_FIUT_UTEM.xlsx'
+RUTA_COMUNAS = 'data/Comunas.csv'
+RUTA_NOMBRES_DIMENSIONES = 'data/nombres_dimensiones.csv'
+
+# Carpeta del Data Lake sobre la que se resuelven las rutas relativas del inventario
+RUTA_DATA_LAKE = os.environ.get('RUTA_DATA_LAKE', '.')
+
+# Representación compacta del inventario: categóricas para columnas con pocos
+# valores distintos y texto Arrow (sin un objeto Python por celda) para rutas
+COLUMNAS_CATEGORICAS = ['tipo', 'extension', 'mime_type', 'categoria', 'dimension',
+                        'dimensiones', 'directorio_padre', 'tamano', 'permisos']
+COLUMNAS_TEXTO_ARROW = ['nombre', 'ruta_completa', 'ruta_relativa']
+TEXTO_ARROW = pd.ArrowDtype(pa.string())
+
+# Secuencias típicas de texto UTF-8 leído como latin-1 (p. ej. 'Ã³' en lugar de 'ó')
+PATRON_MOJIBAKE = r'[ÂÃ][\x80-\xbf]'
+
+
+def _reparar_texto(texto):
+    """Deshace una lectura latin-1 de texto UTF-8; si no aplica, devuelve el texto sin cambios"""
+    try:
+        return texto.encode('latin-1').decode('utf-8')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return texto
+
+
+def normalizar_codificacion(df):
+    """
+    Repara una sola vez, al cargar, los textos con mojibake.
+
+    Solo se tocan las celdas donde se detecta el patrón y la reparación se
+    calcula una vez por valor distinto, así que el texto ya correcto nunca se
+    vuelve a decodificar. Lo reparado queda registrado en
+    df.attrs['codificacion'] como {columna: celdas reparadas}.
+    """
+    reparaciones = {}
+    for col in df.columns:
+        serie = df[col]
+        if not (pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)):
+            continue
+
+        sospechosos = serie.str.contains(PATRON_MOJIBAKE, regex=True, na=False)
+        if not sospechosos.any():
+            continue
+
+        reparados = {}
+        for valor in pd.unique(serie[sospechosos]):
+            reparado = _reparar_texto(valor)
+            if reparado != valor:
+                reparados[valor] = reparado
+        if not reparados:
+            continue
+
+        corregida = serie[sospechosos].map(lambda v: reparados.get(v, v))
+        df[col] = serie.where(~sospechosos, corregida)
+        reparaciones[col] = int(serie[sospechosos].isin(list(reparados)).sum())
+
+    df.attrs['codificacion'] = reparaciones
+    return df
+
+
+# Tamaños del inventario: "7.10 MB", "946 B", ...
+PATRON_TAMANO = r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?B)\s*$'
+MULTIPLICADORES_TAMANO = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3, 'TB': 1024 ** 4}
+
+
+def parsear_tamano(tamanos):
+    """
+    Convierte una serie de tamaños legibles ("7.10 MB") a bytes (Int64) de forma vectorizada.
+
+    Los valores que no siguen el formato quedan como <NA> en lugar de contarse
+    como 0, para que no distorsionen los totales.
+    """
+    partes = tamanos.astype('string').str.upper().str.extract(PATRON_TAMANO)
+    valor = pd.to_numeric(partes[0], errors='coerce')
+    multiplicador = partes[1].map(MULTIPLICADORES_TAMANO).astype('float64')
+    return (valor * multiplicador).round().astype('Int64')
+
+
+# Fechas del inventario: "2025-02-27 00:40:41"
+COLUMNAS_FECHA = ['fecha_modificacion', 'fecha_creacion']
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+
+def parsear_fechas(df):
+    """
+    Convierte una sola vez, al cargar, las columnas de fecha a datetime64.
+
+    Las fechas que no siguen el formato quedan como NaT y su cantidad se
+    registra en df.attrs['fechas_invalidas'] como {columna: cantidad}.
+    """
+    invalidas = {}
+    for col in COLUMNAS_FECHA:
+        if col not in df.columns:
+            continue
+        fechas = pd.to_datetime(df[col], format=FORMATO_FECHA, errors='coerce')
+        invalidas[col] = int((fechas.isna() & df[col].notna()).sum())
+        df[col] = fechas.astype('datetime64[s]')
+    df.attrs['fechas_invalidas'] = invalidas
+    return df
+
+
+def indexar_directorios(df):
+    """
+    Agrega la columna 'nodo' (id del directorio de cada fila) y el árbol de directorios en df.attrs['arbol'].
+
+    El árbol incluye también los directorios sin archivos, a partir de las
+    filas de tipo Directorio.
+    """
+    es_directorio = df['tipo'] == 'Directorio'
+    directorios = pd.concat([df['directorio_padre'], df.loc[es_directorio, 'ruta_relativa']], ignore_index=True)
+    profundidades = pd.concat([df['profundidad'], df.loc[es_directorio, 'profundidad'] + 1], ignore_index=True)
+
+    arbol, nodos = construir_arbol(directorios, profundidades)
+    df['nodo'] = nodos[:len(df)]
+    df.attrs['arbol'] = arbol
+    return df
+
+
+def version_archivo(ruta):
+    """Identificador de la versión de un archivo de datos (cambia cuando el archivo se regenera)"""
+    info = os.stat(ruta)
+    return f"{info.st_mtime_ns}-{info.st_size}"
+
+
+def leer_inventario(ruta=RUTA_INVENTARIO):
+    """Lee el inventario de archivos del Data Lake con los textos ya normalizados, el tamaño en bytes y las fechas parseadas"""
+    df = normalizar_codificacion(pd.read_csv(ruta))
+
+    # Tamaño exacto en bytes, calculado una sola vez al cargar
+    df['bytes'] = parsear_tamano(df['tamano'])
+    df.attrs['tamanos_invalidos'] = int((df['bytes'].isna() & df['tamano'].notna()).sum())
+    return indexar_directorios(parsear_fechas(df))
+
+
+# Función para procesar y limpiar los datos
+def procesar_datos(df, clasificador=None):
+    """Procesa y limpia los datos para el análisis; clasificador por defecto: el de data/taxonomias.json"""
+    if df.empty:
+        return df
+
+    # Filtrar solo archivos (no directorios)
+    df = df[df['tipo'] == 'Archivo'].copy()
+
+    # Eliminar filas con extensión vacía
+    df = df[df['extension'] != ''].copy()
+
+    # Eliminar archivos .ipynb
+    df = df[df['extension'] != '.ipynb'].copy()
+
+    # Dimensión, ámbito, indicador, método y facultad según data/taxonomias.json
+    if clasificador is None:
+        clasificador = cargar_clasificador()
+    etiquetas = clasificador.clasificar(df['ruta_relativa'])
+    df = df.assign(**{col: etiquetas[col] for col in etiquetas.columns})
+
+    # Verificar columnas institucional/territorial
+    if 'institucional' not in df.columns or 'territorial' not in df.columns:
+        df['institucional'] = (df['ambito'] == 'Institucional').to_numpy()
+        df['territorial'] = (df['ambito'] == 'Territorial').to_numpy()
+
+    return df.reset_index(drop=True)
+
+
+def leer_indicadores(ruta=RUTA_INDICADORES):
+    """Lee los indicadores con los nombres de columna usados en el dashboard y sus columnas derivadas"""
+    # id_indicador	dimension	indicador_original	indicador	estado	Origen
+    df = pd.read_csv(ruta, sep='^')
+    # Renombrar columnas para mayor claridad
+    df = df.rename(columns={
+        'id_indicador': 'ID',
+        'dimension': 'Dimension',
+        'estado': 'Estado',
+        'Origen': 'Origen'
+    })
+
+    # Corregir textos mal codificados antes de derivar columnas
+    df = normalizar_codificacion(df)
+
+    # Extraer solo el nombre de la dimensión (sin el número)
+    df['Dimension_Simple'] = df['Dimension'].apply(
+        lambda x: x.split(':')[0] if ':' in x else x
+    )
+    return df
+
+
+def leer_metodos_obtencion(ruta=RUTA_REGISTRO):
+    """Cuenta los archivos del registro del Data Lake por método de obtención"""
+    dfh = pd.read_excel(ruta)
+
+    dfhh = dfh['METODO'].value_counts().reset_index()
+    dfhh.columns = ['nombres', 'conteo']
+
+    # Los métodos vienen codificados; se nombran según su frecuencia
+    nombres = ['Web Scrapping', 'Universidad', 'Descargados']
+    dfhh['nombres'] = nombres[:len(dfhh)] + dfhh['nombres'].tolist()[len(nombres):]
+    return dfhh
+
+
+def leer_comunas(ruta=RUTA_COMUNAS):
+    """Lee la tabla de comunas del proyecto"""
+    return pd.read_csv(ruta)
+
+
+def leer_nombres_dimensiones(ruta=RUTA_NOMBRES_DIMENSIONES):
+    """Diccionario id de dimensión -> nombre completo"""
+    nombres_dimensiones = pd.read_csv(ruta)
+    return dict(zip(nombres_dimensiones['id_dim'], nombres_dimensiones['nombre_dim']))
+
+
+def compactar_inventario(df):
+    """
+    Devuelve el inventario procesado en su representación compacta.
+
+    El ahorro queda registrado en df.attrs['memoria'] como
+    {'original': bytes, 'compacto': bytes}; el detalle por columna se obtiene
+    con reporte_memoria.
+    """
+    if df.empty:
+        return df
+
+    memoria_original = int(df.memory_usage(deep=True).sum())
+    columnas = {}
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns:
+            columnas[col] = df[col].astype('category')
+    for col in COLUMNAS_TEXTO_ARROW:
+        if col in df.columns:
+            columnas[col] = df[col].astype(TEXTO_ARROW)
+    if 'profundidad' in df.columns:
+        columnas['profundidad'] = pd.to_numeric(df['profundidad'], downcast='integer')
+
+    # ruta_completa es la raíz del levantamiento seguida de ruta_relativa: basta
+    # con guardar la raíz (categórica) y reconstruirla con ruta_completa(df)
+    if {'ruta_completa', 'ruta_relativa'} <= set(df.columns):
+        raices = [
+            completa[:len(completa) - len(relativa)] if completa.endswith(relativa) else None
+            for completa, relativa in zip(df['ruta_completa'], df['ruta_relativa'])
+        ]
+        if None not in raices:
+            columnas['raiz'] = pd.Categorical(raices)
+            columnas.pop('ruta_completa', None)
+            df = df.drop(columns='ruta_completa')
+
+    # Con el árbol de directorios, cada fila solo guarda el id de su directorio;
+    # ruta_relativa(df) reconstruye las rutas al mostrarlas
+    if 'nodo' in df.columns and 'arbol' in df.attrs:
+        for col in ['ruta_relativa', 'directorio_padre']:
+            columnas.pop(col, None)
+        df = df.drop(columns=['ruta_relativa', 'directorio_padre'], errors='ignore')
+
+    df = df.assign(**columnas)
+    memoria_compacta = int(df.memory_usage(deep=True).sum())
+    if 'arbol' in df.attrs:
+        memoria_compacta += df.attrs['arbol'].memoria()
+    df.attrs['memoria'] = {
+        'original': memoria_original,
+        'compacto': memoria_compacta
+    }
+    return df
+
+
+def ruta_relativa(df):
+    """Ruta relativa de cada fila, reconstruida desde el árbol de directorios solo cuando se necesita mostrarla"""
+    if 'ruta_relativa' in df.columns:
+        return df['ruta_relativa']
+    directorios = df.attrs['arbol'].rutas(df['nodo'].to_numpy())
+    rutas = [f"{directorio}{SEPARADOR}{nombre}" if directorio else nombre
+             for directorio, nombre in zip(directorios, df['nombre'])]
+    return pd.Series(rutas, index=df.index, dtype=TEXTO_ARROW)
+
+
+def ruta_completa(df):
+    """Ruta completa de cada archivo, reconstruida solo cuando se necesita mostrarla o abrirla"""
+    if 'ruta_completa' in df.columns:
+        return df['ruta_completa']
+    return (df['raiz'].astype(str) + ruta_relativa(df).astype(str)).astype(TEXTO_ARROW)
+
+
+def ruta_local(relativa, raiz=RUTA_DATA_LAKE):
+    """Ruta en este servidor de un archivo del inventario (las rutas del inventario usan el separador de Windows)"""
+    return os.path.join(raiz, *relativa.split(SEPARADOR))
+
+
+def estado_archivos(rutas):
+    """Fecha de modificación (ns) y tamaño real de cada archivo (-1 si no existe o no es accesible)"""
+    mtimes = np.full(len(rutas), -1, dtype=np.int64)
+    tamanos = np.full(len(rutas), -1, dtype=np.int64)
+    for i, ruta in enumerate(rutas):
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            continue
+        mtimes[i], tamanos[i] = estado.st_mtime_ns, estado.st_size
+    return mtimes, tamanos
+
+
+def data_lake_disponible(df, raiz=RUTA_DATA_LAKE):
+    """True si al menos un archivo del inventario existe en este servidor (se detiene en el primero)"""
+    return any(os.path.isfile(ruta_local(relativa, raiz)) for relativa in ruta_relativa(df).astype(str))
+
+
+# Con menos elementos no compensa levantar un pool de procesos
+MINIMO_PARA_POOL = 8
+
+# Los procesos de los pools no se crean con fork: copiarían el servidor de
+# Streamlit con sus hilos y locks tomados. forkserver donde existe (Linux) y si no, spawn
+CONTEXTO_POOL = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+
+def mapear_en_procesos(funcion, elementos, procesos=None, minimo=MINIMO_PARA_POOL):
+    """Aplica funcion (de nivel de módulo) a cada elemento, en un pool de procesos cuando son suficientes"""
+    elementos = list(elementos)
+    if len(elementos) < minimo:
+        return [funcion(elemento) for elemento in elementos]
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=CONTEXTO_POOL) as pool:
+        return list(pool.map(funcion, elementos, chunksize=max(1, len(elementos) // 64)))
+
+
+@contextlib.contextmanager
+def escritura_atomica(ruta):
+    """
+    Ruta temporal para escribir un archivo (o armar una carpeta) que al terminar reemplaza a ruta.
+
+    Otros procesos (workers, el navegador, el CDN) nunca ven un resultado a
+    medias; si la escritura falla, el temporal se elimina y ruta queda como estaba.
+    """
+    ruta = ruta.rstrip(os.sep)
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield temporal
+        if os.path.isdir(temporal) and os.path.isdir(ruta):
+            # os.replace no reemplaza una carpeta con contenido: la anterior se aparta y se elimina al final
+            anterior = f"{temporal}.anterior"
+            os.rename(ruta, anterior)
+            os.rename(temporal, ruta)
+            shutil.rmtree(anterior, ignore_errors=True)
+        else:
+            os.replace(temporal, ruta)
+    finally:
+        if os.path.isdir(temporal):
+            shutil.rmtree(temporal, ignore_errors=True)
+        elif os.path.exists(temporal):
+            os.remove(temporal)
+
+
+def leer_cache_parquet(ruta, tipos):
+    """Caché persistente en Parquet; vacía, con las columnas y tipos de tipos ({columna: dtype}), si no se puede leer"""
+    try:
+        return pd.read_parquet(ruta)
+    except (OSError, ValueError):
+        return pd.DataFrame({columna: pd.Series(dtype=tipo) for columna, tipo in tipos.items()})
+
+
+def guardar_cache_parquet(cache, ruta):
+    """Guarda una caché persistente en Parquet con escritura atómica"""
+    with escritura_atomica(ruta) as temporal:
+        cache.to_parquet(temporal, index=False)
+
+
+ETIQUETA_OTROS = 'Otros'
+
+
+def reducir_top_n(conteo, etiqueta, valor, n, etiqueta_otros=ETIQUETA_OTROS):
+    """
+    Deja las n filas de mayor valor y suma las demás en una sola fila "Otros".
+
+    Acota el tamaño de los gráficos (y de su JSON) sin importar cuántas
+    categorías tenga el dato. Devuelve (reducido, resto): resto son las filas
+    agrupadas, para mostrarlas solo si el usuario las pide. Con n=None, o si
+    solo sobraría una fila, no se agrupa nada.
+    """
+    conteo = conteo.sort_values(valor, ascending=False, kind='stable', ignore_index=True)
+    if n is None or len(conteo) <= n + 1:
+        return conteo, conteo.iloc[0:0]
+    principales, resto = conteo.iloc[:n], conteo.iloc[n:].reset_index(drop=True)
+    # Las etiquetas pueden ser categóricas: se pasan a texto para admitir "Otros"
+    principales = principales.astype({etiqueta: object})
+    otros = pd.DataFrame({etiqueta: [etiqueta_otros], valor: [resto[valor].sum()]})
+    return pd.concat([principales[[etiqueta, valor]], otros], ignore_index=True), resto
+
+
+def reporte_memoria(df):
+    """Memoria ocupada por columna (en bytes, incluyendo el contenido de los textos)"""
+    uso = df.memory_usage(deep=True, index=False)
+    reporte = pd.DataFrame({
+        'Columna': uso.index,
+        'Tipo': [str(df[col].dtype) for col in uso.index],
+        'Bytes': uso.values
+    })
+    return reporte.sort_values('Bytes', ascending=False, ignore_index=True)
+
+
+def cargar_inventario(ruta=RUTA_INVENTARIO):
+    """Inventario listo para el dashboard: leído, procesado y compactado"""
+    return compactar_inventario(procesar_datos(leer_inventario(ruta)))
@@ -0,0 +1,139 @@
+"""
+Detección de archivos duplicados en el Data Lake por contenido.
+
+Solo pueden ser idénticos archivos del mismo tamaño, así que primero se
+agrupan los candidatos por tamaño (el del inventario y luego el real en disco)
+y solo se calcula el hash de los que colisionan. Los hashes se calculan en un
+pool de procesos leyendo cada archivo por fragmentos y se guardan en una
+caché persistente indexada por (ruta, fecha de modificación, tamaño): un
+archivo que no cambió nunca se vuelve a leer.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import datos
+
+RUTA_CACHE_HASHES = 'cache/hashes_archivos.parquet'
+
+# Tamaño de cada lectura al calcular un hash
+TAMANO_FRAGMENTO = 1024 * 1024
+
+# Columnas de la caché de hashes: una fila por (ruta, mtime_ns, tamano) con su hash
+TIPOS_CACHE_HASHES = {'ruta': object, 'mtime_ns': 'int64', 'tamano': 'int64', 'hash': object}
+
+
+def _hashear_archivo(ruta):
+    """Hash BLAKE2b del contenido de un archivo, leído por fragmentos (None si no se puede leer)"""
+    hash_archivo = hashlib.blake2b(digest_size=20)
+    fragmento = bytearray(TAMANO_FRAGMENTO)
+    vista = memoryview(fragmento)
+    try:
+        with open(ruta, 'rb', buffering=0) as f:
+            while leidos := f.readinto(fragmento):
+                hash_archivo.update(vista[:leidos])
+    except OSError:
+        return None
+    return hash_archivo.hexdigest()
+
+
+def hashear_archivos(rutas, procesos=None):
+    """Hashes de varios archivos, en paralelo cuando son suficientes para justificarlo"""
+    return datos.mapear_en_procesos(_hashear_archivo, rutas, procesos)
+
+
+def candidatos_por_tamano(df):
+    """
+    Posiciones de las filas cuyo tamaño en el inventario coincide con el de otra fila.
+
+    El tamaño del inventario está redondeado, pero dos archivos idénticos
+    siempre tienen el mismo, así que sirve como primer filtro.
+    """
+    tamanos = df['bytes']
+    repetido = tamanos.duplicated(keep=False) & (tamanos > 0)
+    return np.flatnonzero(repetido.fillna(False).to_numpy(dtype=bool))
+
+
+def detectar_duplicados(df, raiz=datos.RUTA_DATA_LAKE, ruta_cache=RUTA_CACHE_HASHES, procesos=None):
+    """
+    Grupos de archivos con contenido idéntico.
+
+    Devuelve un DataFrame con una fila por archivo duplicado (fila del
+    inventario, ruta, bytes, hash y grupo), ordenado por el espacio que
+    ocupa cada grupo, y un resumen con los archivos revisados, los que no se
+    encontraron en disco, si el Data Lake está disponible (existe al menos un
+    archivo del inventario) y los bytes recuperables (conservando una copia por grupo).
+    """
+    filas = candidatos_por_tamano(df)
+    relativas = datos.ruta_relativa(df.iloc[filas]).astype(object).to_numpy()
+    locales = np.array([datos.ruta_local(r, raiz) for r in relativas], dtype=object)
+
+    # Una misma ruta puede aparecer varias veces en el inventario
+    _, primeras = np.unique(locales, return_index=True)
+    primeras.sort()
+    filas, relativas, locales = filas[primeras], relativas[primeras], locales[primeras]
+
+    mtimes, tamanos = datos.estado_archivos(locales)
+    encontrados = tamanos >= 0
+    candidatos = pd.DataFrame({
+        'fila': filas, 'ruta': relativas, 'local': locales, 'mtime_ns': mtimes, 'tamano': tamanos
+    })[encontrados]
+    # Segundo filtro con el tamaño exacto en disco
+    candidatos = candidatos[candidatos['tamano'].duplicated(keep=False) & (candidatos['tamano'] > 0)]
+
+    # Hashes ya conocidos para archivos que no cambiaron; el resto se calcula
+    cache = datos.leer_cache_parquet(ruta_cache, TIPOS_CACHE_HASHES)
+    candidatos = candidatos.merge(
+        cache, how='left', left_on=['local', 'mtime_ns', 'tamano'], right_on=['ruta', 'mtime_ns', 'tamano'],
+        suffixes=('', '_cache')
+    ).drop(columns='ruta_cache')
+    pendientes = candidatos['hash'].isna().to_numpy()
+    if pendientes.any():
+        candidatos.loc[pendientes, 'hash'] = hashear_archivos(candidatos.loc[pendientes, 'local'], procesos)
+        nuevos = candidatos.loc[pendientes & candidatos['hash'].notna().to_numpy(), ['local', 'mtime_ns', 'tamano', 'hash']]
+        nuevos = nuevos.rename(columns={'local': 'ruta'})
+        # Se descartan las entradas antiguas de las rutas que se volvieron a calcular
+        cache = pd.concat([cache[~cache['ruta'].isin(nuevos['ruta'])], nuevos], ignore_index=True)
+        datos.guardar_cache_parquet(cache, ruta_cache)
+
+    candidatos = candidatos[candidatos['hash'].notna()]
+    duplicados = candidatos[candidatos['hash'].duplicated(keep=False)]
+    copias = duplicados.groupby('hash')['tamano'].transform('size')
+    duplicados = duplicados.assign(
+        bytes=duplicados['tamano'],
+        recuperable=duplicados['tamano'] * (copias - 1) / copias
+    ).sort_values(['tamano', 'hash', 'ruta'], ascending=[False, True, True])
+    duplicados['grupo'] = pd.factorize(duplicados['hash'])[0] + 1
+
+    resumen = {
+        'revisados': len(filas),
+        'no_encontrados': int((~encontrados).sum()),
+        # Sin candidatos por tamaño no se revisa ningún archivo: se busca en todo el inventario
+        'disponible': bool(encontrados.any()) or datos.data_lake_disponible(df, raiz),
+        'grupos': int(duplicados['grupo'].max()) if len(duplicados) else 0,
+        'archivos': len(duplicados),
+        'bytes_recuperables': int(round(duplicados['recuperable'].sum()))
+    }
+    return duplicados[['grupo', 'fila', 'ruta', 'bytes', 'hash']].reset_index(drop=True), resumen
+
+
+def posibles_duplicados(df):
+    """
+    Estimación sin acceso a los archivos: grupos con el mismo tamaño reportado y la misma extensión.
+
+    Sirve cuando el Data Lake no está disponible en el servidor; los grupos
+    no están verificados por contenido.
+    """
+    filas = candidatos_por_tamano(df)
+    candidatos = pd.DataFrame({
+        'fila': filas,
+        'bytes': df['bytes'].to_numpy()[filas],
+        'extension': df['extension'].astype(object).to_numpy()[filas]
+    })
+    candidatos = candidatos[candidatos.duplicated(['bytes', 'extension'], keep=False)]
+    candidatos = candidatos.sort_values(['bytes', 'extension', 'fila'], ascending=[False, True, True])
+    candidatos['grupo'] = candidatos.groupby(['bytes', 'extension'], sort=False).ngroup() + 1
+    recuperables = candidatos.groupby('grupo')['bytes'].agg(lambda b: b.iloc[0] * (len(b) - 1)).sum()
+    return candidatos.reset_index(drop=True), int(recuperables)
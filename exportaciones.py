@@ -0,0 +1,119 @@
+"""
+Exportación de tablas y del inventario filtrado a CSV o Parquet.
+
+DuckDB escribe cada exportación directo a disco por bloques (COPY), sin
+armar el archivo completo en memoria, en la carpeta exportes/; el navegador
+la descarga por partes desde la ruta /exportes/ de aplicacion.py, sin pasar
+por la sesión (la carpeta estática de Streamlit rechaza archivos de más de
+200 MB). El nombre de cada archivo incluye un hash de la consulta y sus
+datos de origen, así que pedir dos veces la misma exportación reutiliza el
+archivo ya generado.
+"""
+import hashlib
+import os
+import time
+
+import duckdb
+import pandas as pd
+
+from datos import escritura_atomica
+
+# Servida por aplicacion.py bajo /exportes/
+DIRECTORIO_EXPORTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exportes')
+URL_EXPORTES = 'exportes'
+
+FORMATOS = {
+    'CSV': ('csv', "FORMAT csv, HEADER true"),
+    'Parquet': ('parquet', "FORMAT parquet, COMPRESSION zstd, ROW_GROUP_SIZE 100000"),
+}
+
+TAMANO_MAXIMO_EXPORTES = 4 * 1024 ** 3
+ANTIGUEDAD_MAXIMA = 6 * 3600  # segundos
+
+
+def _firma(*partes):
+    return hashlib.blake2b(repr(partes).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def limpiar_exportes(directorio=DIRECTORIO_EXPORTES, tamano_maximo=TAMANO_MAXIMO_EXPORTES,
+                     antiguedad_maxima=ANTIGUEDAD_MAXIMA):
+    """Elimina las exportaciones antiguas y, si la carpeta sigue muy grande, las menos usadas"""
+    try:
+        entradas = [e for e in os.scandir(directorio) if e.is_file() and not e.name.startswith('.')]
+    except FileNotFoundError:
+        return
+    ahora = time.time()
+    vigentes = []
+    for entrada in entradas:
+        estado = entrada.stat()
+        if ahora - estado.st_mtime > antiguedad_maxima:
+            try:
+                os.remove(entrada.path)
+            except OSError:
+                pass
+        else:
+            vigentes.append((estado.st_mtime, estado.st_size, entrada.path))
+    total = sum(tamano for _, tamano, _ in vigentes)
+    for _, tamano, ruta in sorted(vigentes):
+        if total <= tamano_maximo:
+            break
+        try:
+            os.remove(ruta)
+            total -= tamano
+        except OSError:
+            pass
+
+
+def exportar_consulta(con, consulta, parametros=None, nombre='exportacion', formato='CSV', clave=None,
+                      directorio=DIRECTORIO_EXPORTES):
+    """
+    Escribe el resultado de una consulta en un archivo CSV o Parquet.
+
+    clave identifica los datos de origen (por ejemplo, la versión del
+    inventario). Devuelve la ruta del archivo; si ya existía uno para la
+    misma consulta, formato y clave, se reutiliza.
+    """
+    extension, opciones = FORMATOS[formato]
+    archivo = f"{nombre}-{_firma(consulta, parametros, formato, clave)}.{extension}"
+    ruta = os.path.join(directorio, archivo)
+    if os.path.exists(ruta):
+        # Se marca como recién usado para que la limpieza no lo elimine primero
+        os.utime(ruta)
+        return ruta
+
+    limpiar_exportes(directorio)
+    with escritura_atomica(ruta) as temporal:
+        con.execute(f"COPY ({consulta}) TO '{temporal}' ({opciones})", parametros or [])
+    return ruta
+
+
+def exportar_tabla(tabla, nombre='exportacion', formato='CSV', clave=None, directorio=DIRECTORIO_EXPORTES):
+    """
+    Exporta un DataFrame (o tabla Arrow) a CSV o Parquet.
+
+    Si no se indica clave, se usa un hash del contenido de la tabla.
+    """
+    if clave is None:
+        clave = hashlib.blake2b(
+            pd.util.hash_pandas_object(tabla, index=False).to_numpy().tobytes()
+            + repr(list(tabla.columns)).encode('utf-8'),
+            digest_size=16
+        ).hexdigest()
+    con = duckdb.connect()
+    try:
+        con.register('tabla_exportacion', tabla)
+        return exportar_consulta(con, "SELECT * FROM tabla_exportacion", None, nombre, formato, clave, directorio)
+    finally:
+        con.close()
+
+
+def url_exportacion(ruta):
+    """URL relativa con la que el navegador descarga una exportación"""
+    return f"{URL_EXPORTES}/{os.path.basename(ruta)}"
+
+
+def ruta_exportacion(archivo, directorio=DIRECTORIO_EXPORTES):
+    """Ruta local de una exportación a partir del nombre pedido (None si no es un nombre válido)"""
+    if os.path.basename(archivo) != archivo or archivo.startswith('.') or archivo.endswith('.tmp'):
+        return None
+    return os.path.join(directorio, archivo)
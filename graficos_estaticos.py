@@ -0,0 +1,74 @@
+"""
+Gráficos HTML pesados (graph/…) servidos como archivos estáticos y cargados a pedido.
+
+Incrustar uno de estos gráficos con components.html envía el archivo completo
+(varios MB, con plotly.js incluido) por el websocket de la sesión cada vez que
+se ejecuta la vista. En su lugar, el archivo se copia una vez a la carpeta
+estática que Streamlit sirve con server.enableStaticServing, con un hash de
+su versión en el nombre, y la vista solo envía un marcador liviano: el
+navegador pide el gráfico cuando el marcador se acerca a la pantalla.
+"""
+import hashlib
+import os
+import shutil
+
+from datos import escritura_atomica
+
+# Streamlit sirve la carpeta static/ junto al script principal bajo app/static/
+DIRECTORIO_GRAFICOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'graficos')
+URL_GRAFICOS = 'app/static/graficos'
+
+# Marcador: reserva el alto del gráfico y crea el iframe al entrar en pantalla
+PLANTILLA_MARCADOR = """<!DOCTYPE html>
+<html><body style="margin:0">
+<div id="marcador" data-src="{url}" style="height:{alto}px; display:flex; align-items:center; justify-content:center;
+     background-color:#f0f2f6; border-radius:10px; font-family:sans-serif; color:#6C757D;">{titulo}</div>
+<script>
+(function () {{
+  var marcador = document.getElementById('marcador');
+  function cargar() {{
+    var iframe = document.createElement('iframe');
+    iframe.src = marcador.dataset.src;
+    iframe.style.cssText = 'width:100%; height:{alto}px; border:0;';
+    marcador.replaceWith(iframe);
+  }}
+  if (!('IntersectionObserver' in window)) {{ cargar(); return; }}
+  new IntersectionObserver(function (entradas, observador) {{
+    if (entradas[0].isIntersecting) {{ observador.disconnect(); cargar(); }}
+  }}, {{rootMargin: '300px'}}).observe(marcador);
+}})();
+</script>
+</body></html>
+"""
+
+
+def publicar_grafico(ruta, directorio=DIRECTORIO_GRAFICOS):
+    """
+    Copia un gráfico HTML a la carpeta estática y devuelve su URL relativa.
+
+    El nombre incluye un hash de la ruta, fecha de modificación y tamaño del
+    original: si el gráfico cambia se publica con otro nombre y si no, se
+    reutiliza la copia existente.
+    """
+    estado = os.stat(ruta)
+    firma = hashlib.blake2b(
+        repr((os.path.abspath(ruta), estado.st_mtime_ns, estado.st_size)).encode('utf-8'), digest_size=8
+    ).hexdigest()
+    nombre = f"{os.path.splitext(os.path.basename(ruta))[0]}-{firma}.html"
+    destino = os.path.join(directorio, nombre)
+    if not os.path.exists(destino):
+        with escritura_atomica(destino) as temporal:
+            shutil.copyfile(ruta, temporal)
+    return f"{URL_GRAFICOS}/{nombre}"
+
+
+def marcador_diferido(url, alto=600, titulo="Cargando gráfico…"):
+    """Documento HTML liviano que carga el gráfico de url cuando se acerca a la pantalla"""
+    return PLANTILLA_MARCADOR.format(url=url, alto=alto, titulo=titulo)
+
+
+def ruta_publicada(url, directorio=DIRECTORIO_GRAFICOS):
+    """Ruta local de un gráfico publicado a partir de su URL (None si la URL no es de esta carpeta)"""
+    if not url.startswith(f"{URL_GRAFICOS}/"):
+        return None
+    return os.path.join(directorio, os.path.basename(url))
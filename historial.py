@@ -0,0 +1,170 @@
+"""
+Historial de levantamientos del inventario del Data Lake.
+
+Cada levantamiento se guarda como una partición Parquet por fecha
+(data/historial/fecha_escaneo=AAAA-MM-DD/), con el inventario de archivos y
+un resumen por categoría y dimensión. La evolución en el tiempo se arma solo
+con los resúmenes y la comparación entre dos fechas lee únicamente sus dos
+particiones, así que las consultas no crecen con la cantidad de levantamientos.
+Cada partición guarda la versión del inventario con que se generó.
+
+Los levantamientos se registran solo desde la línea de comandos, después de
+regenerar el inventario (el dashboard únicamente lee el historial):
+    python historial.py [AAAA-MM-DD]
+Sin fecha se usa la del día; si esa fecha ya tiene un levantamiento, se reemplaza.
+"""
+import datetime
+import glob
+import os
+import sys
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import datos
+
+RUTA_HISTORIAL = 'data/historial'
+PARTICION = 'fecha_escaneo'
+
+# Metadato del Parquet con la versión (datos.version_archivo) del inventario guardado
+CLAVE_VERSION = b'version_inventario'
+
+
+def _ruta_particion(fecha, raiz=RUTA_HISTORIAL):
+    return os.path.join(raiz, f"{PARTICION}={fecha}")
+
+
+def listar_levantamientos(raiz=RUTA_HISTORIAL):
+    """Fechas de los levantamientos guardados, de la más antigua a la más reciente"""
+    particiones = glob.glob(os.path.join(raiz, f"{PARTICION}=*", 'inventario.parquet'))
+    return sorted(os.path.basename(os.path.dirname(p)).split('=', 1)[1] for p in particiones)
+
+
+def version_levantamiento(fecha, raiz=RUTA_HISTORIAL):
+    """Versión del inventario guardado como levantamiento de una fecha (None si no hay o no se registró)"""
+    try:
+        metadatos = pq.read_schema(os.path.join(_ruta_particion(fecha, raiz), 'inventario.parquet')).metadata
+    except (OSError, pa.ArrowInvalid):
+        return None
+    version = (metadatos or {}).get(CLAVE_VERSION)
+    return version.decode('utf-8') if version else None
+
+
+def _escribir(tabla, ruta):
+    """Escribe una tabla Parquet de forma atómica"""
+    with datos.escritura_atomica(ruta) as temporal:
+        pq.write_table(tabla, temporal, compression='zstd')
+
+
+def guardar_levantamiento(df, fecha, raiz=RUTA_HISTORIAL, reemplazar=False, version=None):
+    """
+    Guarda el inventario procesado (compacto o no) como el levantamiento de una fecha.
+
+    Las filas se ordenan por ruta, lo que mejora la compresión entre
+    levantamientos parecidos; version queda en los metadatos del Parquet.
+    Devuelve False si ya había un levantamiento para esa fecha y no se pidió
+    reemplazarlo.
+    """
+    carpeta = _ruta_particion(fecha, raiz)
+    if os.path.exists(os.path.join(carpeta, 'inventario.parquet')) and not reemplazar:
+        return False
+    os.makedirs(carpeta, exist_ok=True)
+
+    levantamiento = pd.DataFrame({
+        'ruta': datos.ruta_relativa(df).astype(str).to_numpy(),
+        'nombre': df['nombre'].astype(str).to_numpy(),
+        'extension': df['extension'].astype(str).to_numpy(),
+        'bytes': df['bytes'].astype('Int64').to_numpy(),
+        'fecha_modificacion': df['fecha_modificacion'].to_numpy(),
+        'categoria': df['categoria'].astype(str).to_numpy(),
+        'dimensiones': df['dimensiones'].astype(str).to_numpy()
+    }).sort_values('ruta', ignore_index=True)
+
+    resumen = (
+        levantamiento.groupby(['categoria', 'dimensiones'], observed=True)
+        .agg(archivos=('ruta', 'size'), bytes=('bytes', 'sum'))
+        .reset_index()
+    )
+
+    tabla = pa.Table.from_pandas(levantamiento, preserve_index=False)
+    # Codificación por diccionario para las columnas con pocos valores distintos
+    for col in ['extension', 'categoria', 'dimensiones']:
+        i = tabla.schema.get_field_index(col)
+        tabla = tabla.set_column(i, col, tabla[col].dictionary_encode())
+    if version is not None:
+        metadatos = {**(tabla.schema.metadata or {}), CLAVE_VERSION: str(version).encode('utf-8')}
+        tabla = tabla.replace_schema_metadata(metadatos)
+    _escribir(tabla, os.path.join(carpeta, 'inventario.parquet'))
+    _escribir(pa.Table.from_pandas(resumen, preserve_index=False), os.path.join(carpeta, 'resumen.parquet'))
+    return True
+
+
+def crecimiento(raiz=RUTA_HISTORIAL):
+    """
+    Archivos y bytes por levantamiento, categoría y dimensión.
+
+    Solo se leen los resúmenes de cada partición (unas decenas de filas por fecha).
+    """
+    resumenes = os.path.join(raiz, f"{PARTICION}=*", 'resumen.parquet')
+    if not glob.glob(resumenes):
+        return pd.DataFrame(columns=[PARTICION, 'categoria', 'dimensiones', 'archivos', 'bytes'])
+    with duckdb.connect() as con:
+        return con.execute(
+            f"""
+            SELECT {PARTICION}, categoria, dimensiones, archivos, bytes
+            FROM read_parquet(?, hive_partitioning = true, hive_types_autocast = false)
+            ORDER BY {PARTICION}, categoria, dimensiones
+            """,
+            [resumenes]
+        ).df()
+
+
+def diferencias(fecha_anterior, fecha_posterior, raiz=RUTA_HISTORIAL):
+    """
+    Archivos agregados, eliminados y modificados entre dos levantamientos.
+
+    Se cruzan las dos particiones por ruta con un hash join en DuckDB; un
+    archivo se considera modificado si cambió su tamaño o su fecha de
+    modificación. Devuelve un DataFrame con la columna 'cambio' y los datos
+    de ambos levantamientos (sufijos _antes y _despues).
+    """
+    antes = os.path.join(_ruta_particion(fecha_anterior, raiz), 'inventario.parquet')
+    despues = os.path.join(_ruta_particion(fecha_posterior, raiz), 'inventario.parquet')
+    with duckdb.connect() as con:
+        return con.execute(
+            """
+            SELECT
+                CASE
+                    WHEN a.ruta IS NULL THEN 'Agregado'
+                    WHEN d.ruta IS NULL THEN 'Eliminado'
+                    ELSE 'Modificado'
+                END AS cambio,
+                coalesce(d.ruta, a.ruta) AS ruta,
+                coalesce(d.nombre, a.nombre) AS nombre,
+                coalesce(d.extension, a.extension)::VARCHAR AS extension,
+                coalesce(d.categoria, a.categoria)::VARCHAR AS categoria,
+                coalesce(d.dimensiones, a.dimensiones)::VARCHAR AS dimensiones,
+                a.bytes AS bytes_antes,
+                d.bytes AS bytes_despues,
+                coalesce(d.bytes, 0) - coalesce(a.bytes, 0) AS diferencia_bytes,
+                a.fecha_modificacion AS fecha_modificacion_antes,
+                d.fecha_modificacion AS fecha_modificacion_despues
+            FROM read_parquet(?) AS a
+            FULL OUTER JOIN read_parquet(?) AS d ON a.ruta = d.ruta
+            WHERE a.ruta IS NULL
+               OR d.ruta IS NULL
+               OR a.bytes IS DISTINCT FROM d.bytes
+               OR a.fecha_modificacion IS DISTINCT FROM d.fecha_modificacion
+            ORDER BY cambio, ruta
+            """,
+            [antes, despues]
+        ).df()
+
+
+if __name__ == '__main__':
+    fecha = sys.argv[1] if len(sys.argv) > 1 else datetime.date.today().isoformat()
+    inventario = datos.cargar_inventario()
+    guardar_levantamiento(inventario, fecha, reemplazar=True, version=datos.version_archivo(datos.RUTA_INVENTARIO))
+    print(f"Levantamiento {fecha} guardado en {_ruta_particion(fecha)} ({len(inventario):,} archivos)")
@@ -0,0 +1,121 @@
+"""
+Instantáneas Arrow IPC de los datasets procesados, abiertas con memory mapping.
+
+El primer proceso que necesita un dataset lo procesa y lo escribe como
+archivo Arrow IPC sin compresión; todos los workers (incluido el que lo
+escribió) lo abren con pa.memory_map. Los textos, números y fechas del
+DataFrame apuntan directamente a las páginas del archivo, que el sistema
+operativo comparte entre procesos: N workers no ocupan N copias del
+inventario y abrir una instantánea no vuelve a leer ni procesar el CSV.
+
+df.attrs se guarda en los metadatos del esquema (JSON) y el árbol de
+directorios en un segundo archivo IPC junto al principal. Las instantáneas
+generadas al construir la imagen de Docker (RUTA_PRECALCULADO/instantaneas)
+se usan directamente si corresponden a la misma versión de los datos.
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from arbol_directorios import ArbolDirectorios
+from cache_compartido import RUTA_PRECALCULADO, BloqueoArchivo
+from datos import TEXTO_ARROW, escritura_atomica
+
+DIRECTORIO_INSTANTANEAS = os.environ.get('RUTA_INSTANTANEAS', 'cache/instantaneas')
+DIRECTORIO_PRECALCULADO = os.path.join(RUTA_PRECALCULADO, 'instantaneas')
+
+_CLAVE_ATTRS = b'fiut_attrs'
+
+# Los textos Arrow se devuelven como ArrowDtype, que envuelve el buffer mapeado sin copiarlo
+_TIPOS_PANDAS = {pa.string(): TEXTO_ARROW, pa.large_string(): TEXTO_ARROW}.get
+
+
+def ruta_instantanea(nombre, version, directorio=DIRECTORIO_INSTANTANEAS):
+    """Ruta de la instantánea de un dataset para una versión de sus archivos de origen"""
+    firma = hashlib.blake2b(repr(version).encode('utf-8'), digest_size=8).hexdigest()
+    return os.path.join(directorio, f"{nombre}-{firma}.arrow")
+
+
+def _escribir_ipc(tabla, ruta):
+    # Otros procesos nunca mapean un archivo a medias
+    with escritura_atomica(ruta) as temporal:
+        with pa.OSFile(temporal, 'wb') as archivo, pa.ipc.new_file(archivo, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+
+
+def _leer_ipc(ruta):
+    return pa.ipc.open_file(pa.memory_map(ruta, 'r')).read_all()
+
+
+def guardar_instantanea(df, ruta):
+    """Escribe un DataFrame (con sus attrs y su árbol de directorios) como Arrow IPC sin compresión"""
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    attrs = {k: v for k, v in df.attrs.items() if k != 'arbol'}
+    arbol = df.attrs.get('arbol')
+    if arbol is not None:
+        _escribir_ipc(pa.table({
+            'padre': pa.array(arbol.padres),
+            'nombre': pa.DictionaryArray.from_pandas(arbol.nombres),
+            'profundidad': pa.array(arbol.profundidades)
+        }), f"{ruta}.arbol")
+
+    sin_attrs = df.copy(deep=False)
+    sin_attrs.attrs = {}
+    tabla = pa.Table.from_pandas(sin_attrs, preserve_index=False)
+    metadatos = {**(tabla.schema.metadata or {}), _CLAVE_ATTRS: json.dumps(attrs).encode('utf-8')}
+    _escribir_ipc(tabla.replace_schema_metadata(metadatos), ruta)
+
+
+def abrir_instantanea(ruta):
+    """
+    DataFrame respaldado por el archivo mapeado en memoria (solo lectura).
+
+    Las columnas numéricas y de fecha sin nulos y las de texto no se copian;
+    las categóricas solo materializan sus categorías.
+    """
+    tabla = _leer_ipc(ruta)
+    df = tabla.to_pandas(split_blocks=True, types_mapper=_TIPOS_PANDAS)
+    df.attrs = json.loads((tabla.schema.metadata or {}).get(_CLAVE_ATTRS, b'{}'))
+    if os.path.exists(f"{ruta}.arbol"):
+        arbol = _leer_ipc(f"{ruta}.arbol")
+        nombres = arbol.column('nombre').combine_chunks()
+        df.attrs['arbol'] = ArbolDirectorios(
+            arbol.column('padre').to_numpy(),
+            pd.Categorical.from_codes(nombres.indices.to_numpy(zero_copy_only=False), nombres.dictionary.to_pandas()),
+            arbol.column('profundidad').to_numpy()
+        )
+    return df
+
+
+def instantanea(nombre, version, cargar, directorio=DIRECTORIO_INSTANTANEAS):
+    """
+    Dataset desde su instantánea; si no existe para esta versión, cargar() lo procesa y se guarda.
+
+    version identifica los archivos de origen (p. ej. version_archivo de
+    cada uno). Solo un proceso procesa cada versión; los demás esperan y
+    abren el archivo ya escrito.
+    """
+    ruta = ruta_instantanea(nombre, version, directorio)
+    precalculada = ruta_instantanea(nombre, version, DIRECTORIO_PRECALCULADO)
+    if os.path.exists(precalculada):
+        return abrir_instantanea(precalculada)
+    if not os.path.exists(ruta):
+        os.makedirs(directorio, exist_ok=True)
+        with BloqueoArchivo(f"{ruta}.lock"):
+            if not os.path.exists(ruta):
+                guardar_instantanea(cargar(), ruta)
+                _eliminar_versiones_anteriores(nombre, ruta, directorio)
+    return abrir_instantanea(ruta)
+
+
+def _eliminar_versiones_anteriores(nombre, vigente, directorio):
+    """Borra las instantáneas de otras versiones del mismo dataset (los procesos que las mapean conservan su copia)"""
+    for entrada in os.scandir(directorio):
+        if entrada.name.startswith(f"{nombre}-") and not entrada.path.startswith(vigente):
+            try:
+                os.remove(entrada.path)
+            except OSError:
+                pass
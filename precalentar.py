@@ -0,0 +1,166 @@
+"""
+Precalentamiento de las cachés del dashboard.
+
+Ejecuta, fuera de cualquier sesión, las mismas funciones de carga que usa
+streamlit_dashboard.py: instantáneas Arrow del inventario y los indicadores,
+índice de búsqueda, resúmenes, tablas de apoyo, consulta a Postgres y los
+gráficos del inventario. Todo queda en las cachés en disco (instantáneas,
+caché compartida e índice de trigramas), así que el primer visitante de cada
+worker solo las lee. Al terminar escribe un marcador con las versiones de los
+archivos de origen y los pasos fallidos, que --verificar compara con los
+archivos actuales. Un paso fallido no cambia el código de salida (0):
+servidor.py solo espera a que el precalentamiento termine para declararse listo.
+
+El escaneo de duplicados y el catálogo de esquemas leen el Data Lake completo
+y solo se calculan cuando un usuario los pide, así que no se precalientan.
+
+Con --imagen (lo usa el Dockerfile) todo se escribe en RUTA_PRECALCULADO:
+instantáneas, caché compartida e índice quedan dentro de la imagen y en
+ejecución se leen tal cual, sin procesar los archivos de origen. La consulta
+a Postgres se omite porque su resultado vence a los pocos minutos.
+
+Uso:
+    python precalentar.py             # precalienta
+    python precalentar.py --imagen    # genera la instantánea precalculada de la imagen
+    python precalentar.py --verificar # código 0 si el marcador (de cache/ o de la imagen) está vigente
+"""
+import json
+import os
+import sys
+import time
+
+import datos
+import historial
+from clasificador import RUTA_TAXONOMIAS
+
+RUTA_MARCADOR = os.environ.get('RUTA_MARCADOR_PRECALENTADO', 'cache/precalentado.json')
+RUTA_PRECALCULADO = os.environ.get('RUTA_PRECALCULADO', 'precalculado')
+RUTA_MARCADOR_PRECALCULADO = os.path.join(RUTA_PRECALCULADO, 'precalentado.json')
+
+# Archivos de origen cuyas versiones invalidan el precalentamiento
+ARCHIVOS_ORIGEN = [
+    datos.RUTA_INVENTARIO, datos.RUTA_INDICADORES, datos.RUTA_REGISTRO,
+    datos.RUTA_COMUNAS, datos.RUTA_NOMBRES_DIMENSIONES, RUTA_TAXONOMIAS
+]
+
+
+def versiones_origen():
+    """Versión de cada archivo de origen (None si no existe)"""
+    versiones = {}
+    for ruta in ARCHIVOS_ORIGEN:
+        try:
+            versiones[ruta] = datos.version_archivo(ruta)
+        except FileNotFoundError:
+            versiones[ruta] = None
+    return versiones
+
+
+def marcador_vigente(rutas=(RUTA_MARCADOR, RUTA_MARCADOR_PRECALCULADO)):
+    """
+    True si algún marcador corresponde a las versiones actuales de los archivos de origen.
+
+    Se revisan el del precalentamiento en ejecución (cache/) y el de la
+    instantánea precalculada de la imagen (--imagen).
+    """
+    versiones = versiones_origen()
+    for ruta in rutas:
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                if json.load(f).get('versiones') == versiones:
+                    return True
+        except (OSError, ValueError):
+            continue
+    return False
+
+
+def usar_precalculado(directorio=RUTA_PRECALCULADO):
+    """
+    Dirige las cachés en disco a la carpeta precalculada de la imagen.
+
+    Debe llamarse antes de importar streamlit_dashboard, que lee estas
+    rutas al importar cache_compartido, instantaneas y busqueda.
+    """
+    os.environ['RUTA_CACHE_COMPARTIDA'] = os.path.join(directorio, 'compartida.sqlite')
+    os.environ['RUTA_INSTANTANEAS'] = os.path.join(directorio, 'instantaneas')
+    os.environ['RUTA_INDICE_BUSQUEDA'] = os.path.join(directorio, 'indice_busqueda.npz')
+    return os.path.join(directorio, 'precalentado.json')
+
+
+def _pasos(app, imagen=False):
+    """Pasos del precalentamiento: (nombre, función), en el orden en que los necesita el dashboard"""
+    ruta = datos.RUTA_INVENTARIO
+    version = datos.version_archivo(ruta)
+
+    def graficos():
+        df = app.cargar_inventario_version(ruta, version)
+        # Cada una incluye sus variantes Global, Institucional y Territorial
+        app.figura_inventario(app.crear_grafico_extensiones_por_categoria, df)
+        app.figura_inventario(app.crear_grafico_top_extensiones_por_categoria, df)
+        app.figura_dimensiones_por_categoria(df)
+        app.figura_inventario(app.crear_grafico_institucional_territorial, df)
+        app.figura_inventario(app.crear_grafico_comparativo_extensiones, df)
+        app.figura_inventario(app.crear_heatmap_extension_dimension, df, app.TOP_HEATMAP)
+
+    pasos = [
+        ('inventario', lambda: app.cargar_inventario_version(ruta, version)),
+        ('conexión DuckDB', lambda: app.conexion_inventario(ruta, version)),
+        ('resumen de directorios', lambda: app.cargar_resumen_directorios(ruta, version)),
+        ('índice de búsqueda', lambda: app.cargar_indice_busqueda(ruta, version)),
+        ('actividad', lambda: app.cargar_actividad(ruta, version)),
+        ('indicadores', app.cargar_indicadores),
+        ('métodos de obtención', app.cargar_metodos_obtencion),
+        ('comunas', app.cargar_comunas),
+        ('nombres de dimensiones', app.cargar_nombres_dimensiones),
+        ('historial', lambda: app.cargar_crecimiento(tuple(
+            (fecha, historial.version_levantamiento(fecha)) for fecha in historial.listar_levantamientos()
+        ))),
+        ('países con convenios (Postgres)', app.cargar_paises_convenios),
+        ('gráficos del inventario', graficos),
+    ]
+    if imagen:
+        pasos = [(nombre, paso) for nombre, paso in pasos if paso is not app.cargar_paises_convenios]
+    return pasos
+
+
+def precalentar(ruta_marcador=RUTA_MARCADOR, imagen=False):
+    """
+    Ejecuta todos los pasos y escribe el marcador.
+
+    Un paso que falla (por ejemplo, Postgres no disponible) se informa y no
+    impide los demás; su dato se cargará en la primera visita. Devuelve la
+    lista de pasos fallidos.
+    """
+    # El dashboard se importa sin servidor de Streamlit; st.cache_resource funciona igual
+    import streamlit_dashboard as app
+
+    versiones = versiones_origen()
+    fallidos = []
+    inicio_total = time.perf_counter()
+    for nombre, paso in _pasos(app, imagen):
+        inicio = time.perf_counter()
+        try:
+            paso()
+        except Exception as error:
+            # Una fuente caída no debe dejar al dashboard sin el resto de las cachés
+            fallidos.append(nombre)
+            print(f"[precalentar] {nombre}: ERROR {type(error).__name__}: {error}", flush=True)
+            continue
+        print(f"[precalentar] {nombre}: {(time.perf_counter() - inicio) * 1000:,.0f} ms", flush=True)
+
+    with datos.escritura_atomica(ruta_marcador) as temporal, open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({
+            'versiones': versiones,
+            'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'segundos': round(time.perf_counter() - inicio_total, 1),
+            'fallidos': fallidos
+        }, f, ensure_ascii=False, indent=2)
+    return fallidos
+
+
+if __name__ == '__main__':
+    if '--verificar' in sys.argv:
+        sys.exit(0 if marcador_vigente() else 1)
+    if '--imagen' in sys.argv:
+        precalentar(usar_precalculado(), imagen=True)
+    else:
+        precalentar()
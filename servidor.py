@@ -0,0 +1,247 @@
+"""
+Arranque del dashboard con uno o varios workers de Streamlit.
+
+Con WORKERS=1 (por defecto) se ejecuta un solo `streamlit run` en el puerto
+público, como siempre. Con más workers cada uno escucha en un puerto local y
+nginx reparte las sesiones entre ellos con afinidad por cookie: el estado de
+una sesión vive en el worker que la atiende, así que todas las peticiones de
+un navegador (página, websocket y archivos de medios) deben llegar al mismo.
+Los workers comparten la caché en disco de cache_compartido.py, de modo que
+solo el primero carga cada dataset. Un worker que termina se vuelve a lanzar,
+con una espera que se duplica mientras siga cayendo al poco de arrancar.
+
+Antes de lanzar los workers se ejecuta precalentar.py (PRECALENTAR=0 lo
+omite), y en PUERTO_ESTADO se atienden /vivo (el proceso responde) y /listo
+(200 solo cuando terminó el precalentamiento y todos los workers responden),
+para que el balanceador o Docker no envíen usuarios a un worker frío.
+
+Uso:
+    WORKERS=4 python servidor.py
+"""
+import json
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Incluye la ruta /exportes/ para descargar exportaciones grandes
+SCRIPT = 'aplicacion.py'
+PUERTO = int(os.environ.get('PUERTO', 8501))
+WORKERS = int(os.environ.get('WORKERS', 1))
+PUERTO_PRIMER_WORKER = int(os.environ.get('PUERTO_PRIMER_WORKER', 8600))
+PUERTO_ESTADO = int(os.environ.get('PUERTO_ESTADO', 8502))
+PRECALENTAR = os.environ.get('PRECALENTAR', '1') != '0'
+
+# Espera (segundos) antes de relanzar un worker caído; se duplica con cada caída seguida
+ESPERA_REINICIO = 2
+ESPERA_REINICIO_MAXIMA = 300
+# Un worker que duró al menos esto antes de caer vuelve a la espera inicial
+DURACION_ESTABLE = 300
+
+PLANTILLA_NGINX = """
+worker_processes auto;
+pid {directorio}/nginx.pid;
+error_log stderr warn;
+events {{ worker_connections 4096; }}
+http {{
+    access_log off;
+    client_body_temp_path {directorio}/cuerpos;
+    proxy_temp_path {directorio}/proxy;
+    fastcgi_temp_path {directorio}/fastcgi;
+    uwsgi_temp_path {directorio}/uwsgi;
+    scgi_temp_path {directorio}/scgi;
+
+    # Afinidad: cada navegador recibe una cookie con un id al azar y siempre va al mismo worker
+    map $cookie_fiut_worker $afinidad {{
+        ""      $request_id;
+        default $cookie_fiut_worker;
+    }}
+    map $http_upgrade $conexion {{
+        default upgrade;
+        ""      close;
+    }}
+
+    upstream workers {{
+        hash $afinidad consistent;
+{servidores}
+    }}
+
+    server {{
+        listen {puerto};
+        client_max_body_size 200m;
+
+        location / {{
+            proxy_pass http://workers;
+            proxy_http_version 1.1;
+            proxy_set_header Host $host;
+            proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+            proxy_set_header Upgrade $http_upgrade;
+            proxy_set_header Connection $conexion;
+            proxy_read_timeout 86400;
+            # Las exportaciones grandes se entregan a medida que el worker las lee
+            proxy_buffering off;
+            add_header Set-Cookie "fiut_worker=$afinidad; Path=/; HttpOnly; SameSite=Lax" always;
+        }}
+    }}
+}}
+"""
+
+
+def comando_worker(puerto, direccion):
+    return [
+        sys.executable, '-m', 'streamlit', 'run', SCRIPT,
+        f'--server.port={puerto}', f'--server.address={direccion}', '--server.headless=true'
+    ]
+
+
+def configuracion_nginx(directorio, puertos, puerto=PUERTO):
+    """Archivo de configuración de nginx para repartir las sesiones entre los workers"""
+    for subdirectorio in ('cuerpos', 'proxy', 'fastcgi', 'uwsgi', 'scgi'):
+        os.makedirs(os.path.join(directorio, subdirectorio), exist_ok=True)
+    servidores = '\n'.join(f"        server 127.0.0.1:{p} max_fails=0;" for p in puertos)
+    ruta = os.path.join(directorio, 'nginx.conf')
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write(PLANTILLA_NGINX.format(directorio=directorio, servidores=servidores, puerto=puerto))
+    return ruta
+
+
+def worker_responde(puerto):
+    """True si el servidor de Streamlit del puerto responde a su chequeo de salud"""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/_stcore/health", timeout=2) as respuesta:
+            return respuesta.status == 200
+    except OSError:
+        return False
+
+
+def workers_responden(puertos):
+    """
+    Estado de cada worker: {puerto: responde}.
+
+    Se consultan en paralelo, así /listo tarda lo que el más lento (como máximo
+    el timeout de worker_responde) y no la suma de todos.
+    """
+    if not puertos:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(puertos)) as pool:
+        return dict(zip(map(str, puertos), pool.map(worker_responde, puertos)))
+
+
+def iniciar_servidor_estado(estado, puerto=PUERTO_ESTADO):
+    """
+    Servidor HTTP (en un hilo) con /vivo y /listo.
+
+    estado es un diccionario con 'precalentado' (bool) y 'puertos' (puertos
+    de los workers); /listo responde 503 mientras falte alguno de los dos.
+    """
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/vivo':
+                self._responder(200, {'vivo': True})
+            elif self.path == '/listo':
+                workers = workers_responden(list(estado['puertos']))
+                listo = estado['precalentado'] and bool(workers) and all(workers.values())
+                self._responder(200 if listo else 503, {
+                    'listo': listo, 'precalentado': estado['precalentado'], 'workers': workers
+                })
+            else:
+                self._responder(404, {})
+
+        def _responder(self, codigo, cuerpo):
+            datos = json.dumps(cuerpo).encode('utf-8')
+            self.send_response(codigo)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('0.0.0.0', puerto), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def ejecutar(workers=WORKERS, puerto=PUERTO, primer_puerto=PUERTO_PRIMER_WORKER, precalentar=PRECALENTAR):
+    """
+    Precalienta las cachés, lanza los workers (y nginx si son varios) y los mantiene vivos.
+
+    Termina al recibir SIGTERM o SIGINT.
+    """
+    estado = {'precalentado': False, 'puertos': []}
+    iniciar_servidor_estado(estado)
+    if precalentar:
+        # En otro proceso, para que su memoria se libere antes de lanzar los workers
+        codigo = subprocess.run([sys.executable, 'precalentar.py']).returncode
+        if codigo != 0:
+            print(f"El precalentamiento terminó con código {codigo}; las cachés se completarán en las visitas", flush=True)
+    estado['precalentado'] = True
+
+    # Todos los workers deben firmar las cookies de Streamlit con el mismo secreto
+    entorno = dict(os.environ)
+    entorno.setdefault('STREAMLIT_SERVER_COOKIE_SECRET', secrets.token_hex(32))
+
+    # Con un solo worker no hace falta proxy: escucha directamente en el puerto público
+    if workers <= 1:
+        direcciones = {puerto: '0.0.0.0'}
+    else:
+        direcciones = {primer_puerto + i: '127.0.0.1' for i in range(workers)}
+    procesos = {p: subprocess.Popen(comando_worker(p, d), env=entorno) for p, d in direcciones.items()}
+    estado['puertos'] = list(procesos)
+    nginx = None
+    detener = []
+    signal.signal(signal.SIGTERM, lambda *_: detener.append(True))
+    signal.signal(signal.SIGINT, lambda *_: detener.append(True))
+    try:
+        if workers > 1:
+            directorio = tempfile.mkdtemp(prefix='fiut_nginx_')
+            nginx = subprocess.Popen(
+                ['nginx', '-c', configuracion_nginx(directorio, list(procesos), puerto), '-g', 'daemon off;']
+            )
+        inicios = dict.fromkeys(procesos, time.monotonic())
+        caidas = dict.fromkeys(procesos, 0)
+        reinicios = {}  # puerto -> momento en que se relanza su worker caído
+        while not detener:
+            ahora = time.monotonic()
+            for p, proceso in procesos.items():
+                if p in reinicios:
+                    if ahora >= reinicios[p]:
+                        del reinicios[p]
+                        procesos[p] = subprocess.Popen(comando_worker(p, direcciones[p]), env=entorno)
+                        inicios[p] = ahora
+                elif proceso.poll() is not None:
+                    # Un worker que cae al poco de arrancar espera el doble antes de cada nuevo intento
+                    caidas[p] = 1 if ahora - inicios[p] >= DURACION_ESTABLE else caidas[p] + 1
+                    espera = min(ESPERA_REINICIO * 2 ** (caidas[p] - 1), ESPERA_REINICIO_MAXIMA)
+                    reinicios[p] = ahora + espera
+                    repetidas = f", {caidas[p]} caídas seguidas" if caidas[p] > 1 else ''
+                    print(
+                        f"Worker del puerto {p} terminó (código {proceso.returncode}{repetidas}); se reinicia en {espera} s",
+                        flush=True
+                    )
+            if nginx is not None and nginx.poll() is not None:
+                print(f"nginx terminó (código {nginx.returncode})", flush=True)
+                break
+            time.sleep(2)
+    finally:
+        todos = [p for p in [nginx, *procesos.values()] if p is not None]
+        for proceso in todos:
+            if proceso.poll() is None:
+                proceso.terminate()
+        for proceso in todos:
+            try:
+                proceso.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+
+
+if __name__ == '__main__':
+    ejecutar()
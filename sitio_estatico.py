@@ -0,0 +1,411 @@
+"""
+Exportación del dashboard a un sitio estático (HTML + JSON) para servir desde un CDN.
+
+Cada vista se ejecuta sin navegador con el ejecutor de scripts de Streamlit
+(streamlit.testing.v1.AppTest), igual que la vería un visitante: la vista
+general y cada ruta embebida (?dimension=… y ?dimension=…&indicador=…). Los
+elementos resultantes se traducen a HTML: títulos, textos, métricas, tablas,
+pestañas y columnas; cada gráfico Plotly se guarda como JSON y cada gráfico
+embebido (components.html) como un HTML aparte, que el navegador carga al
+acercarse a ellos. Los controles (radios, botones, formularios) se omiten: la
+página muestra la opción por defecto. Las pestañas que solo funcionan contra
+el servidor (explorador y búsqueda de archivos, duplicados, historial y
+consola SQL) no se exportan: con --url-interactiva se reemplazan por un
+enlace a Streamlit.
+
+Los archivos de datos y recursos se nombran con un hash de su contenido, así
+que el CDN puede guardarlos sin vencimiento; solo las páginas (index.html y
+dimension-*.html) cambian de una exportación a otra. index.html redirige las URL antiguas con
+parámetros a su página estática y, si se indica --url-interactiva, envía a
+Streamlit el formulario y las rutas que no tienen versión estática.
+
+Uso:
+    python sitio_estatico.py                 # genera sitio/
+    python sitio_estatico.py destino --url-interactiva https://dashboard.ejemplo.cl
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import time
+from unittest import mock
+
+import plotly.offline
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.testing.v1 import AppTest
+
+import graficos_estaticos
+from datos import escritura_atomica
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_dashboard.py')
+DIRECTORIO_SITIO = 'sitio'
+
+# Rutas embebidas: dimensiones institucionales (a-g) y territoriales (1-7), con o sin indicador
+DIMENSIONES = [chr(c) for c in range(ord('a'), ord('h'))] + [str(n) for n in range(1, 8)]
+INDICADORES = ['i_20', 'i_21', 'i_22', 'i_23_crudo', 'i_24', 't_4', 't_6', 't_7_b']
+
+# Pestañas que consultan el Data Lake o el historial en vivo; no tienen versión estática
+PESTANAS_INTERACTIVAS = {"Explorador de Archivos", "Duplicados", "Historial", "Consola SQL"}
+
+# Las tablas del inventario pueden ser muy grandes; en el sitio estático se muestran sus primeras filas
+FILAS_MAXIMAS_TABLA = 500
+
+TIEMPO_MAXIMO_VISTA = 300  # segundos
+
+# Cache-Control de los recursos con hash en el nombre y de las páginas
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_PAGINAS = 'public, max-age=300'
+
+ESTILO = """
+body { font-family: "Source Sans Pro", Arial, sans-serif; color: #31333F; margin: 0 auto; max-width: 1400px; padding: 1rem 2rem; }
+h1, h2, h3 { color: #0A5C99; }
+.fila { display: flex; gap: 1rem; flex-wrap: wrap; }
+.columna { min-width: 0; }
+.pestanas { display: flex; gap: .5rem; flex-wrap: wrap; border-bottom: 1px solid #ddd; margin: 1rem 0; }
+.pestanas button { border: 0; background: none; padding: .5rem .75rem; cursor: pointer; font: inherit; }
+.pestanas button.activa { border-bottom: 3px solid #0A5C99; color: #0A5C99; }
+.pestana[hidden] { display: none; }
+.grafico { min-height: 450px; }
+.tabla-contenedor { overflow-x: auto; max-height: 500px; }
+table.tabla { border-collapse: collapse; font-size: .9rem; }
+table.tabla th, table.tabla td { border: 1px solid #e6e9ef; padding: .25rem .5rem; text-align: left; }
+.metrica .etiqueta { font-size: .9rem; }
+.metrica .valor { font-size: 2rem; }
+.aviso { background: #f0f2f6; border-radius: .5rem; padding: .75rem 1rem; margin: .5rem 0; }
+.nota { color: #6C757D; font-size: .85rem; }
+iframe.embebido { width: 100%; border: 0; }
+img { max-width: 100%; max-height: 160px; display: block; margin: 0 auto; }
+"""
+
+# Dibuja cada gráfico al acercarse a la pantalla y maneja las pestañas
+SCRIPT_SITIO = """
+(function () {
+  function dibujar(div) {
+    fetch(div.dataset.figura).then(function (r) { return r.json(); }).then(function (figura) {
+      Plotly.newPlot(div, figura.data, figura.layout, {responsive: true, displaylogo: false});
+    });
+  }
+  var observador = 'IntersectionObserver' in window ? new IntersectionObserver(function (entradas) {
+    entradas.forEach(function (entrada) {
+      if (entrada.isIntersecting) { observador.unobserve(entrada.target); dibujar(entrada.target); }
+    });
+  }, {rootMargin: '300px'}) : null;
+  document.querySelectorAll('.grafico').forEach(function (div) {
+    if (observador) { observador.observe(div); } else { dibujar(div); }
+  });
+  document.querySelectorAll('.pestanas').forEach(function (nav) {
+    var botones = nav.querySelectorAll('button');
+    botones.forEach(function (boton) {
+      boton.addEventListener('click', function () {
+        botones.forEach(function (b) {
+          b.classList.toggle('activa', b === boton);
+          document.getElementById(b.dataset.pestana).hidden = b !== boton;
+        });
+      });
+    });
+  });
+})();
+"""
+
+# En index.html: las URL con parámetros de la versión en Streamlit se llevan a su página estática
+REDIRECCION = """
+(function () {
+  var rutas = {rutas}, interactiva = {interactiva};
+  var p = new URLSearchParams(location.search);
+  if (!location.search) return;
+  var clave = p.has('dimension') ? 'dimension=' + p.get('dimension') + (p.has('indicador') ? '&indicador=' + p.get('indicador') : '') : null;
+  if (clave && rutas[clave]) { location.replace(rutas[clave]); }
+  else if (interactiva) { location.replace(interactiva + location.search); }
+})();
+"""
+
+
+def _firma(contenido):
+    return hashlib.blake2b(contenido, digest_size=8).hexdigest()
+
+
+class Sitio:
+    """Directorio de salida con recursos nombrados por el hash de su contenido"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        for subdirectorio in ('assets', 'datos', 'graficos'):
+            os.makedirs(os.path.join(directorio, subdirectorio), exist_ok=True)
+
+    def recurso(self, subdirectorio, nombre, extension, contenido):
+        """Guarda un recurso inmutable y devuelve su ruta relativa; el mismo contenido se guarda una sola vez"""
+        if isinstance(contenido, str):
+            contenido = contenido.encode('utf-8')
+        relativa = f"{subdirectorio}/{nombre}-{_firma(contenido)}.{extension}"
+        ruta = os.path.join(self.directorio, relativa)
+        if not os.path.exists(ruta):
+            with open(ruta, 'wb') as f:
+                f.write(contenido)
+        return relativa
+
+    def pagina(self, nombre, contenido):
+        with open(os.path.join(self.directorio, nombre), 'w', encoding='utf-8') as f:
+            f.write(contenido)
+
+
+class _AlmacenMedios(MemoryMediaFileStorage):
+    # AppTest crea su almacén de medios en cada ejecución y no lo expone; se
+    # reemplaza su clase (interna de streamlit.testing) para leer las imágenes.
+    # Por eso requirements.txt fija la versión menor de Streamlit
+    ultimo = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _AlmacenMedios.ultimo = self
+
+
+def ejecutar_vista(parametros=None):
+    """Ejecuta el dashboard con los parámetros de URL indicados; devuelve (árbol de elementos, almacén de medios)"""
+    app = AppTest.from_file(SCRIPT, default_timeout=TIEMPO_MAXIMO_VISTA)
+    for clave, valor in (parametros or {}).items():
+        app.query_params[clave] = valor
+    with mock.patch('streamlit.testing.v1.app_test.MemoryMediaFileStorage', _AlmacenMedios):
+        app.run()
+    if len(app.exception):
+        raise RuntimeError(app.exception[0].value)
+    return app.main, _AlmacenMedios.ultimo
+
+
+def _markdown(texto):
+    """HTML de un texto de st.markdown: el HTML se deja tal cual; del Markdown se usan títulos, párrafos y negritas"""
+    texto = texto.strip()
+    if texto.startswith('<'):
+        return texto
+    bloques = []
+    for bloque in re.split(r'\n\s*\n', texto):
+        titulo = re.match(r'(#{1,6})\s+(.*)', bloque)
+        if titulo:
+            nivel = len(titulo.group(1))
+            bloques.append(f"<h{nivel}>{html.escape(titulo.group(2).strip())}</h{nivel}>")
+            continue
+        parrafo = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html.escape(bloque))
+        bloques.append(f"<p>{parrafo.replace(chr(10), '<br>')}</p>")
+    return '\n'.join(bloques)
+
+
+def _tabla(df):
+    filas = len(df)
+    contenido = df.head(FILAS_MAXIMAS_TABLA).to_html(index=False, border=0, classes='tabla', na_rep='')
+    nota = f"<p class='nota'>Primeras {FILAS_MAXIMAS_TABLA:,} de {filas:,} filas.</p>" if filas > FILAS_MAXIMAS_TABLA else ''
+    return f"<div class='tabla-contenedor'>{contenido}</div>{nota}"
+
+
+class _Traductor:
+    """Convierte el árbol de elementos de una vista en HTML, guardando gráficos e imágenes en el sitio"""
+
+    def __init__(self, sitio, medios, url_interactiva=None):
+        self.sitio = sitio
+        self.medios = medios
+        self.url_interactiva = url_interactiva
+        self.pestanas = 0
+
+    def html(self, nodo):
+        tipo = getattr(nodo, 'type', None)
+        if tipo == 'tab_container':
+            return self._pestanas(nodo)
+        if tipo == 'flex_container' and any(getattr(h, 'type', None) == 'column' for h in nodo.children.values()):
+            columnas = [h for h in nodo.children.values() if getattr(h, 'type', None) == 'column']
+            return "<div class='fila'>" + ''.join(
+                f"<div class='columna' style='flex: {c.weight} 1 0'>{self._hijos(c)}</div>" for c in columnas
+            ) + "</div>"
+        if tipo == 'expander':
+            return f"<details><summary>{html.escape(nodo.label)}</summary>{self._hijos(nodo)}</details>"
+        if hasattr(nodo, 'children') and tipo not in ('plotly_chart', 'iframe'):
+            return self._hijos(nodo)
+        return self._elemento(nodo, tipo)
+
+    def _hijos(self, nodo):
+        return '\n'.join(filter(None, (self.html(h) for h in nodo.children.values())))
+
+    def _pestanas(self, nodo):
+        pestanas = [h for h in nodo.children.values() if getattr(h, 'type', None) == 'tab']
+        # Las pestañas vacías (p. ej. en las rutas embebidas) no se muestran
+        contenidos = [(p.label, self._contenido_pestana(p)) for p in pestanas]
+        contenidos = [(etiqueta, contenido) for etiqueta, contenido in contenidos if contenido.strip()]
+        if len(contenidos) <= 1:
+            return ''.join(contenido for _, contenido in contenidos)
+        self.pestanas += 1
+        ids = [f"pestana-{self.pestanas}-{i}" for i in range(len(contenidos))]
+        botones = ''.join(
+            f"<button type='button' data-pestana='{id_}'{' class=activa' if i == 0 else ''}>{html.escape(etiqueta)}</button>"
+            for i, (id_, (etiqueta, _)) in enumerate(zip(ids, contenidos))
+        )
+        secciones = ''.join(
+            f"<section class='pestana' id='{id_}'{'' if i == 0 else ' hidden'}>{contenido}</section>"
+            for i, (id_, (_, contenido)) in enumerate(zip(ids, contenidos))
+        )
+        return f"<nav class='pestanas'>{botones}</nav>{secciones}"
+
+    def _contenido_pestana(self, pestana):
+        if pestana.label not in PESTANAS_INTERACTIVAS:
+            return self._hijos(pestana)
+        if not self.url_interactiva:
+            return ''
+        return (f"<p class='nota'>Esta sección consulta los archivos en vivo y solo está disponible en la "
+                f"<a href='{html.escape(self.url_interactiva)}'>versión interactiva</a>.</p>")
+
+    def _elemento(self, nodo, tipo):
+        if tipo == 'title':
+            return f"<h1>{html.escape(nodo.value)}</h1>"
+        if tipo == 'header':
+            return f"<h2>{html.escape(nodo.value)}</h2>"
+        if tipo == 'subheader':
+            return f"<h3>{html.escape(nodo.value)}</h3>"
+        if tipo == 'caption':
+            return f"<p class='nota'>{html.escape(nodo.value)}</p>"
+        if tipo == 'markdown':
+            return _markdown(nodo.value)
+        if tipo == 'html':
+            return nodo.value
+        if tipo in ('info', 'success', 'warning', 'error'):
+            return f"<div class='aviso'>{_markdown(nodo.value)}</div>"
+        if tipo == 'metric':
+            delta = f"<div class='nota'>{html.escape(nodo.delta)}</div>" if nodo.delta else ''
+            return (f"<div class='metrica'><div class='etiqueta'>{html.escape(nodo.label)}</div>"
+                    f"<div class='valor'>{html.escape(nodo.value)}</div>{delta}</div>")
+        if tipo in ('dataframe', 'table'):
+            return _tabla(nodo.value)
+        if tipo == 'plotly_chart':
+            ruta = self.sitio.recurso('datos', 'figura', 'json', nodo.proto.spec)
+            return f"<div class='grafico' data-figura='{ruta}'></div>"
+        if tipo == 'iframe':
+            # Los gráficos diferidos solo traen un marcador: se exporta el gráfico publicado al que apunta
+            publicado = re.search(r'data-src="([^"]+)"', nodo.proto.srcdoc)
+            local = graficos_estaticos.ruta_publicada(publicado.group(1)) if publicado else None
+            if local:
+                with open(local, 'rb') as f:
+                    contenido = f.read()
+            else:
+                contenido = nodo.proto.srcdoc
+            ruta = self.sitio.recurso('graficos', 'grafico', 'html', contenido)
+            return f"<iframe class='embebido' src='{ruta}' height='600' loading='lazy'></iframe>"
+        if tipo == 'image':
+            return ''.join(self._imagen(imagen) for imagen in nodo.proto.imgs)
+        # Controles y demás elementos interactivos no tienen versión estática
+        return ''
+
+    def _imagen(self, imagen):
+        archivo = self.medios.get_file(imagen.url.rsplit('/', 1)[-1])
+        extension = archivo.mimetype.split('/')[-1].replace('jpeg', 'jpg').replace('svg+xml', 'svg')
+        ruta = self.sitio.recurso('assets', 'imagen', extension, archivo.content)
+        return f"<img src='{ruta}' alt='{html.escape(imagen.caption)}'>"
+
+
+def _documento(titulo, cuerpo, recursos, cabecera=''):
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html.escape(titulo)}</title>
+<link rel="stylesheet" href="{recursos['estilo']}">
+{cabecera}
+</head>
+<body>
+{cuerpo}
+<script src="{recursos['plotly']}"></script>
+<script src="{recursos['sitio']}"></script>
+</body>
+</html>
+"""
+
+
+def _nombre_pagina(parametros):
+    if not parametros:
+        return 'index.html'
+    return '-'.join(['dimension', parametros['dimension']] + ([parametros['indicador']] if 'indicador' in parametros else [])) + '.html'
+
+
+def _encabezados(paginas):
+    """
+    Archivo _headers para CDN que leen los encabezados de un archivo (Netlify, Cloudflare Pages).
+
+    Cada ruta calza con una sola regla: las carpetas con hash en el nombre
+    (también los gráficos .html) no vencen y las páginas, que se reemplazan
+    en cada exportación, se listan una por una con un vencimiento corto.
+    """
+    reglas = [(f"/{carpeta}/*", CACHE_INMUTABLE) for carpeta in ('assets', 'datos', 'graficos')]
+    reglas += [(f"/{nombre}", CACHE_PAGINAS) for nombre in ['', 'index.html', 'manifiesto.json', *sorted(paginas)]]
+    return ''.join(f"{ruta}\n  Cache-Control: {valor}\n" for ruta, valor in reglas)
+
+
+def rutas_a_exportar():
+    """Parámetros de URL de cada vista: la general, cada dimensión y cada dimensión con cada indicador"""
+    rutas = [{}]
+    for dimension in DIMENSIONES:
+        rutas.append({'dimension': dimension})
+        rutas.extend({'dimension': dimension, 'indicador': indicador} for indicador in INDICADORES)
+    return rutas
+
+
+def exportar_sitio(directorio=DIRECTORIO_SITIO, url_interactiva=None):
+    """
+    Genera el sitio estático en directorio y devuelve el manifiesto (páginas y vistas omitidas).
+
+    Se construye en una carpeta temporal que reemplaza a la anterior al final.
+    """
+    with escritura_atomica(directorio) as temporal:
+        manifiesto = _armar_sitio(Sitio(temporal), url_interactiva)
+    return manifiesto
+
+
+def _armar_sitio(sitio, url_interactiva):
+    """Escribe las páginas, recursos, _headers y manifiesto del sitio; devuelve el manifiesto"""
+    recursos = {
+        'plotly': sitio.recurso('assets', 'plotly', 'min.js', plotly.offline.get_plotlyjs()),
+        'estilo': sitio.recurso('assets', 'estilo', 'css', ESTILO),
+        'sitio': sitio.recurso('assets', 'sitio', 'js', SCRIPT_SITIO),
+    }
+    enlace = (f"<p class='nota'><a href='{html.escape(url_interactiva)}'>Abrir la versión interactiva</a></p>"
+              if url_interactiva else '')
+
+    paginas, omitidas, indice = {}, {}, None
+    for parametros in rutas_a_exportar():
+        consulta = '&'.join(f"{k}={v}" for k, v in parametros.items())
+        inicio = time.perf_counter()
+        try:
+            arbol, medios = ejecutar_vista(parametros)
+        except Exception as error:
+            # Vistas con fuentes no disponibles (p. ej. Postgres) quedan en la versión interactiva
+            omitidas[consulta or 'index'] = f"{type(error).__name__}: {error}"
+            print(f"[sitio] {consulta or 'index'}: omitida ({error})", flush=True)
+            continue
+        cuerpo = enlace + _Traductor(sitio, medios, url_interactiva).html(arbol)
+        nombre = _nombre_pagina(parametros)
+        if parametros:
+            sitio.pagina(nombre, _documento("Proyecto FIUT 2024 UTEM", cuerpo, recursos))
+            paginas[consulta] = nombre
+        else:
+            indice = cuerpo
+        print(f"[sitio] {consulta or 'index'}: {(time.perf_counter() - inicio) * 1000:,.0f} ms", flush=True)
+
+    redireccion = REDIRECCION.replace('{rutas}', json.dumps(paginas)).replace('{interactiva}', json.dumps(url_interactiva))
+    sitio.pagina('index.html', _documento(
+        "Proyecto FIUT 2024 UTEM", indice or enlace, recursos, f"<script>{redireccion}</script>"
+    ))
+    sitio.pagina('_headers', _encabezados(paginas.values()))
+    manifiesto = {
+        'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'paginas': paginas,
+        'omitidas': omitidas,
+        'recursos': recursos,
+    }
+    sitio.pagina('manifiesto.json', json.dumps(manifiesto, ensure_ascii=False, indent=2))
+    return manifiesto
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argumentos.add_argument('directorio', nargs='?', default=DIRECTORIO_SITIO)
+    argumentos.add_argument('--url-interactiva', default=os.environ.get('URL_INTERACTIVA'),
+                            help="URL del dashboard en Streamlit para el formulario y las vistas sin versión estática")
+    opciones = argumentos.parse_args()
+    resultado = exportar_sitio(opciones.directorio, opciones.url_interactiva)
+    print(f"[sitio] {len(resultado['paginas']) + 1} páginas, {len(resultado['omitidas'])} omitidas", flush=True)
@@ -7,8 +7,24 @@ from plotly.subplots import make_subplots
 import os
 import duckdb
 import sys
+import time
 from sqlalchemy import create_engine
 import credenciales as cred
+import datos
+import consultas_inventario
+import busqueda
+import duplicados
+import historial
+import actividad
+import catalogo
+import consola_sql
+import exportaciones
+import graficos_estaticos
+import cache_compartido
+import instantaneas
+from cache_compartido import armar_clave
+from clasificador import RUTA_TAXONOMIAS, cargar_clasificador
+from arbol_directorios import RAIZ, resumir_subarboles
 
 # Configuración de la página
 st.set_page_config(
@@ -22,59 +38,140 @@ st.set_page_config(
 )
 
 # Función para cargar los datos
-@st.cache_data
-def cargar_datos(ruta='data/estructura_archivos.csv'):
-    """Carga los datos del archivo CSV o genera un DataFrame vacío si no existe"""
+def cargar_datos(ruta=datos.RUTA_INVENTARIO):
+    """Carga, procesa y compacta el inventario una sola vez por proceso; el DataFrame es compartido y de solo lectura"""
     try:
-        df = pd.read_csv(ruta)
-        return df
+        return cargar_inventario_version(ruta, datos.version_archivo(ruta))
     except FileNotFoundError:
         st.error(f"Archivo {ruta} no encontrado. Por favor ejecuta primero el script de generación.")
         return pd.DataFrame()
 
-# Función para procesar y limpiar los datos
-def procesar_datos(df):
-    """Procesa y limpia los datos para el análisis"""
-    if df.empty:
-        return df
-    
-    # Filtrar solo archivos (no directorios)
-    df = df[df['tipo'] == 'Archivo'].copy()
-    
-    # Eliminar filas con extensión vacía
-    df = df[df['extension'] != ''].copy()
-    
-    # Eliminar archivos .ipynb
-    df = df[df['extension'] != '.ipynb'].copy()
-    
-    # Extraer dimensión de la ruta
-    dims = []
-    for ruta in df['ruta_relativa']:
-        dim_encontrada = False
-        for i in range(1, 8):
-            dim_str = f"Dimensión {i}"
-            if dim_str in ruta:
-                dims.append(dim_str)
-                dim_encontrada = True
-                break
-        if not dim_encontrada:
-            dims.append('Sin clasificación')
-    
-    df['dimensiones'] = dims
-    
-    # Verificar columnas institucional/territorial
-    if 'institucional' not in df.columns or 'territorial' not in df.columns:
-        inst = []
-        terr = []
-        for ruta in df['ruta_relativa']:
-            partes = ruta.split('\\')
-            inst.append(partes[0] == 'Institucional')
-            terr.append(partes[0] == 'Territorial')
-        
-        df['institucional'] = inst
-        df['territorial'] = terr
-    
-    return df.reset_index(drop=True)
+@st.cache_resource
+def cache_compartida():
+    """Caché en disco común a todos los workers (segundo nivel tras st.cache_resource)"""
+    return cache_compartido.CacheCompartida()
+
+@st.cache_resource(max_entries=2)
+def cargar_inventario_version(ruta, version):
+    """Inventario de una versión concreta del archivo; se recarga solo cuando el archivo cambia"""
+    # Instantánea Arrow mapeada en memoria, compartida por todos los workers;
+    # las taxonomías también determinan el resultado del procesamiento
+    df = instantaneas.instantanea(
+        'inventario', (ruta, version, datos.version_archivo(RUTA_TAXONOMIAS)), lambda: datos.cargar_inventario(ruta)
+    )
+    return df
+
+@st.cache_resource(max_entries=2)
+def conexion_inventario(ruta, version):
+    """Conexión DuckDB con el inventario de una versión, compartida por todas las sesiones"""
+    return consultas_inventario.crear_conexion(cargar_inventario_version(ruta, version))
+
+@st.cache_resource(max_entries=2)
+def cargar_resumen_directorios(ruta, version):
+    """Totales por subárbol del árbol de directorios, calculados una vez por versión del inventario"""
+    df = cargar_inventario_version(ruta, version)
+    return cache_compartida().obtener_o_calcular(
+        armar_clave('resumen_directorios', ruta, version),
+        lambda: resumir_subarboles(df.attrs['arbol'], df['nodo'], df['bytes'], df['extension'])
+    )
+
+@st.cache_resource(max_entries=1)
+def cargar_indice_busqueda(ruta, version):
+    """Índice de trigramas de las rutas del inventario; se guarda en disco y se actualiza cuando el inventario cambia"""
+    df = cargar_inventario_version(ruta, version)
+    return busqueda.indice_para_inventario(datos.ruta_relativa(df).astype(object), version)
+
+@st.cache_resource(max_entries=2)
+def cargar_actividad(ruta, version):
+    """Conteos diarios de creación y modificación de archivos de una versión del inventario"""
+    return cache_compartida().obtener_o_calcular(
+        armar_clave('actividad', ruta, version),
+        lambda: actividad.resumir_actividad(cargar_inventario_version(ruta, version))
+    )
+
+@st.cache_resource(max_entries=1, show_spinner="Perfilando archivos tabulares...")
+def cargar_catalogo_esquemas(ruta, version):
+    """Catálogo de esquemas de los archivos tabulares de una versión del inventario"""
+    return cache_compartida().obtener_o_calcular(
+        armar_clave('catalogo_esquemas', ruta, version),
+        lambda: catalogo.catalogo_esquemas(cargar_inventario_version(ruta, version))
+    )
+
+@st.cache_resource(max_entries=2)
+def cargar_crecimiento(levantamientos):
+    """Archivos y bytes por levantamiento ((fecha, versión), ...); se recalcula solo cuando se agrega o reemplaza uno"""
+    return cache_compartida().obtener_o_calcular(armar_clave('crecimiento', *levantamientos), historial.crecimiento)
+
+@st.cache_resource(max_entries=8)
+def cargar_diferencias(fecha_anterior, fecha_posterior, version_anterior, version_posterior):
+    """Cambios entre dos levantamientos; la versión de cada uno invalida la caché si se reemplaza"""
+    return cache_compartida().obtener_o_calcular(
+        armar_clave('diferencias', fecha_anterior, fecha_posterior, version_anterior, version_posterior),
+        lambda: historial.diferencias(fecha_anterior, fecha_posterior)
+    )
+
+@st.cache_resource(max_entries=1, show_spinner="Calculando hashes de los archivos candidatos...")
+def cargar_duplicados(ruta, version):
+    """Grupos de archivos duplicados por contenido de una versión del inventario"""
+    return cache_compartida().obtener_o_calcular(
+        armar_clave('duplicados_contenido', ruta, version),
+        lambda: duplicados.detectar_duplicados(cargar_inventario_version(ruta, version))
+    )
+
+@st.cache_resource(max_entries=1)
+def cargar_tabla_archivos_sql(ruta, version):
+    """Tabla 'archivos' de la consola SQL para una versión del inventario"""
+    return consola_sql.tabla_archivos(cargar_inventario_version(ruta, version))
+
+@st.cache_resource(max_entries=64)
+def publicar_grafico(ruta, version):
+    """URL de un gráfico HTML copiado a la carpeta estática; se copia una vez por versión del archivo"""
+    return graficos_estaticos.publicar_grafico(ruta)
+
+@st.cache_resource
+def cache_resultados_sql():
+    """Resultados recientes de la consola SQL, compartidos por todas las sesiones"""
+    return consola_sql.CacheResultados()
+
+@st.cache_resource(max_entries=2)
+def cargar_defectos_taxonomias(ruta, version):
+    """Valor por defecto (sin clasificar) de cada taxonomía: columna -> defecto"""
+    return {taxonomia['columna']: taxonomia['defecto'] for taxonomia in cargar_clasificador(ruta).taxonomias}
+
+# Función para obtener un gráfico del inventario desde la caché compartida
+def figura_inventario(crear, df, *args, ruta=datos.RUTA_INVENTARIO):
+    """Gráfico crear(df, *args) armado una vez por versión del inventario y compartido por todos los workers"""
+    clave = armar_clave('figura', crear.__name__, *args, datos.version_archivo(ruta))
+    return cache_compartida().figura(clave, lambda: crear(df, *args))
+
+# Función para ofrecer la descarga de una tabla en CSV o Parquet
+def mostrar_exportacion(nombre, exportar, key):
+    """
+    Controles para descargar una tabla como CSV o Parquet.
+
+    exportar(formato) genera el archivo solo cuando se pide y devuelve su ruta;
+    el navegador lo descarga desde la ruta /exportes/, sin cargarlo en la sesión.
+    """
+    col1, col2, col3 = st.columns([1, 1, 3])
+    with col1:
+        formato = st.selectbox(
+            "Formato", list(exportaciones.FORMATOS), key=f"{key}_formato", label_visibility="collapsed"
+        )
+    with col2:
+        if not st.button("Exportar", key=f"{key}_exportar", use_container_width=True):
+            return
+    try:
+        ruta = exportar(formato)
+    except (duckdb.Error, OSError) as error:
+        st.error(f"No se pudo generar la exportación: {error}")
+        return
+    archivo = f"{nombre}.{exportaciones.FORMATOS[formato][0]}"
+    with col3:
+        st.markdown(
+            f'<a href="{exportaciones.url_exportacion(ruta)}" download="{archivo}">⬇ Descargar {archivo}</a> '
+            f'({os.path.getsize(ruta) / 1024:,.1f} KB)',
+            unsafe_allow_html=True
+        )
 
 # Función para crear gráfico de barras institucional vs territorial
 def crear_grafico_institucional_territorial(df):
@@ -102,22 +199,26 @@ def crear_grafico_institucional_territorial(df):
     
     return fig
 
-# Función para crear gráfico de distribución de extensiones
-def crear_grafico_extensiones(df, filtro=None):
-    # Aplicar filtro si es necesario
+# Extensiones con porción propia en el gráfico de extensiones; las demás se suman en "Otros"
+TOP_EXTENSIONES = 8
+
+# Función para contar archivos por extensión según la categoría
+def contar_extensiones(df, filtro=None):
     if filtro == 'institucional':
-        df_temp = df[df['institucional'] == True]
-        titulo = 'Distribución de Tipos de Archivos - Institucional'
+        df = df[df['institucional'] == True]
     elif filtro == 'territorial':
-        df_temp = df[df['territorial'] == True]
-        titulo = 'Distribución de Tipos de Archivos - Territorial'
-    else:
-        df_temp = df
-        titulo = 'Distribución de Tipos de Archivos - Global'
+        df = df[df['territorial'] == True]
+    # Las columnas categóricas cuentan también las categorías ausentes en el filtro
+    conteo = df['extension'].value_counts().loc[lambda c: c > 0].reset_index()
+    conteo.columns = ['extension', 'conteo']
+    return conteo
+
+# Función para crear gráfico de distribución de extensiones
+def crear_grafico_extensiones(df, filtro=None):
+    titulo = f"Distribución de Tipos de Archivos - {filtro.capitalize() if filtro else 'Global'}"
     
-    # Contar extensiones
-    conteo_extensiones = df_temp['extension'].value_counts().reset_index()
-    conteo_extensiones.columns = ['extension', 'conteo']
+    # Contar extensiones; las menos frecuentes se agrupan en "Otros" (el detalle se muestra a pedido)
+    conteo_extensiones, _ = datos.reducir_top_n(contar_extensiones(df, filtro), 'extension', 'conteo', TOP_EXTENSIONES)
     
     # Calcular porcentaje
     total = conteo_extensiones['conteo'].sum()
@@ -181,7 +282,7 @@ def crear_grafico_dimensiones(df, filtro=None):
         return None
     
     # Contar dimensiones
-    conteo_dimensiones = df_temp['dimensiones'].value_counts().reset_index()
+    conteo_dimensiones = df_temp['dimensiones'].value_counts().loc[lambda c: c > 0].reset_index()
     conteo_dimensiones.columns = ['dimension', 'conteo']
     
     # Ordenar por nombre de dimensión
@@ -212,6 +313,155 @@ def crear_grafico_dimensiones(df, filtro=None):
     
     return fig
 
+# Variantes por categoría de los gráficos del inventario: etiqueta del selector -> filtro
+FILTROS_CATEGORIA = {"Global": None, "Institucional": 'institucional', "Territorial": 'territorial'}
+
+# Alto agregado a una figura que lleva su tabla debajo del gráfico
+ALTO_TABLA_FIGURA = 280
+
+# Función para filtrar el inventario según la categoría
+def filtrar_categoria(df, filtro=None):
+    if filtro in ('institucional', 'territorial'):
+        return df[df[filtro] == True]
+    return df
+
+# Función para crear la tabla de una variante dentro de una figura
+def crear_tabla_figura(tabla):
+    return go.Table(
+        header=dict(values=[f"<b>{col}</b>" for col in tabla.columns], fill_color='#0A5C99',
+                    font=dict(color='white'), align='left'),
+        cells=dict(values=[tabla[col].astype(str).tolist() for col in tabla.columns], fill_color='#f0f2f6', align='left')
+    )
+
+# Función para unir en una sola figura las variantes por categoría de un gráfico
+def combinar_variantes_por_categoria(crear, df, tabla=None, titulo_tabla=None):
+    """
+    Figura con las variantes Global, Institucional y Territorial de crear(df, filtro).
+
+    Los botones de la figura (updatemenus) cambian de variante en el navegador,
+    sin volver a ejecutar el script ni recalcular el gráfico. Con tabla, cada
+    variante lleva debajo la tabla tabla(df, filtro) y los mismos botones
+    cambian gráfico y tabla a la vez. Las variantes sin datos se omiten;
+    devuelve None si no queda ninguna.
+    """
+    variantes = [(etiqueta, filtro, crear(df, filtro)) for etiqueta, filtro in FILTROS_CATEGORIA.items()]
+    variantes = [(etiqueta, filtro, fig) for etiqueta, filtro, fig in variantes if fig is not None]
+    if not variantes:
+        return None
+
+    diseno = variantes[0][2].layout
+    if tabla is None:
+        fig = go.Figure(layout=diseno)
+    else:
+        alto = (diseno.height or 500) + ALTO_TABLA_FIGURA
+        fig = make_subplots(
+            rows=2, cols=1, specs=[[{"type": "domain"}], [{"type": "table"}]],
+            row_heights=[1 - ALTO_TABLA_FIGURA / alto, ALTO_TABLA_FIGURA / alto],
+            vertical_spacing=0.06, subplot_titles=(None, titulo_tabla)
+        )
+        fig.update_layout(diseno.to_plotly_json())
+        # La leyenda a la derecha del gráfico, para no tapar la tabla
+        fig.update_layout(height=alto, legend=dict(orientation='v', x=1.02, xanchor='left', y=1, yanchor='top'))
+
+    grupos = []
+    for etiqueta, filtro, variante in variantes:
+        inicio = len(fig.data)
+        if tabla is None:
+            fig.add_traces(variante.data)
+        else:
+            fig.add_traces(variante.data, rows=1, cols=1)
+            fig.add_trace(crear_tabla_figura(tabla(df, filtro)), row=2, col=1)
+        grupos.append((etiqueta, variante.layout.title.text, range(inicio, len(fig.data))))
+
+    botones = [
+        dict(
+            label=etiqueta,
+            method='update',
+            args=[{'visible': [i in trazas for i in range(len(fig.data))]}, {'title.text': titulo}]
+        )
+        for etiqueta, titulo, trazas in grupos
+    ]
+    fig.update_layout(
+        updatemenus=[dict(
+            type='buttons', direction='right', buttons=botones, showactive=True,
+            x=1, xanchor='right', y=1.12 if tabla is None else 1.05, yanchor='bottom'
+        )]
+    )
+    return seleccionar_variante(fig, variantes[0][0])
+
+# Función para unir la tabla de cada categoría en una sola, con la categoría como primera columna
+def tablas_por_categoria(tabla, df):
+    tablas = {etiqueta: tabla(df, filtro) for etiqueta, filtro in FILTROS_CATEGORIA.items()}
+    return pd.concat(tablas, names=['Categoría']).reset_index(level=0).reset_index(drop=True)
+
+# Función para mostrar una variante de una figura creada con combinar_variantes_por_categoria
+def seleccionar_variante(fig, etiqueta):
+    """Deja visible la variante indicada (Global, Institucional o Territorial); None si la figura no la tiene"""
+    menu = fig.layout.updatemenus[0]
+    for i, boton in enumerate(menu.buttons):
+        if boton.label == etiqueta:
+            visibles, diseno = boton.args
+            for traza, visible in zip(fig.data, visibles['visible']):
+                traza.visible = visible
+            fig.update_layout(title_text=diseno['title.text'])
+            menu.active = i
+            return fig
+    return None
+
+# Función para calcular el top de extensiones según la categoría
+def top_extensiones(df, filtro=None, n=5):
+    df_temp = filtrar_categoria(df, filtro)
+    top_ext = df_temp['extension'].value_counts().loc[lambda c: c > 0].head(n)
+    return pd.DataFrame({
+        'Extensión': top_ext.index.astype(str),
+        'Cantidad': top_ext.values,
+        'Porcentaje': (top_ext.values / max(len(df_temp), 1) * 100).round(1)
+    })
+
+# Función para calcular las estadísticas por dimensión según la categoría
+def estadisticas_dimensiones(df, filtro=None, nombres=None):
+    """Archivos y porcentaje por dimensión clasificada, ordenados por número; nombres es {id: nombre}"""
+    df_dims = filtrar_categoria(df, filtro)
+    df_dims = df_dims[df_dims['dimensiones'] != 'Sin clasificación']
+    dim_stats = df_dims['dimensiones'].value_counts().loc[lambda c: c > 0]
+
+    data = []
+    for dim in dim_stats.index:
+        # Extraer el número de dimensión
+        if isinstance(dim, str) and dim.startswith('Dimensión '):
+            dim_num = int(dim.replace('Dimensión ', ''))
+        else:
+            dim_num = int(dim) if str(dim).isdigit() else 0
+
+        data.append({
+            'Número': dim_num,
+            'Dimensión': dim,
+            'Nombre Dimensión': (nombres or {}).get(dim_num, "Sin nombre"),
+            'Total Archivos': dim_stats[dim],
+            'Porcentaje': round(dim_stats[dim] / dim_stats.sum() * 100, 1)
+        })
+
+    columnas = ['Dimensión', 'Nombre Dimensión', 'Total Archivos', 'Porcentaje']
+    dim_df = pd.DataFrame(data, columns=['Número'] + columnas)
+    return dim_df.sort_values('Número')[columnas].reset_index(drop=True)
+
+# Función para crear el gráfico de extensiones con sus tres variantes por categoría
+def crear_grafico_extensiones_por_categoria(df):
+    return combinar_variantes_por_categoria(crear_grafico_extensiones, df)
+
+# Función para crear el gráfico de extensiones por categoría con la tabla del top 5 de cada una
+def crear_grafico_top_extensiones_por_categoria(df):
+    return combinar_variantes_por_categoria(crear_grafico_extensiones, df, top_extensiones, "Top 5 Extensiones")
+
+# Función para crear el gráfico de dimensiones por categoría con la tabla de estadísticas de cada una
+def crear_grafico_dimensiones_por_categoria(df, nombres=()):
+    """nombres son pares (id, nombre) de las dimensiones; forman parte de la clave de la figura en caché"""
+    nombres = dict(nombres)
+    return combinar_variantes_por_categoria(
+        crear_grafico_dimensiones, df,
+        lambda df_cat, filtro: estadisticas_dimensiones(df_cat, filtro, nombres), "Estadísticas por Dimensión"
+    )
+
 # Función para crear gráfico comparativo de extensiones por categoría
 def crear_grafico_comparativo_extensiones(df):
     # Obtener top 5 extensiones
@@ -221,16 +471,9 @@ def crear_grafico_comparativo_extensiones(df):
     df_inst = df[df['institucional'] == True]
     df_terr = df[df['territorial'] == True]
     
-    # Contar extensiones por categoría
-    ext_inst = df_inst[df_inst['extension'].isin(top_ext)]['extension'].value_counts()
-    ext_terr = df_terr[df_terr['extension'].isin(top_ext)]['extension'].value_counts()
-    
-    # Completar valores faltantes con ceros
-    for ext in top_ext:
-        if ext not in ext_inst:
-            ext_inst[ext] = 0
-        if ext not in ext_terr:
-            ext_terr[ext] = 0
+    # Contar extensiones por categoría, completando valores faltantes con ceros
+    ext_inst = df_inst['extension'].value_counts().reindex(top_ext, fill_value=0)
+    ext_terr = df_terr['extension'].value_counts().reindex(top_ext, fill_value=0)
     
     # Ordenar por el total
     total_ext = ext_inst + ext_terr
@@ -273,71 +516,115 @@ def crear_grafico_comparativo_extensiones(df):
     
     return fig
 
-# Función para crear heatmap de extensiones por dimensión
-def crear_heatmap_extension_dimension(df):
-    # Obtener top 6 extensiones
-    top_ext = df['extension'].value_counts().head(6).index.tolist()
-    
-    # Filtrar dataframe
-    df_filt = df[(df['extension'].isin(top_ext)) & (df['dimensiones'] != 'Sin clasificación')]
+# Extensiones del mapa de calor: las N más frecuentes, o None para la matriz completa
+TOP_HEATMAP = 6
+OPCIONES_TOP_HEATMAP = {"Top 6": 6, "Top 10": 10, "Top 20": 20, "Todas": None}
+
+# Función para contar archivos por extensión y dimensión
+def pivot_extension_dimension(df, top=None):
+    """
+    Matriz de cantidad de archivos por extensión (filas) y dimensión (columnas).
+
+    top limita las filas a las extensiones más frecuentes; con None se
+    incluyen todas. Las filas van de la extensión con más archivos a la de menos.
+    """
+    df_filt = df[df['dimensiones'] != 'Sin clasificación']
+    if top is not None:
+        top_ext = df['extension'].value_counts().head(top).index
+        df_filt = df_filt[df_filt['extension'].isin(top_ext)]
+
+    # Conteo por extensión y dimensión (solo las combinaciones presentes)
+    pivot = df_filt.groupby(['extension', 'dimensiones'], observed=True).size().unstack(fill_value=0)
+    return pivot.loc[pivot.sum(axis=1).sort_values(ascending=False).index]
+
+# Función para crear el mapa de calor de extensiones por dimensión
+def crear_heatmap_extension_dimension(df, top=TOP_HEATMAP):
+    """
+    Cantidad de archivos por extensión y dimensión.
+
+    top limita las filas a las extensiones más frecuentes; con None se
+    muestran todas. Los valores se escriben con texttemplate y Plotly elige
+    en el navegador el color de texto que contrasta con cada celda.
+    """
+    pivot = pivot_extension_dimension(df, top)
     
-    if df_filt.empty:
+    if pivot.empty:
         return None
     
-    # Crear tabla pivote
-    pivot = pd.pivot_table(
-        df_filt,
-        values='nombre',
-        index='extension',
-        columns='dimensiones',
-        aggfunc='count',
-        fill_value=0
-    )
-    
     # Crear heatmap con la paleta personalizada
     # Para heatmaps es mejor usar una escala de un solo color, así que usamos azules
     fig = px.imshow(
         pivot,
         labels=dict(x="Dimensión", y="Extensión", color="Cantidad"),
-        x=pivot.columns,
-        y=pivot.index,
+        x=pivot.columns.astype(str),
+        y=pivot.index.astype(str),
         color_continuous_scale=[[0, '#E3F2FD'], [0.5, '#1E88E5'], [1, '#0A5C99']],  # Escala de azules de la paleta
-        title='Distribución de Tipos de Archivos por Dimensión'
+        title='Distribución de Tipos de Archivos por Dimensión',
+        text_auto=True,
+        aspect='auto'
     )
     
-    # Añadir valores en las celdas
-    annotations = []
-    for i, ext in enumerate(pivot.index):
-        for j, dim in enumerate(pivot.columns):
-            annotations.append(dict(
-                x=dim, y=ext,
-                text=str(pivot.loc[ext, dim]),
-                showarrow=False,
-                font=dict(color='white' if pivot.loc[ext, dim] > pivot.values.max()/2 else 'black')
-            ))
-    
-    fig.update_layout(annotations=annotations, height=450)
+    # La altura crece con la cantidad de extensiones en la matriz completa
+    fig.update_layout(height=max(450, 28 * len(pivot) + 150))
     
     return fig
 
+# Taxonomías de data/taxonomias.json con sección propia (dimensión y ámbito ya tienen las suyas)
+TAXONOMIAS_VISIBLES = {"Método de obtención": 'metodo', "Indicador": 'indicador', "Facultad": 'facultad'}
+
+# Valores con barra propia en el gráfico de una taxonomía; los demás se suman en "Otros"
+TOP_TAXONOMIAS = 20
+
+# Función para contar los archivos clasificados por valor de una taxonomía y ámbito
+def contar_taxonomia(df, columna, defecto):
+    return (
+        df[df[columna] != defecto]
+        .groupby([columna, 'ambito'], observed=True).size()
+        .reset_index(name='archivos')
+    )
+
+# Función para sumar los archivos por valor de una taxonomía
+def totales_taxonomia(conteo, columna):
+    return conteo.groupby(columna, observed=True)['archivos'].sum().reset_index()
+
+# Función para crear el gráfico de archivos por valor de una taxonomía
+def crear_grafico_taxonomia(df, columna, defecto):
+    """Archivos por valor de la taxonomía, separados por ámbito; None si ningún archivo quedó clasificado"""
+    conteo = contar_taxonomia(df, columna, defecto)
+    if conteo.empty:
+        return None
+
+    # Los valores menos frecuentes se agrupan en "Otros" (el detalle se muestra a pedido)
+    reducido, resto = datos.reducir_top_n(totales_taxonomia(conteo, columna), columna, 'archivos', TOP_TAXONOMIAS)
+    if not resto.empty:
+        conteo = conteo.astype({columna: object})
+        conteo.loc[conteo[columna].isin(resto[columna]), columna] = datos.ETIQUETA_OTROS
+        conteo = conteo.groupby([columna, 'ambito'], observed=True)['archivos'].sum().reset_index()
+    orden = [str(v) for v in reducido[columna]]
+    nombres = {col: nombre for nombre, col in TAXONOMIAS_VISIBLES.items()}
+
+    fig = px.bar(
+        conteo,
+        x='archivos',
+        y=columna,
+        color='ambito',
+        orientation='h',
+        category_orders={columna: orden},
+        labels={'archivos': 'Archivos', columna: '', 'ambito': 'Ámbito'},
+        color_discrete_map={'Institucional': '#0A5C99', 'Territorial': '#FEC109', 'Sin ámbito': '#6C757D'},
+        title=f"Archivos por {nombres.get(columna, columna).lower()}"
+    )
+    fig.update_layout(
+        template='plotly_white',
+        height=max(350, 35 * len(orden) + 150),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
 # Función para crear gráfico de métodos de obtención
 def crear_grafico_metodos_obtencion():
     
-    dfh=pd.read_excel('data/DataLake_registro_FIUT_UTEM.xlsx')
-    dfh['METODO'].value_counts()
-
-    dfhh={
-        'nombres':[], 
-        'conteo':[]
-    }
-    for i,j in dfh['METODO'].value_counts().items():
-        dfhh['nombres'].append(i)
-        dfhh['conteo'].append(j)
-    dfhh=pd.DataFrame(dfhh)
-
-    dfhh['nombres'][0]= 'Web Scrapping'
-    dfhh['nombres'][1]= 'Universidad'
-    dfhh['nombres'][2]= 'Descargados'
+    dfhh = cargar_metodos_obtencion()
     
     fig=px.pie(
     dfhh, 
@@ -377,13 +664,15 @@ def crear_grafico_metodos_obtencion():
 
 
 # Función para crear gráfico de estado de indicadores con opciones seleccionables
+@st.fragment
 def crear_grafico_estados_interactivo(df):
     """
     Crea un gráfico circular interactivo con opciones seleccionables para visualizar
-    los estados de los indicadores por origen o categoría.
+    los estados de los indicadores por origen o categoría. Es un fragmento: al cambiar
+    una opción solo se vuelve a ejecutar esta sección, no todo el dashboard.
     
     Args:
-        df: DataFrame con los datos de los indicadores
+        df: DataFrame con los datos de los indicadores (compartido, no se modifica)
     """
     st.subheader("Análisis de Estados de Indicadores")
     
@@ -404,12 +693,6 @@ def crear_grafico_estados_interactivo(df):
             ["Estado", "Dimensión", "Origen"],
             index=0
         )
-    # O para todas las columnas de texto en el dataframe
-    for col in df.select_dtypes(include=['object']).columns:
-        try:
-            df[col] = df[col].str.encode('latin-1').str.decode('utf-8')
-        except:
-            pass
     
     # Filtrar datos según la selección
     if origen_option == "Institucional":
@@ -451,10 +734,7 @@ def crear_grafico_estados_interactivo(df):
         color_map = dict(zip(conteo['categoria'], colors))
         
     elif agrupar_por == "Dimensión":
-        # Extraer solo el nombre de la dimensión (sin el número)
-        df_filtrado['Dimension_Simple'] = df_filtrado['Dimension'].apply(
-            lambda x: x.split(':')[0] if ':' in x else x
-        )
+        # Dimension_Simple (nombre sin el número) se calcula al cargar los indicadores
         conteo = df_filtrado['Dimension_Simple'].value_counts().reset_index()
         conteo.columns = ['categoria', 'conteo']
         conteo = conteo.sort_values('categoria')
@@ -555,25 +835,48 @@ def crear_grafico_estados_interactivo(df):
             use_container_width=True,
             hide_index=True
         )
+        mostrar_exportacion(
+            "indicadores",
+            lambda formato: exportaciones.exportar_tabla(
+                df_filtrado[['ID', 'Dimension', 'Estado', 'Origen']], "indicadores", formato
+            ),
+            key="exportar_indicadores"
+        )
 
 # Cargar datos de indicadores
-@st.cache_data
-def cargar_indicadores(ruta='data/indicadores_actualizado_20250528.csv'):
-    # id_indicador	dimension	indicador_original	indicador	estado	Origen
+@st.cache_resource
+def cargar_indicadores(ruta=datos.RUTA_INDICADORES):
+    """Indicadores ya normalizados, compartidos (solo lectura) por todas las sesiones"""
     try:
-        df = pd.read_csv(ruta, sep='^')
-        # Renombrar columnas para mayor claridad
-        df = df.rename(columns={
-            'id_indicador': 'ID',
-            'dimension': 'Dimension',
-            'estado': 'Estado',
-            'Origen': 'Origen'
-        })
-        return df
+        return instantaneas.instantanea(
+            'indicadores', (ruta, datos.version_archivo(ruta)), lambda: datos.leer_indicadores(ruta)
+        )
     except FileNotFoundError:
         st.error(f"Archivo {ruta} no encontrado.")
         return pd.DataFrame()
 
+@st.cache_resource
+def cargar_metodos_obtencion(ruta=datos.RUTA_REGISTRO):
+    """Conteo de archivos por método de obtención, compartido por todas las sesiones"""
+    return cache_compartida().obtener_o_calcular(
+        armar_clave('metodos_obtencion', ruta, datos.version_archivo(ruta)), lambda: datos.leer_metodos_obtencion(ruta)
+    )
+
+@st.cache_resource
+def cargar_comunas(ruta=datos.RUTA_COMUNAS):
+    """Tabla de comunas, compartida por todas las sesiones"""
+    return cache_compartida().obtener_o_calcular(
+        armar_clave('comunas', ruta, datos.version_archivo(ruta)), lambda: datos.leer_comunas(ruta)
+    )
+
+@st.cache_resource
+def cargar_nombres_dimensiones(ruta=datos.RUTA_NOMBRES_DIMENSIONES):
+    """Diccionario id -> nombre de dimensión, compartido por todas las sesiones"""
+    return cache_compartida().obtener_o_calcular(
+        armar_clave('nombres_dimensiones', ruta, datos.version_archivo(ruta)),
+        lambda: datos.leer_nombres_dimensiones(ruta)
+    )
+
 
 # Usar la función en tu aplicación
 df_indicadores = cargar_indicadores()
@@ -590,7 +893,7 @@ def mostrar_treemap_dimensiones():
     archivos_disp = [f for f in os.listdir('data') if f.endswith('.csv')]
     
     # Cargar los dataframes
-    df_treemap=pd.read_csv("data/indicadores_actualizado_20250528.csv", sep='^')
+    df_treemap = cargar_indicadores()
     # Dimension,Indicador
     institucional_df = duckdb.sql("select dimension as 'Dimension', indicador as 'Indicador' from df_treemap where origen='Institucional'").to_df()
     territorial_df = duckdb.sql("select dimension as 'Dimension', indicador as 'Indicador' from df_treemap where origen='Territorial'").to_df()
@@ -658,14 +961,14 @@ def mostrar_treemap_dimensiones():
         # Generar leyenda adicional para los números de indicadores
         st.subheader("Avance de indicadores institucionales")
         st.dataframe(
-            duckdb.sql("select id_indicador as 'ID', dimension as 'Dimension', indicador as 'Indicador', estado as 'Estado' from df_treemap where origen='Institucional'").to_df(),
+            duckdb.sql("select ID as 'ID', dimension as 'Dimension', indicador as 'Indicador', estado as 'Estado' from df_treemap where origen='Institucional'").to_df(),
             use_container_width=True,
             hide_index=True
         )
         # Generar leyenda adicional para los números de indicadores
         st.subheader("Avance de indicadores territoriales")
         st.dataframe(
-            duckdb.sql("select id_indicador as 'ID', dimension as 'Dimension', indicador as 'Indicador', estado as 'Estado' from df_treemap where origen='Territorial'").to_df(),
+            duckdb.sql("select ID as 'ID', dimension as 'Dimension', indicador as 'Indicador', estado as 'Estado' from df_treemap where origen='Territorial'").to_df(),
             use_container_width=True,
             hide_index=True
         )
@@ -712,7 +1015,9 @@ def grafico_i_22():
         html_content = f.read()
     st.components.v1.html(html_content, height=600, scrolling=True)
     
-def grafico_i_23():   
+# Consulta de países con convenios (indicador i_23) en la base Postgres
+def cargar_paises_convenios():
+    """Cantidad de convenios por país; se comparte entre workers por unos minutos para no consultar la base en cada visita"""
     # Parámetros de conexión
     connection_params = {
         'user': cred.pg_user,
@@ -725,9 +1030,6 @@ def grafico_i_23():
     # Crear string de conexión para SQLAlchemy
     connection_string = f"postgresql://{connection_params['user']}:{connection_params['password']}@{connection_params['host']}:{connection_params['port']}/{connection_params['database']}"
 
-    engine = create_engine(connection_string)
-
-
     # Consulta SQL
     query = '''
                 SELECT "PAÍS", COUNT("PAÍS") as cantidad
@@ -737,10 +1039,23 @@ def grafico_i_23():
                 ORDER BY COUNT("PAÍS") DESC 
                 '''
 
-    df = pd.read_sql_query(query, engine)
+    def consultar_paises():
+        engine = create_engine(connection_string)
+        try:
+            return pd.read_sql_query(query, engine)
+        finally:
+            # Cerrar conexión
+            engine.dispose()
+
+    return cache_compartida().obtener_o_calcular(armar_clave('i_23_paises', query), consultar_paises, ttl=600)
 
-    # Cerrar conexión
-    engine.dispose()
+# Países con barra propia en el gráfico de convenios; los demás se suman en "Otros"
+TOP_PAISES = 30
+
+def grafico_i_23():   
+    df_paises = cargar_paises_convenios()
+    # El ancho y el tamaño de la figura quedan acotados aunque crezca la cantidad de países
+    df, otros_paises = datos.reducir_top_n(df_paises, 'PAÍS', 'cantidad', TOP_PAISES)
 
     def crear_grafico_paises(df):
         """Crear gráfico de barras con todos los países y colores del proyecto FIUT"""
@@ -775,7 +1090,7 @@ def grafico_i_23():
             },
             template='plotly_white',
             height=700,
-            width=max(1400, len(df) * 30),
+            width=min(1400, max(800, len(df) * 40)),
             xaxis_title='País',
             yaxis_title='Cantidad',
             margin=dict(l=60, r=60, t=100, b=150), 
@@ -816,51 +1131,34 @@ def grafico_i_23():
     # Crear gráfico
     fig = crear_grafico_paises(df)
     st.plotly_chart(fig, use_container_width=True)
+    mostrar_detalle_otros(otros_paises, "países", key="otros_paises")
+    mostrar_exportacion(
+        "convenios_paises", lambda formato: exportaciones.exportar_tabla(df_paises, "convenios_paises", formato),
+        key="exportar_paises"
+    )
 
 def grafico_i_24():
     with open("graph/I_24/sanki.html", "r", encoding="utf-8") as f:
         html_content = f.read()
     st.components.v1.html(html_content, height=600, scrolling=True)
 
+# Función para mostrar un gráfico HTML pesado que el navegador carga al acercarse a la pantalla
+def mostrar_grafico_diferido(ruta, alto=600):
+    """En la sesión solo se envía un marcador; el gráfico se descarga desde la carpeta estática cuando se ve"""
+    url = publicar_grafico(ruta, datos.version_archivo(ruta))
+    st.components.v1.html(graficos_estaticos.marcador_diferido(url, alto), height=alto)
+
 def grafico_t_4():
-    with open("graph/T_4/chile_energia_renovable_categoria.html", "r", encoding="utf-8") as f:
-        html_content = f.read()
-    st.components.v1.html(html_content, height=600, scrolling=True)
-    
-    with open("graph/T_4/chile_energia_renovable_comparacion.html", "r", encoding="utf-8") as f:
-        html_content = f.read()
-    st.components.v1.html(html_content, height=600, scrolling=True)
-    
-    with open("graph/T_4/chile_energia_renovable_evolucion.html", "r", encoding="utf-8") as f:
-        html_content = f.read()
-    st.components.v1.html(html_content, height=600, scrolling=True)
-    
-    with open("graph/T_4/chile_energia_renovable_tendencia.html", "r", encoding="utf-8") as f:
-        html_content = f.read()
-    st.components.v1.html(html_content, height=600, scrolling=True)
-    
-    with open("graph/T_4/chile_energia_renovable_tipos.html", "r", encoding="utf-8") as f:
-        html_content = f.read()
-    st.components.v1.html(html_content, height=600, scrolling=True)
+    for archivo in ["categoria", "comparacion", "evolucion", "tendencia", "tipos"]:
+        mostrar_grafico_diferido(f"graph/T_4/chile_energia_renovable_{archivo}.html")
 
 def grafico_t_6():
-    with open("graph/T_7/contaminantes_rm_evolucion_anual.html", "r", encoding="utf-8") as f:
-        html_content = f.read()
-    st.components.v1.html(html_content, height=600, scrolling=True)
+    mostrar_grafico_diferido("graph/T_7/contaminantes_rm_evolucion_anual.html")
     
 def grafico_t_7():
-    # with open("graph/T_7/contaminantes_rm_evolucion_anual.html", "r", encoding="utf-8") as f:
-    #     html_content = f.read()
-    # st.components.v1.html(html_content, height=600, scrolling=True)
-    with open("graph/T_7/contaminantes_rm_mapa_comunas.html", "r", encoding="utf-8") as f:
-        html_content = f.read()
-    st.components.v1.html(html_content, height=600, scrolling=True)
-    with open("graph/T_7/contaminantes_rm_top_contaminantes.html", "r", encoding="utf-8") as f:
-        html_content = f.read()
-    st.components.v1.html(html_content, height=600, scrolling=True)
-    with open("graph/T_7/contaminantes_rm_vehiculos.html", "r", encoding="utf-8") as f:
-        html_content = f.read()
-    st.components.v1.html(html_content, height=600, scrolling=True)
+    # La evolución anual se muestra en grafico_t_6
+    for archivo in ["mapa_comunas", "top_contaminantes", "vehiculos"]:
+        mostrar_grafico_diferido(f"graph/T_7/contaminantes_rm_{archivo}.html")
 
 def forms():
     # Añadir la carpeta padre al path
@@ -1200,7 +1498,7 @@ def mostrar_treemap_dimension_queryparams(dimension):
     archivos_disp = [f for f in os.listdir('data') if f.endswith('.csv')]
     
     # Cargar los dataframes
-    df_treemap=pd.read_csv("data/indicadores_actualizado_20250528.csv", sep='^')
+    df_treemap = cargar_indicadores()
     # Dimension,Indicador
     institucional_df = duckdb.sql("select dimension as 'Dimension', indicador as 'Indicador' from df_treemap where origen='Institucional'").to_df()
     territorial_df = duckdb.sql("select dimension as 'Dimension', indicador as 'Indicador' from df_treemap where origen='Territorial'").to_df()
@@ -1269,7 +1567,7 @@ def mostrar_treemap_dimension_queryparams(dimension):
         # Generar leyenda adicional para los números de indicadores
         st.subheader("Avance de indicadores institucionales")
         st.dataframe(
-            duckdb.sql("select id_indicador as 'ID', dimension as 'Dimension', indicador as 'Indicador', estado as 'Estado' from df_treemap where origen='Institucional'").to_df(),
+            duckdb.sql("select ID as 'ID', dimension as 'Dimension', indicador as 'Indicador', estado as 'Estado' from df_treemap where origen='Institucional'").to_df(),
             use_container_width=True,
             hide_index=True
         )
@@ -1278,6 +1576,750 @@ def mostrar_treemap_dimension_queryparams(dimension):
         st.error(f"Error al crear el treemap: {str(e)}")
         st.write("Estructura de los datos:", df_combined.head())
 
+# Función para mostrar el explorador del árbol de directorios
+def mostrar_explorador_directorios(df, ruta=datos.RUTA_INVENTARIO):
+    """
+    Explorador del árbol de directorios del Data Lake con totales por subárbol.
+    
+    Solo se cargan los subdirectorios del directorio abierto, de modo que la
+    navegación sigue siendo fluida aunque el lago tenga cientos de miles de carpetas.
+    """
+    st.header("Explorador de Directorios")
+    
+    arbol = df.attrs.get('arbol')
+    if arbol is None:
+        st.info("El inventario no tiene información de directorios.")
+        return
+    resumen = cargar_resumen_directorios(ruta, datos.version_archivo(ruta))
+    
+    # Directorio abierto (por sesión)
+    nodo = st.session_state.get('explorador_nodo', RAIZ)
+    if nodo >= len(arbol):
+        nodo = RAIZ
+    actual = resumen.loc[nodo]
+    
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        st.markdown(f"**📁 {arbol.ruta(nodo) or 'Raíz del Data Lake'}**")
+        st.caption(
+            f"{actual['archivos']:,} archivos · {actual['bytes'] / 1024 ** 2:,.2f} MB · "
+            f"{actual['subdirectorios']:,} subdirectorios · {actual['archivos_directos']:,} archivos directos"
+        )
+    with col2:
+        if nodo != RAIZ and st.button("⬆ Subir", key="explorador_subir", use_container_width=True):
+            st.session_state['explorador_nodo'] = int(arbol.padres[nodo])
+            st.rerun()
+    
+    # Subdirectorios del directorio abierto, ordenados por tamaño
+    hijos = arbol.hijos(nodo)
+    columnas_ext = list(resumen.columns[4:])
+    if len(hijos):
+        tabla = resumen.loc[hijos]
+        tabla = pd.DataFrame({
+            'Directorio': [arbol.nombre(h) for h in hijos],
+            'Archivos': tabla['archivos'].to_numpy(),
+            'Tamaño (MB)': (tabla['bytes'] / 1024 ** 2).round(2).to_numpy(),
+            'Subdirectorios': tabla['subdirectorios'].to_numpy(),
+            'Extensión principal': tabla[columnas_ext].idxmax(axis=1).where(tabla['archivos'] > 0, '-').to_numpy()
+        }, index=hijos).sort_values('Tamaño (MB)', ascending=False)
+        
+        st.markdown("Selecciona un directorio para abrirlo:")
+        evento = st.dataframe(
+            tabla,
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key=f"explorador_hijos_{nodo}"
+        )
+        if evento.selection.rows:
+            st.session_state['explorador_nodo'] = int(tabla.index[evento.selection.rows[0]])
+            st.rerun()
+    else:
+        st.info("Este directorio no tiene subdirectorios.")
+    
+    # Mezcla de extensiones del subárbol abierto
+    mezcla = actual[columnas_ext]
+    mezcla = mezcla[mezcla > 0]
+    if not mezcla.empty:
+        fig = px.bar(
+            x=mezcla.index,
+            y=mezcla.values,
+            labels={'x': 'Extensión', 'y': 'Archivos'},
+            title='Tipos de archivos en este directorio y sus subdirectorios',
+            color_discrete_sequence=['#0A5C99']
+        )
+        fig.update_layout(template='plotly_white', height=350)
+        st.plotly_chart(fig, use_container_width=True, key="explorador_extensiones_chart")
+
+# Función para mostrar el buscador de archivos por nombre y ruta
+def mostrar_buscador_archivos(df, ruta=datos.RUTA_INVENTARIO):
+    """
+    Buscador de archivos por nombre o ruta, respaldado por un índice de trigramas.
+
+    La búsqueda exacta encuentra la consulta como subcadena; la aproximada
+    tolera errores de tipeo y palabras en otro orden.
+    """
+    st.header("Buscar Archivos")
+
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        consulta = st.text_input(
+            "Buscar en nombres y rutas",
+            placeholder="Ej: censo 2017, matricula.xlsx, Territorial\\Salud",
+            key="busqueda_consulta"
+        ).strip()
+    with col2:
+        aproximada = st.toggle("Búsqueda aproximada", key="busqueda_aproximada")
+
+    if not consulta:
+        return
+
+    indice = cargar_indice_busqueda(ruta, datos.version_archivo(ruta))
+    inicio = time.perf_counter()
+    if aproximada:
+        documentos, puntajes = indice.buscar_aproximado(consulta, limite=100)
+        total = len(documentos)
+    else:
+        documentos, total = indice.buscar(consulta, limite=100)
+        puntajes = None
+    duracion = (time.perf_counter() - inicio) * 1000
+
+    filas = indice.filas[documentos]
+    if puntajes is not None:
+        puntajes = puntajes[filas >= 0]
+    filas = filas[filas >= 0]
+    st.caption(
+        f"{total:,} coincidencias en {duracion:,.0f} ms"
+        + (f" · se muestran las primeras {len(filas)}" if total > len(filas) else "")
+    )
+    if not len(filas):
+        st.info("No se encontraron archivos para la búsqueda.")
+        return
+
+    resultados = df.iloc[filas]
+    tabla = pd.DataFrame({
+        'Nombre': resultados['nombre'].to_numpy(),
+        'Directorio': df.attrs['arbol'].rutas(resultados['nodo'].to_numpy()),
+        'Extensión': resultados['extension'].to_numpy(),
+        'Tamaño (KB)': (resultados['bytes'] / 1024).round(2).to_numpy(),
+        'Dimensión': resultados['dimensiones'].to_numpy()
+    })
+    if puntajes is not None:
+        tabla.insert(0, 'Similitud', (puntajes * 100).round().astype(int))
+    st.dataframe(tabla, use_container_width=True, hide_index=True)
+
+# Función para mostrar el explorador de archivos del inventario
+def mostrar_explorador_archivos(df, ruta=datos.RUTA_INVENTARIO):
+    """
+    Explorador paginado del inventario de archivos.
+    
+    Filtros, orden y paginación se resuelven en DuckDB; al navegador solo se
+    envía la página visible, con las rutas reconstruidas únicamente para esas filas.
+    """
+    st.header("Explorador de Archivos")
+    
+    con = conexion_inventario(ruta, datos.version_archivo(ruta))
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        extensiones = st.multiselect("Extensión", list(df['extension'].cat.categories), key="archivos_ext")
+        nombre = st.text_input("Nombre contiene", key="archivos_nombre")
+    with col2:
+        dimensiones = st.multiselect("Dimensión", list(df['dimensiones'].cat.categories), key="archivos_dim")
+        rango = st.date_input("Fecha de modificación", value=(), key="archivos_fechas")
+    with col3:
+        categorias = st.multiselect("Categoría", list(df['categoria'].cat.categories), key="archivos_cat")
+        col_orden, col_dir = st.columns([2, 1])
+        with col_orden:
+            orden = st.selectbox("Ordenar por", list(consultas_inventario.ORDENES), key="archivos_orden")
+        with col_dir:
+            descendente = st.toggle("Desc.", key="archivos_desc")
+    
+    filtros = {
+        'extensiones': extensiones,
+        'dimensiones': dimensiones,
+        'categorias': categorias,
+        'desde': rango[0] if len(rango) > 0 else None,
+        'hasta': rango[1] if len(rango) > 1 else None,
+        'nombre': nombre.strip()
+    }
+    
+    # Al cambiar filtros u orden se vuelve a la primera página
+    firma = repr((filtros, orden, descendente))
+    if st.session_state.get('archivos_firma') != firma:
+        st.session_state['archivos_firma'] = firma
+        st.session_state['archivos_cursores'] = [None]
+    cursores = st.session_state['archivos_cursores']
+    
+    total, total_bytes = consultas_inventario.contar_archivos(con, filtros)
+    tamano_pagina = 50
+    pagina, siguiente = consultas_inventario.pagina_archivos(
+        con, filtros, orden, descendente, despues_de=cursores[-1], tamano_pagina=tamano_pagina
+    )
+    
+    st.caption(
+        f"{total:,} archivos ({total_bytes / 1024 ** 2:,.2f} MB) · "
+        f"página {len(cursores)} de {max(1, -(-total // tamano_pagina)):,}"
+    )
+    
+    if pagina.empty:
+        st.info("No hay archivos que cumplan los filtros seleccionados.")
+    else:
+        # Rutas reconstruidas solo para las filas visibles
+        directorios = df.attrs['arbol'].rutas(pagina['nodo'].to_numpy())
+        st.dataframe(
+            pd.DataFrame({
+                'Nombre': pagina['nombre'],
+                'Directorio': directorios,
+                'Extensión': pagina['extension'],
+                'Tamaño (KB)': (pagina['bytes'] / 1024).round(2),
+                'Fecha Modificación': pagina['fecha_modificacion'],
+                'Categoría': pagina['categoria'],
+                'Dimensión': pagina['dimensiones']
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    col1, col2, _ = st.columns([1, 1, 4])
+    with col1:
+        if st.button("◀ Anterior", key="archivos_anterior", disabled=len(cursores) == 1, use_container_width=True):
+            cursores.pop()
+            st.rerun()
+    with col2:
+        if st.button("Siguiente ▶", key="archivos_siguiente", disabled=siguiente is None, use_container_width=True):
+            cursores.append(siguiente)
+            st.rerun()
+
+    # Todas las filas filtradas, no solo la página visible
+    consulta, parametros = consultas_inventario.consulta_exportacion(filtros, orden, descendente)
+    mostrar_exportacion(
+        "inventario_filtrado",
+        lambda formato: exportaciones.exportar_consulta(
+            con.cursor(), consulta, parametros, "inventario_filtrado", formato, clave=datos.version_archivo(ruta)
+        ),
+        key="exportar_archivos"
+    )
+
+# Función para mostrar los archivos duplicados del Data Lake
+def mostrar_duplicados(df, ruta=datos.RUTA_INVENTARIO):
+    """
+    Panel de archivos duplicados por contenido y espacio recuperable.
+
+    Si el Data Lake no está disponible en el servidor, muestra una estimación
+    a partir del tamaño y la extensión reportados en el inventario.
+    """
+    st.header("Duplicados")
+    st.markdown(
+        "Archivos con contenido idéntico. El espacio recuperable considera conservar una copia de cada grupo."
+    )
+
+    if not st.session_state.get('duplicados_analizar'):
+        if st.button("Buscar duplicados", key="duplicados_buscar"):
+            st.session_state['duplicados_analizar'] = True
+            st.rerun()
+        return
+
+    grupos, resumen = cargar_duplicados(ruta, datos.version_archivo(ruta))
+    verificado = resumen['disponible']
+    if not verificado:
+        st.warning(
+            f"Los archivos no están disponibles en el servidor (carpeta '{datos.RUTA_DATA_LAKE}', "
+            "variable de entorno RUTA_DATA_LAKE). Se muestran posibles duplicados según el tamaño y la "
+            "extensión del inventario, sin verificar su contenido."
+        )
+        grupos, recuperables = duplicados.posibles_duplicados(df)
+    else:
+        recuperables = resumen['bytes_recuperables']
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Grupos de duplicados", f"{grupos['grupo'].nunique():,}")
+    col2.metric("Archivos involucrados", f"{len(grupos):,}")
+    col3.metric("Espacio recuperable", f"{recuperables / 1024 ** 2:,.2f} MB")
+    if verificado and resumen['no_encontrados']:
+        st.caption(f"{resumen['no_encontrados']:,} archivos candidatos no se encontraron en disco.")
+
+    if grupos.empty:
+        st.info("No se encontraron archivos duplicados.")
+        return
+
+    filas = df.iloc[grupos['fila']]
+    st.dataframe(
+        pd.DataFrame({
+            'Grupo': grupos['grupo'].to_numpy(),
+            'Nombre': filas['nombre'].to_numpy(),
+            'Directorio': df.attrs['arbol'].rutas(filas['nodo'].to_numpy()),
+            'Tamaño (MB)': (grupos['bytes'] / 1024 ** 2).round(2).to_numpy(),
+            'Fecha Modificación': filas['fecha_modificacion'].to_numpy(),
+            'Dimensión': filas['dimensiones'].to_numpy()
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+
+# Función para mostrar el catálogo de esquemas de los archivos tabulares
+def mostrar_catalogo_esquemas(df, ruta=datos.RUTA_INVENTARIO):
+    """
+    Catálogo buscable de hojas y columnas de los archivos .csv/.xlsx del Data Lake.
+
+    Se busca por nombre de archivo, hoja o columna; para cada hoja se muestran
+    sus dimensiones y, al seleccionarla, el tipo y la proporción de nulos de cada columna.
+    """
+    st.header("Catálogo de Esquemas")
+
+    if not st.session_state.get('catalogo_analizar'):
+        st.markdown("Perfila las hojas y columnas de los archivos tabulares del Data Lake.")
+        if st.button("Generar catálogo", key="catalogo_generar"):
+            st.session_state['catalogo_analizar'] = True
+            st.rerun()
+        return
+
+    esquemas, no_encontrados = cargar_catalogo_esquemas(ruta, datos.version_archivo(ruta))
+    if esquemas.empty:
+        st.warning(
+            f"No se encontraron archivos tabulares en el servidor (carpeta '{datos.RUTA_DATA_LAKE}', "
+            "variable de entorno RUTA_DATA_LAKE)."
+        )
+        return
+
+    archivos = df.iloc[esquemas['fila']]
+    esquemas = esquemas.assign(
+        nombre=archivos['nombre'].astype(str).to_numpy(),
+        dimension=archivos['dimensiones'].astype(str).to_numpy()
+    )
+    buscar = st.text_input(
+        "Buscar por archivo, hoja o columna", placeholder="Ej: rut, matrícula, comuna", key="catalogo_buscar"
+    ).strip().lower()
+    if buscar:
+        coincide = (
+            esquemas['nombre'].str.lower().str.contains(buscar, regex=False)
+            | esquemas['hoja'].fillna('').astype(str).str.lower().str.contains(buscar, regex=False)
+            | esquemas['columna'].fillna('').astype(str).str.lower().str.contains(buscar, regex=False)
+        )
+        # Se muestran completas las hojas donde hay alguna coincidencia
+        hojas = esquemas.loc[coincide, ['fila', 'hoja']].drop_duplicates()
+        esquemas = esquemas.merge(hojas, on=['fila', 'hoja'])
+
+    errores = esquemas[esquemas['error'].notna()]
+    hojas = (
+        esquemas[esquemas['error'].isna()]
+        .groupby(['fila', 'nombre', 'dimension', 'hoja'], dropna=False, sort=False)
+        .agg(filas=('filas', 'first'), columnas=('columnas', 'first'),
+             nombres=('columna', lambda c: ', '.join(c.dropna().astype(str))))
+        .reset_index()
+    )
+    st.caption(
+        f"{hojas['fila'].nunique():,} archivos · {len(hojas):,} hojas · {len(errores):,} archivos no legibles"
+        + (f" · {no_encontrados:,} archivos tabulares no encontrados en disco" if no_encontrados else "")
+    )
+    if hojas.empty:
+        st.info("No hay hojas que coincidan con la búsqueda.")
+        return
+
+    evento = st.dataframe(
+        pd.DataFrame({
+            'Archivo': hojas['nombre'],
+            'Hoja': hojas['hoja'].fillna('-'),
+            'Dimensión': hojas['dimension'],
+            'Filas': hojas['filas'].astype('Int64'),
+            'Columnas': hojas['columnas'].astype('Int64'),
+            'Nombres de columnas': hojas['nombres']
+        }),
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="catalogo_hojas"
+    )
+    if evento.selection.rows:
+        hoja = hojas.iloc[evento.selection.rows[0]]
+        columnas = esquemas[(esquemas['fila'] == hoja['fila']) & (esquemas['hoja'].fillna('') == (hoja['hoja'] if pd.notna(hoja['hoja']) else ''))]
+        st.markdown(f"**{hoja['nombre']}**" + (f" · hoja *{hoja['hoja']}*" if pd.notna(hoja['hoja']) else ""))
+        st.dataframe(
+            pd.DataFrame({
+                'Columna': columnas['columna'],
+                'Tipo': columnas['tipo'],
+                'Nulos (%)': (columnas['nulos'].astype(float) * 100).round(1)
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+    if not errores.empty:
+        with st.expander("Archivos no legibles"):
+            st.dataframe(
+                pd.DataFrame({'Archivo': errores['nombre'], 'Error': errores['error']}),
+                use_container_width=True,
+                hide_index=True
+            )
+
+# Función para mostrar la consola SQL sobre los archivos del Data Lake
+def mostrar_consola_sql(ruta=datos.RUTA_INVENTARIO):
+    """
+    Consola SQL de solo lectura sobre el inventario y los archivos .csv/.parquet/.xlsx del Data Lake.
+
+    Los resultados se muestran a medida que llegan y las consultas repetidas
+    (ignorando formato y comentarios) se responden desde la caché.
+    """
+    st.header("Consola SQL")
+    st.markdown(
+        "Consulta los archivos del Data Lake sin descargarlos. La tabla `archivos` contiene el inventario "
+        "(`id`, `nombre`, `extension`, `dimension`, `categoria`, `bytes`, `fecha_modificacion`, `ruta`) y cada "
+        "archivo se lee con `read_csv_auto('<ruta>')`, `read_parquet('<ruta>')` o `read_xlsx('<ruta>')`. "
+        f"Solo se permiten consultas SELECT; se muestran hasta {consola_sql.LIMITE_FILAS:,} filas y cada "
+        f"consulta se detiene a los {consola_sql.TIEMPO_MAXIMO} segundos."
+    )
+
+    version = datos.version_archivo(ruta)
+    archivos = cargar_tabla_archivos_sql(ruta, version)
+
+    # Selector de archivos para armar la consulta de lectura
+    col1, col2 = st.columns([2, 3])
+    with col1:
+        filtro = st.text_input("Buscar archivo", placeholder="Ej: matricula.csv", key="consola_buscar").strip().lower()
+    with col2:
+        extensiones = pd.Series(archivos['extension'].to_numpy(zero_copy_only=False)).str.lower()
+        legibles = extensiones.isin(list(consola_sql.LECTORES)).to_numpy()
+        if filtro:
+            nombres = pd.Series(archivos['nombre'].to_numpy(zero_copy_only=False))
+            legibles = legibles & nombres.str.lower().str.contains(filtro, regex=False).to_numpy()
+        opciones = archivos.filter(legibles).slice(0, 200)
+        rutas = opciones['ruta'].to_pylist()
+        elegido = st.selectbox(
+            "Archivo", range(len(rutas)), format_func=lambda i: rutas[i],
+            index=None, placeholder="Selecciona un archivo", key="consola_archivo"
+        )
+    if elegido is not None and st.button("Consultar este archivo", key="consola_usar_archivo"):
+        st.session_state['consola_sql'] = consola_sql.consulta_para_archivo(rutas[elegido])
+
+    sql = st.text_area(
+        "Consulta", height=160, key="consola_sql",
+        placeholder="SELECT extension, count(*) AS archivos FROM archivos GROUP BY extension ORDER BY archivos DESC"
+    )
+    if st.button("Ejecutar", type="primary", key="consola_ejecutar") and sql.strip():
+        st.session_state['consola_ultima'] = sql
+    sql = st.session_state.get('consola_ultima')
+    if not sql:
+        return
+
+    try:
+        consola_sql.validar_consulta(sql)
+        clave = (consola_sql.normalizar_sql(sql), version)
+    except ValueError as error:
+        st.error(str(error))
+        return
+
+    resultados = cache_resultados_sql()
+    inicio = time.perf_counter()
+    guardado = resultados.obtener(clave)
+    if guardado is not None:
+        tabla, truncado = guardado
+    else:
+        estado = st.empty()
+        vista = st.empty()
+        recibidos = []
+
+        def mostrar_lote(lote, filas):
+            recibidos.append(lote.to_pandas())
+            estado.caption(f"Recibiendo resultados... {filas:,} filas")
+            vista.dataframe(pd.concat(recibidos, ignore_index=True), use_container_width=True, hide_index=True)
+
+        try:
+            tabla, truncado = consola_sql.ejecutar_consulta(sql, archivos, mostrar_lote)
+        except (duckdb.Error, ValueError, TimeoutError) as error:
+            estado.empty()
+            vista.empty()
+            st.error(str(error))
+            return
+        estado.empty()
+        vista.empty()
+        resultados.guardar(clave, tabla, truncado)
+    duracion = (time.perf_counter() - inicio) * 1000
+
+    st.caption(
+        f"{tabla.num_rows:,} filas en {duracion:,.0f} ms"
+        + (f" · resultado truncado a {consola_sql.LIMITE_FILAS:,} filas" if truncado else "")
+        + (" · desde la caché" if guardado is not None else "")
+    )
+    st.dataframe(tabla.to_pandas(), use_container_width=True, hide_index=True)
+    mostrar_exportacion(
+        "consulta", lambda formato: exportaciones.exportar_tabla(tabla, "consulta", formato, clave=clave),
+        key="exportar_consola"
+    )
+
+# Función para mostrar los archivos según las taxonomías de sus rutas
+@st.fragment
+def mostrar_taxonomias(df):
+    """Archivos por método de obtención, indicador o facultad; al cambiar la taxonomía solo se vuelve a ejecutar esta sección"""
+    st.header("Clasificación por Taxonomías")
+    st.markdown(
+        f"Valores asignados a cada archivo según su ruta, con las reglas de `{RUTA_TAXONOMIAS}`."
+    )
+
+    nombre = st.radio("Taxonomía:", list(TAXONOMIAS_VISIBLES), horizontal=True, key="taxonomia")
+    columna = TAXONOMIAS_VISIBLES[nombre]
+    defecto = cargar_defectos_taxonomias(RUTA_TAXONOMIAS, datos.version_archivo(RUTA_TAXONOMIAS))[columna]
+
+    fig = figura_inventario(crear_grafico_taxonomia, df, columna, defecto)
+    if fig:
+        st.plotly_chart(fig, use_container_width=True, key=f"taxonomia_{columna}_chart")
+    else:
+        st.info(f"Ninguna ruta del inventario calza con las reglas de la taxonomía '{nombre}'.")
+    st.caption(f"{int((df[columna] == defecto).sum()):,} de {len(df):,} archivos quedan como '{defecto}'.")
+
+    # Detalle de los valores que el gráfico agrupa en "Otros"
+    _, resto = datos.reducir_top_n(
+        totales_taxonomia(contar_taxonomia(df, columna, defecto), columna), columna, 'archivos', TOP_TAXONOMIAS
+    )
+    mostrar_detalle_otros(
+        resto.rename(columns={columna: nombre, 'archivos': 'Archivos'}), "valores", key=f"otros_taxonomia_{columna}"
+    )
+
+# Función para mostrar la línea de tiempo de actividad del Data Lake
+def mostrar_linea_tiempo_actividad(ruta=datos.RUTA_INVENTARIO):
+    """
+    Archivos y bytes creados o modificados por día, semana o mes, separados por categoría o dimensión.
+
+    Se grafica a partir de conteos diarios precalculados, así que cambiar la
+    granularidad no vuelve a recorrer el inventario.
+    """
+    st.header("Actividad del Data Lake en el Tiempo")
+
+    diaria = cargar_actividad(ruta, datos.version_archivo(ruta))
+    if diaria.empty:
+        st.info("El inventario no tiene fechas de creación o modificación válidas.")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        granularidad = st.radio("Granularidad", list(actividad.GRANULARIDADES), index=2, horizontal=True, key="actividad_granularidad")
+    with col2:
+        eventos = st.multiselect("Eventos", list(actividad.EVENTOS), default=list(actividad.EVENTOS), key="actividad_eventos")
+    with col3:
+        separar = st.radio("Separar por", ["Categoría", "Dimensión"], horizontal=True, key="actividad_separar")
+    with col4:
+        medida = st.radio("Medida", ["Archivos", "Tamaño (MB)"], horizontal=True, key="actividad_medida")
+
+    por = 'categoria' if separar == "Categoría" else 'dimensiones'
+    serie = actividad.remuestrear_actividad(diaria, granularidad, por, eventos)
+    serie['Tamaño (MB)'] = serie['bytes'] / 1024 ** 2
+    serie = serie.rename(columns={'archivos': 'Archivos'})
+
+    fig = px.bar(
+        serie, x='periodo', y=medida, color=por,
+        labels={'periodo': granularidad, por: separar},
+        title=f"{medida} {' y '.join(e.lower() for e in eventos) or 'sin eventos'} por {granularidad.lower()}"
+    )
+    fig.update_layout(template='plotly_white', height=450, barmode='stack', bargap=0.1)
+    st.plotly_chart(fig, use_container_width=True, key="actividad_chart")
+
+# Función para mostrar la evolución del Data Lake entre levantamientos
+def mostrar_historial():
+    """
+    Crecimiento del Data Lake en el tiempo y comparación entre dos levantamientos.
+
+    Solo lee el historial: los levantamientos se registran con
+    `python historial.py [AAAA-MM-DD]` después de generar el inventario.
+    """
+    st.header("Historial del Data Lake")
+
+    levantamientos = historial.listar_levantamientos()
+    if not levantamientos:
+        st.info("Aún no hay levantamientos registrados. Ejecuta `python historial.py` después de generar el inventario.")
+        return
+
+    versiones = {fecha: historial.version_levantamiento(fecha) for fecha in levantamientos}
+    crecimiento = cargar_crecimiento(tuple(versiones.items()))
+    agrupar = st.radio("Agrupar por", ["Categoría", "Dimensión"], horizontal=True, key="historial_agrupar")
+    columna = 'categoria' if agrupar == "Categoría" else 'dimensiones'
+    evolucion = crecimiento.groupby([historial.PARTICION, columna], as_index=False)[['archivos', 'bytes']].sum()
+    evolucion['Tamaño (MB)'] = evolucion['bytes'] / 1024 ** 2
+
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = px.area(
+            evolucion, x=historial.PARTICION, y='archivos', color=columna,
+            labels={historial.PARTICION: 'Levantamiento', 'archivos': 'Archivos', columna: agrupar},
+            title='Archivos por levantamiento', markers=len(levantamientos) < 30
+        )
+        fig.update_layout(template='plotly_white', height=400)
+        st.plotly_chart(fig, use_container_width=True, key="historial_archivos_chart")
+    with col2:
+        fig = px.area(
+            evolucion, x=historial.PARTICION, y='Tamaño (MB)', color=columna,
+            labels={historial.PARTICION: 'Levantamiento', columna: agrupar},
+            title='Tamaño por levantamiento', markers=len(levantamientos) < 30
+        )
+        fig.update_layout(template='plotly_white', height=400)
+        st.plotly_chart(fig, use_container_width=True, key="historial_bytes_chart")
+
+    if len(levantamientos) < 2:
+        st.info("Se necesitan al menos dos levantamientos para comparar.")
+        return
+
+    st.subheader("Cambios entre levantamientos")
+    col1, col2 = st.columns(2)
+    with col1:
+        anterior = st.selectbox("Desde", levantamientos[:-1], index=len(levantamientos) - 2, key="historial_desde")
+    with col2:
+        posteriores = [f for f in levantamientos if f > anterior]
+        posterior = st.selectbox("Hasta", posteriores, index=len(posteriores) - 1, key="historial_hasta")
+
+    cambios = cargar_diferencias(anterior, posterior, versiones[anterior], versiones[posterior])
+    conteo = cambios['cambio'].value_counts()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Agregados", f"{conteo.get('Agregado', 0):,}")
+    col2.metric("Eliminados", f"{conteo.get('Eliminado', 0):,}")
+    col3.metric("Modificados", f"{conteo.get('Modificado', 0):,}")
+    col4.metric("Variación de tamaño", f"{cambios['diferencia_bytes'].sum() / 1024 ** 2:+,.2f} MB")
+
+    if cambios.empty:
+        st.info("No hubo cambios entre estos levantamientos.")
+        return
+    tipo = st.segmented_control(
+        "Mostrar", ['Agregado', 'Eliminado', 'Modificado'], default='Agregado', key="historial_tipo"
+    )
+    seleccion = cambios[cambios['cambio'] == tipo] if tipo else cambios
+    st.dataframe(
+        pd.DataFrame({
+            'Cambio': seleccion['cambio'],
+            'Ruta': seleccion['ruta'],
+            'Extensión': seleccion['extension'],
+            'Dimensión': seleccion['dimensiones'],
+            'Tamaño antes (KB)': (seleccion['bytes_antes'] / 1024).round(2),
+            'Tamaño después (KB)': (seleccion['bytes_despues'] / 1024).round(2),
+            'Modificación antes': seleccion['fecha_modificacion_antes'],
+            'Modificación después': seleccion['fecha_modificacion_despues']
+        }).head(5000),
+        use_container_width=True,
+        hide_index=True
+    )
+    if len(seleccion) > 5000:
+        st.caption(f"Se muestran 5.000 de {len(seleccion):,} cambios.")
+
+# Función para obtener la figura de dimensiones por categoría con los nombres de dimensiones vigentes
+def figura_dimensiones_por_categoria(df):
+    nombres = tuple(sorted(cargar_nombres_dimensiones().items()))
+    return figura_inventario(crear_grafico_dimensiones_por_categoria, df, nombres)
+
+# Función para mostrar el gráfico y las estadísticas de dimensiones según la categoría
+def mostrar_dimensiones_por_categoria(df):
+    """
+    Gráfico de dimensiones con su tabla de estadísticas.
+
+    Los botones de la figura eligen la categoría del gráfico y de la tabla a
+    la vez, en el navegador.
+    """
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        # Una sola figura con las tres categorías y sus tablas; sus botones eligen cuál se ve
+        grafico_dim = figura_dimensiones_por_categoria(df)
+        if grafico_dim:
+            st.plotly_chart(grafico_dim, use_container_width=True, key="dim_chart")
+        else:
+            st.warning("No hay datos suficientes para mostrar dimensiones")
+
+    with col2:
+        st.markdown("""
+        <div style="background-color:#f0f2f6; padding:15px; border-radius:10px; margin-top:35px;">
+        <h4>¿Qué son las dimensiones?</h4>
+        <p>Las dimensiones representan áreas funcionales o temáticas dentro de las categorías principales.
+        Cada dimensión agrupa información relacionada con un aspecto específico de la gestión institucional
+        o territorial, facilitando la organización y recuperación de la información.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        mostrar_exportacion_dimensiones(df)
+
+# Función para exportar las estadísticas por dimensión de las tres categorías
+@st.fragment
+def mostrar_exportacion_dimensiones(df):
+    """Exportación de las estadísticas por dimensión; sus controles solo vuelven a ejecutar esta sección"""
+    st.markdown("**Exportar estadísticas por dimensión**")
+    nombres = cargar_nombres_dimensiones()
+    mostrar_exportacion(
+        "estadisticas_dimensiones",
+        lambda formato: exportaciones.exportar_tabla(
+            tablas_por_categoria(lambda df_cat, filtro: estadisticas_dimensiones(df_cat, filtro, nombres), df),
+            "estadisticas_dimensiones", formato
+        ),
+        key="exportar_dimensiones"
+    )
+
+# Función para mostrar a pedido las filas que un gráfico agrupa en "Otros"
+def mostrar_detalle_otros(resto, nombre, key):
+    """Interruptor que muestra la tabla de lo agrupado; la tabla solo se arma si el usuario la pide"""
+    if resto.empty:
+        return
+    if st.toggle(f"Ver las {len(resto)} {nombre} agrupadas en «{datos.ETIQUETA_OTROS}»", key=key):
+        st.dataframe(resto, use_container_width=True, hide_index=True)
+
+# Función para mostrar el mapa de calor de extensiones por dimensión
+@st.fragment
+def mostrar_heatmap_extension_dimension(df):
+    """Mapa de calor con selector de cantidad de extensiones; al cambiarlo solo se vuelve a ejecutar esta sección"""
+    st.subheader("Relación entre Tipos de Archivos y Dimensiones")
+
+    opcion = st.radio(
+        "Extensiones a mostrar:",
+        list(OPCIONES_TOP_HEATMAP),
+        horizontal=True,
+        key="top_heatmap"
+    )
+
+    heatmap = figura_inventario(crear_heatmap_extension_dimension, df, OPCIONES_TOP_HEATMAP[opcion])
+    if heatmap:
+        st.plotly_chart(heatmap, use_container_width=True, key="heatmap_chart")
+    else:
+        st.warning("No hay suficientes datos para crear el mapa de calor.")
+
+    # La exportación incluye la matriz completa, sin importar cuántas extensiones se muestren
+    mostrar_exportacion(
+        "extensiones_por_dimension",
+        lambda formato: exportaciones.exportar_tabla(
+            pivot_extension_dimension(df).rename_axis(index='extension', columns=None).reset_index(),
+            "extensiones_por_dimension", formato
+        ),
+        key="exportar_heatmap"
+    )
+
+# Función para mostrar el gráfico y el top de extensiones según la categoría
+def mostrar_extensiones_por_categoria(df):
+    """
+    Gráfico de extensiones con la tabla del top 5.
+
+    Los botones de la figura eligen la categoría del gráfico y de la tabla a
+    la vez, en el navegador.
+    """
+    # Una sola figura con las tres categorías y sus tablas; sus botones eligen cuál se ve
+    grafico_ext = figura_inventario(crear_grafico_top_extensiones_por_categoria, df)
+    if grafico_ext:
+        st.plotly_chart(grafico_ext, use_container_width=True, key="ext_chart")
+    else:
+        st.warning("No hay datos suficientes para mostrar extensiones")
+
+    mostrar_detalle_extensiones(df)
+
+# Función para mostrar la exportación del top de extensiones y el detalle de "Otros"
+@st.fragment
+def mostrar_detalle_extensiones(df):
+    """Exportación y detalle de "Otros" de las tres categorías; sus controles solo vuelven a ejecutar esta sección"""
+    mostrar_exportacion(
+        "top_extensiones",
+        lambda formato: exportaciones.exportar_tabla(tablas_por_categoria(top_extensiones, df), "top_extensiones", formato),
+        key="exportar_top_extensiones"
+    )
+
+    # Detalle de las extensiones que el gráfico agrupa en "Otros", por categoría
+    otras = tablas_por_categoria(
+        lambda df_cat, filtro: datos.reducir_top_n(
+            contar_extensiones(df_cat, filtro), 'extension', 'conteo', TOP_EXTENSIONES
+        )[1].rename(columns={'extension': 'Extensión', 'conteo': 'Cantidad'}),
+        df
+    )
+    mostrar_detalle_otros(otras, "extensiones por categoría", key="otros_ext")
+
 # Función para cargar y mostrar la tabla de comunas
 def mostrar_tabla_comunas():
     """
@@ -1286,7 +2328,7 @@ def mostrar_tabla_comunas():
     st.subheader("Comunas del proyecto - Región Metropolitana")
     
     # Cargar el dataframe
-    df_comunas = pd.read_csv('data/Comunas.csv')
+    df_comunas = cargar_comunas()
 
     
     if not df_comunas.empty:
@@ -1362,7 +2404,6 @@ def main():
         
         # Cargar y procesar datos
         df = cargar_datos()
-        df = procesar_datos(df)
         
         if df.empty:
             st.warning("No hay datos disponibles para analizar.")
@@ -1468,15 +2509,19 @@ def main():
                 """, unsafe_allow_html=True)
         
         # Pestañas para diferentes análisis
-        tab1, tab2, tab3, tab4, tab5, tab6, tab7= st.tabs([
+        # La consola SQL solo aparece con un Data Lake explícito fuera de la aplicación
+        tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9, tab10, *tab_consola = st.tabs([
             "Vista General", 
             "Análisis por Dimensiones",
             "Análisis de Estado Indicadores",
             "Insights Adicionales",
             "Mapa Geográfico",
             "Mapa Sedes",
-            "Análisis de Archivos"
-        ])
+            "Análisis de Archivos",
+            "Explorador de Archivos",
+            "Duplicados",
+            "Historial",
+        ] + (["Consola SQL"] if consola_sql.raiz_consola() else []))
 
 
         # NOTA: Añadir treemap a la vista general 
@@ -1500,98 +2545,11 @@ def main():
         with tab2:
             st.header("Análisis por Dimensiones")
         
-            # Mantén el código existente aquí...
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Selector para filtrar dimensiones
-                filtro_dim = st.radio(
-                    "Seleccionar categoría para dimensiones:",
-                    ["Global", "Institucional", "Territorial"],
-                    horizontal=True
-                )
-                filter_dim = None if filtro_dim == "Global" else filtro_dim.lower()
-                
-                # Gráfico de dimensiones
-                grafico_dim = crear_grafico_dimensiones(df, filter_dim)
-                if grafico_dim:
-                    st.plotly_chart(grafico_dim, use_container_width=True, key=f"dim_{filtro_dim}_chart")       
-                else:
-                    st.warning(f"No hay datos suficientes para mostrar dimensiones en la categoría {filtro_dim}")
-            
-            with col2:
-                st.markdown("""
-                <div style="background-color:#f0f2f6; padding:15px; border-radius:10px; margin-top:35px;">
-                <h4>¿Qué son las dimensiones?</h4>
-                <p>Las dimensiones representan áreas funcionales o temáticas dentro de las categorías principales.
-                Cada dimensión agrupa información relacionada con un aspecto específico de la gestión institucional
-                o territorial, facilitando la organización y recuperación de la información.</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Cargar el CSV de nombres de dimensiones
-                nombres_dimensiones = pd.read_csv("data/nombres_dimensiones.csv")
-                # Crear un diccionario para mapear id a nombre
-                dict_dimensiones = dict(zip(nombres_dimensiones['id_dim'], nombres_dimensiones['nombre_dim']))
-
-                # Mostrar estadísticas por dimensión
-                st.subheader("Estadísticas por Dimensión")
-
-                # Filtrar según selección
-                if filter_dim == 'institucional':
-                    df_stat = df[df['institucional'] == True]
-                elif filter_dim == 'territorial':
-                    df_stat = df[df['territorial'] == True]
-                else:
-                    df_stat = df
-                    
-                # Calcular estadísticas de dimensiones sin "Sin clasificación"
-                df_dims = df_stat[df_stat['dimensiones'] != 'Sin clasificación']
-
-                if not df_dims.empty:
-                    dim_stats = df_dims['dimensiones'].value_counts()
-                    
-                    # Crear DataFrame para las estadísticas
-                    data = []
-                    for dim in dim_stats.index:
-                        # Extraer el número de dimensión
-                        if isinstance(dim, str) and dim.startswith('Dimensión '):
-                            dim_num = int(dim.replace('Dimensión ', ''))
-                        else:
-                            dim_num = int(dim) if str(dim).isdigit() else 0
-                        
-                        # Obtener el nombre completo
-                        nombre_completo = dict_dimensiones.get(dim_num, "Sin nombre")
-                        
-                        data.append({
-                            'Número': dim_num,
-                            'Dimensión': dim, 
-                            'Nombre Dimensión': nombre_completo,
-                            'Total Archivos': dim_stats[dim],
-                            'Porcentaje': round(dim_stats[dim] / dim_stats.sum() * 100, 1)
-                        })
-                    
-                    # Crear DataFrame y ordenar por número de dimensión
-                    dim_df = pd.DataFrame(data)
-                    dim_df = dim_df.sort_values('Número')
-                    
-                    # Mostrar el DataFrame sin el índice y sin la columna de número
-                    st.dataframe(
-                        dim_df[['Dimensión', 'Nombre Dimensión', 'Total Archivos', 'Porcentaje']], 
-                        use_container_width=True,
-                        hide_index=True
-                    )
-                else:
-                    st.info("No hay datos de dimensiones disponibles para esta selección.")
+            # Los botones de la figura eligen la categoría del gráfico y de la tabla
+            mostrar_dimensiones_por_categoria(df)
             
             # Heatmap de extensiones por dimensión
-            st.subheader("Relación entre Tipos de Archivos y Dimensiones")
-            
-            heatmap = crear_heatmap_extension_dimension(df)
-            if heatmap:
-                st.plotly_chart(heatmap, use_container_width=True, key="heatmap_chart")
-            else:
-                st.warning("No hay suficientes datos para crear el mapa de calor.")
+            mostrar_heatmap_extension_dimension(df)
             
             st.markdown("""
             <div style="background-color:#f0f2f6; padding:15px; border-radius:10px;">
@@ -1646,43 +2604,33 @@ def main():
             # Análisis de tamaño de archivos
             st.subheader("Tamaño de Archivos por Extensión")
             
-            # Función para convertir tamaño a KB
-            def extraer_tamano_kb(tam_str):
-                try:
-                    if isinstance(tam_str, str):
-                        partes = tam_str.split()
-                        valor = float(partes[0])
-                        unidad = partes[1]
-                        
-                        if unidad == 'B':
-                            return valor / 1024
-                        elif unidad == 'KB':
-                            return valor
-                        elif unidad == 'MB':
-                            return valor * 1024
-                        elif unidad == 'GB':
-                            return valor * 1024 * 1024
-                        else:
-                            return 0
-                    else:
-                        return 0
-                except:
-                    return 0
-            
-            # Calcular tamaño en KB
-            df['tamano_kb'] = df['tamano'].apply(extraer_tamano_kb)
-            
-            # Agrupar por extensión
-            tamano_por_ext = df.groupby('extension')['tamano_kb'].agg(['mean', 'sum', 'count']).reset_index()
+            # Agrupar por extensión sobre el tamaño exacto en bytes
+            tamano_por_ext = df.groupby('extension', observed=True)['bytes'].agg(['mean', 'sum', 'count']).reset_index()
             tamano_por_ext.columns = ['Extensión', 'Tamaño Promedio (KB)', 'Tamaño Total (KB)', 'Cantidad']
             tamano_por_ext = tamano_por_ext.sort_values('Tamaño Total (KB)', ascending=False).head(10)
             
-            # Redondear valores
-            tamano_por_ext['Tamaño Promedio (KB)'] = tamano_por_ext['Tamaño Promedio (KB)'].round(2)
-            tamano_por_ext['Tamaño Total (KB)'] = tamano_por_ext['Tamaño Total (KB)'].round(2)
+            # Convertir a KB y redondear valores
+            tamano_por_ext['Tamaño Promedio (KB)'] = (tamano_por_ext['Tamaño Promedio (KB)'] / 1024).round(2)
+            tamano_por_ext['Tamaño Total (KB)'] = (tamano_por_ext['Tamaño Total (KB)'] / 1024).round(2)
             
             # Mostrar tabla
             st.dataframe(tamano_por_ext, use_container_width=True)
+            mostrar_exportacion(
+                "tamano_por_extension",
+                lambda formato: exportaciones.exportar_tabla(tamano_por_ext, "tamano_por_extension", formato),
+                key="exportar_tamano_extension"
+            )
+            
+            # Memoria del inventario compartido por todas las sesiones
+            if 'memoria' in df.attrs:
+                memoria = df.attrs['memoria']
+                with st.expander("Uso de memoria del inventario"):
+                    st.caption(
+                        f"{memoria['compacto'] / 1024:,.0f} KB en memoria "
+                        f"(sin compactar: {memoria['original'] / 1024:,.0f} KB, "
+                        f"{memoria['original'] / memoria['compacto']:.1f}× menos)"
+                    )
+                    st.dataframe(datos.reporte_memoria(df), use_container_width=True, hide_index=True)
             
             st.markdown("""
             <div style="background-color:#f0f2f6; padding:15px; border-radius:10px;">
@@ -1785,7 +2733,7 @@ def main():
             col1, col2 = st.columns(2)
             
             with col1:
-                st.plotly_chart(crear_grafico_institucional_territorial(df), use_container_width=True, key="inst_terr_chart")
+                st.plotly_chart(figura_inventario(crear_grafico_institucional_territorial, df), use_container_width=True, key="inst_terr_chart")
                 
                 st.markdown("""
                 <div style="background-color:#f0f2f6; padding:15px; border-radius:10px;">
@@ -1797,7 +2745,7 @@ def main():
                 """, unsafe_allow_html=True)
             
             with col2:
-                st.plotly_chart(crear_grafico_extensiones(df), use_container_width=True, key="ext_general_chart")
+                st.plotly_chart(figura_inventario(crear_grafico_extensiones_por_categoria, df), use_container_width=True, key="ext_general_chart")
                 
                 st.markdown("""
                 <div style="background-color:#f0f2f6; padding:15px; border-radius:10px;">
@@ -1809,7 +2757,7 @@ def main():
             
             # Gráfico comparativo de extensiones por categoría
             st.header("Comparación de Tipos de Archivos por Categoría")
-            st.plotly_chart(crear_grafico_comparativo_extensiones(df), use_container_width=True, key="ext_comp_chart")
+            st.plotly_chart(figura_inventario(crear_grafico_comparativo_extensiones, df), use_container_width=True, key="ext_comp_chart")
             
             st.markdown("""
             <div style="background-color:#f0f2f6; padding:15px; border-radius:10px;">
@@ -1823,38 +2771,8 @@ def main():
 
             st.header("Análisis Detallado por Tipo de Archivo")
             
-            # Selector para filtrar por categoría
-            filtro_cat = st.radio(
-                "Seleccionar categoría:",
-                ["Global", "Institucional", "Territorial"],
-                horizontal=True
-            )
-            filtro = None if filtro_cat == "Global" else filtro_cat.lower()
-            
-            # Gráfico de extensiones filtrado
-            st.plotly_chart(crear_grafico_extensiones(df, filtro), use_container_width=True, key=f"ext_{filtro_cat}_chart")
-            
-            # Mostrar top extensiones con estadísticas
-            st.subheader(f"Top 5 Extensiones - {filtro_cat}")
-            
-            # Filtrar según selección
-            if filtro == 'institucional':
-                df_temp = df[df['institucional'] == True]
-            elif filtro == 'territorial':
-                df_temp = df[df['territorial'] == True]
-            else:
-                df_temp = df
-                
-            # Calcular estadísticas
-            top_ext = df_temp['extension'].value_counts().head(5)
-            top_ext_df = pd.DataFrame({
-                'Extensión': top_ext.index,
-                'Cantidad': top_ext.values,
-                'Porcentaje': (top_ext.values / len(df_temp) * 100).round(1)
-            })
-            
-            # Mostrar tabla
-            st.dataframe(top_ext_df, use_container_width=True)
+            # Los botones de la figura eligen la categoría del gráfico y de la tabla
+            mostrar_extensiones_por_categoria(df)
             
             st.markdown("""
             <div style="background-color:#f0f2f6; padding:15px; border-radius:10px;">
@@ -1871,6 +2789,38 @@ def main():
             </div>
             """, unsafe_allow_html=True)
 
+            # Método de obtención, indicador y facultad según las rutas
+            mostrar_taxonomias(df)
+
+            # Línea de tiempo de creación y modificación de archivos
+            mostrar_linea_tiempo_actividad()
+
+        with tab8:
+            # Búsqueda por nombre y ruta
+            mostrar_buscador_archivos(df)
+
+            # Explorador paginado de archivos
+            mostrar_explorador_archivos(df)
+            
+            # Explorador del árbol de directorios
+            mostrar_explorador_directorios(df)
+
+            # Hojas y columnas de los archivos tabulares
+            mostrar_catalogo_esquemas(df)
+
+        with tab9:
+            # Archivos duplicados por contenido
+            mostrar_duplicados(df)
+
+        with tab10:
+            # Evolución del Data Lake entre levantamientos
+            mostrar_historial()
+
+        if tab_consola:
+            with tab_consola[0]:
+                # Consultas SQL sobre los archivos del Data Lake
+                mostrar_consola_sql()
+
 # Ejecutar la aplicación
 if __name__ == "__main__":
     main()